@@ -0,0 +1,22 @@
+"""
+Benchmarks of the quiz and attempt APIs: a reproducible data generator, the
+request scenarios, and a runner reporting latency percentiles, queries per
+request and allocations. Run them with ``manage.py benchmark``;
+``manage.py benchmark_concurrency`` compares the WSGI and ASGI entry points
+under concurrent load (see ``concurrency``).
+"""
+from . import concurrency
+from .data import Dataset, generate
+from .runner import BenchmarkError, compare, run, run_scenario
+from .scenarios import SCENARIOS
+
+__all__ = [
+    "SCENARIOS",
+    "BenchmarkError",
+    "Dataset",
+    "compare",
+    "concurrency",
+    "generate",
+    "run",
+    "run_scenario",
+]
@@ -0,0 +1,220 @@
+"""
+Concurrency benchmark of the WSGI and ASGI entry points.
+
+The same burst of concurrent requests is sent through ``WSGIHandler``, with
+a fixed number of worker threads as a threaded WSGI server would have, to
+the synchronous attempt endpoints, and through ``ASGIHandler`` on a single
+event loop to their async counterparts. Requests are built outside the
+timed section and authenticate with real access tokens.
+
+Local databases answer in microseconds, so ``db_latency`` can add a
+simulated network round trip to every query to show the waiting that worker
+threads spend blocked on.
+"""
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import RequestFactory
+from django.urls import reverse
+
+from profiles.serializers import ClaimsTokenObtainPairSerializer
+from quiz_attempts import services as attempt_services
+from quizzes.answer_keys import get_answer_key
+from .runner import BenchmarkError, percentile
+
+# URL names of the sync and async endpoint of each scenario
+SCENARIOS = {
+    "start": ("quiz_attempt_list_create", "async_quiz_attempt_start"),
+    "submit": ("question_attempt_list_create", "async_question_attempt_create"),
+}
+
+
+def prepare(dataset, scenario, count, rng):
+    """
+    Build ``count`` requests as ``(body, authorization header)`` pairs,
+    starting the attempts that submissions go to.
+    """
+    tokens, requests = {}, []
+    for _ in range(count):
+        student = rng.choice(dataset.students)
+        quiz = rng.choice(dataset.quizzes)
+        if scenario == "start":
+            body = {"quiz": str(quiz.pk)}
+        else:
+            quiz_attempt = attempt_services.start_attempt(student, quiz)
+            questions = get_answer_key(quiz.pk).questions
+            question_id = rng.choice(sorted(questions, key=str))
+            body = {
+                "quiz_attempt": quiz_attempt.pk,
+                "question": str(question_id),
+                "answer_selected": str(
+                    rng.choice(sorted(questions[question_id][1], key=str))
+                ),
+            }
+        if student.pk not in tokens:
+            token = ClaimsTokenObtainPairSerializer.get_token(student).access_token
+            tokens[student.pk] = f"Bearer {token}"
+        requests.append((json.dumps(body).encode(), tokens[student.pk]))
+    return requests
+
+
+@contextmanager
+def simulated_latency(seconds):
+    """
+    Sleep ``seconds`` before every query, on every connection opened
+    meanwhile, as if the database were across a network.
+    """
+
+    def delay(execute, sql, params, many, context):
+        time.sleep(seconds)
+        return execute(sql, params, many, context)
+
+    def install(connection, **kwargs):
+        if delay not in connection.execute_wrappers:
+            connection.execute_wrappers.append(delay)
+
+    if not seconds:
+        yield
+        return
+    for connection in connections.all():
+        install(connection)
+    connection_created.connect(install, weak=False)
+    try:
+        yield
+    finally:
+        connection_created.disconnect(install)
+        for connection in connections.all():
+            if delay in connection.execute_wrappers:
+                connection.execute_wrappers.remove(delay)
+
+
+def _summary(results, wall):
+    latencies = sorted(latency for latency, status in results)
+    errors = [status for latency, status in results if status >= 400]
+    if len(errors) == len(results):
+        raise BenchmarkError(f"Every request failed, e.g. with HTTP {errors[0]}.")
+    return {
+        "requests": len(results),
+        "errors": len(errors),
+        "wall_s": wall,
+        "throughput_rps": len(results) / wall,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p95": percentile(latencies, 0.95) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+        },
+    }
+
+
+def run_wsgi(path, requests, concurrency, threads):
+    """
+    ``concurrency`` clients sharing ``threads`` server threads. Latencies
+    include the time a request waits for a free thread.
+    """
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    workers = threading.Semaphore(threads)
+    environs = [
+        factory.post(
+            path, body, content_type="application/json", HTTP_AUTHORIZATION=auth
+        ).environ
+        for body, auth in requests
+    ]
+
+    def send(environ):
+        statuses = []
+
+        def start_response(status, headers, exc_info=None):
+            statuses.append(int(status.split()[0]))
+
+        started = time.perf_counter()
+        with workers:
+            response = handler(environ, start_response)
+            b"".join(response)
+            response.close()
+        return time.perf_counter() - started, statuses[0]
+
+    with ThreadPoolExecutor(concurrency) as clients:
+        started = time.perf_counter()
+        results = list(clients.map(send, environs))
+        wall = time.perf_counter() - started
+    return _summary(results, wall)
+
+
+def run_asgi(path, requests, concurrency):
+    """
+    ``concurrency`` clients served by one event loop.
+    """
+    handler = ASGIHandler()
+
+    async def send(body, auth, clients):
+        received, messages = False, []
+
+        async def receive():
+            nonlocal received
+            if received:
+                # Nothing more to read and no disconnect until cancelled
+                await asyncio.Event().wait()
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send_message(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": "POST",
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": b"",
+            "server": ("testserver", 80),
+            "client": ("127.0.0.1", 0),
+            "headers": [
+                (b"host", b"testserver"),
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"authorization", auth.encode()),
+            ],
+        }
+        async with clients:
+            started = time.perf_counter()
+            await handler(scope, receive, send_message)
+            return time.perf_counter() - started, messages[0]["status"]
+
+    async def burst():
+        clients = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(send(body, auth, clients) for body, auth in requests)
+        )
+        return results, time.perf_counter() - started
+
+    results, wall = asyncio.run(burst())
+    return _summary(results, wall)
+
+
+def run(dataset, scenario, rng, requests=200, concurrency=50, threads=4, db_latency=0):
+    """
+    Send the same number of fresh requests through both handlers and return
+    their summaries.
+    """
+    sync_name, async_name = SCENARIOS[scenario]
+    wsgi_requests = prepare(dataset, scenario, requests, rng)
+    asgi_requests = prepare(dataset, scenario, requests, rng)
+    with simulated_latency(db_latency):
+        return {
+            "wsgi": run_wsgi(reverse(sync_name), wsgi_requests, concurrency, threads),
+            "asgi": run_asgi(reverse(async_name), asgi_requests, concurrency),
+        }
@@ -0,0 +1,135 @@
+"""
+Reproducible data sets for benchmarks.
+"""
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.utils import timezone
+
+from profiles.models import User
+from quiz_attempts.models import QuizAttempt, QuestionAttempt
+from quiz_attempts.statistics import compute_statistics
+from quizzes.answer_keys import build as build_answer_key
+from quizzes.models import Quiz
+from quizzes.services import bulk_create_questions
+
+
+class Dataset:
+    def __init__(self, teachers, students, quizzes, seed):
+        self.teachers = teachers
+        self.students = students
+        self.quizzes = quizzes
+        self.seed = seed
+
+    def describe(self):
+        return {
+            "teachers": len(self.teachers),
+            "students": len(self.students),
+            "quizzes": len(self.quizzes),
+            "attempts": QuizAttempt.objects.count(),
+            "question_attempts": QuestionAttempt.objects.count(),
+            "seed": self.seed,
+        }
+
+
+def question_payloads(rng, count):
+    """
+    Validated question payloads of mixed types, as ``bulk_create_questions``
+    and the quiz API take them.
+    """
+    payloads = []
+    for order in range(1, count + 1):
+        if rng.random() < 0.5:
+            payloads.append(
+                {
+                    "question_type": "true_false",
+                    "question_text": f"True or false, statement {order}?",
+                    "correct_answer": rng.choice(["true", "false"]),
+                    "order": order,
+                }
+            )
+        else:
+            correct = rng.randrange(4)
+            payloads.append(
+                {
+                    "question_type": "multiple_choice",
+                    "question_text": f"Which is right for question {order}?",
+                    "order": order,
+                    "question_answers": [
+                        {
+                            "answer_text": f"Choice {choice}",
+                            "is_correct": choice == correct,
+                        }
+                        for choice in range(4)
+                    ],
+                }
+            )
+    return payloads
+
+
+def _users(user_type, prefix, count):
+    password = make_password(None)
+    return User.objects.bulk_create(
+        User(username=f"{prefix}{number}", type=user_type, password=password)
+        for number in range(count)
+    )
+
+
+def generate(users=50, quizzes=20, questions=10, attempts=200, seed=0):
+    """
+    Create ``users`` users (a tenth of them teachers), ``quizzes`` published
+    quizzes of ``questions`` questions each and ``attempts`` completed
+    attempts answering every question.
+    """
+    rng = random.Random(seed)
+    teacher_count = max(1, users // 10)
+    teachers = _users(User.Types.TEACHER, "teacher", teacher_count)
+    students = _users(User.Types.STUDENT, "student", max(1, users - teacher_count))
+
+    quiz_objects = []
+    for number in range(quizzes):
+        author = rng.choice(teachers)
+        quiz = Quiz.objects.create(
+            title=f"Quiz {number}",
+            description=f"Benchmark quiz {number}",
+            author=author,
+            status=Quiz.STATUS.published,
+        )
+        bulk_create_questions(quiz, question_payloads(rng, questions), author=author)
+        quiz_objects.append(quiz)
+
+    answer_keys = {quiz.pk: build_answer_key(quiz.pk) for quiz in quiz_objects}
+    now = timezone.now()
+    quiz_attempts, question_attempts = [], []
+    for number in range(attempts):
+        quiz = rng.choice(quiz_objects)
+        started = now - timedelta(minutes=attempts - number)
+        quiz_attempt = QuizAttempt(
+            user=rng.choice(students),
+            quiz=quiz,
+            created=started,
+            completed=started + timedelta(minutes=1),
+            score=0,
+        )
+        for question_id, (correct_id, answer_ids) in answer_keys[
+            quiz.pk
+        ].questions.items():
+            answer_id = rng.choice(sorted(answer_ids))
+            quiz_attempt.score += answer_id == correct_id
+            question_attempts.append(
+                QuestionAttempt(
+                    quiz_attempt=quiz_attempt,
+                    question_id=question_id,
+                    answer_selected_id=answer_id,
+                    is_correct=answer_id == correct_id,
+                )
+            )
+        quiz_attempts.append(quiz_attempt)
+
+    QuizAttempt.objects.bulk_create(quiz_attempts, batch_size=500)
+    QuestionAttempt.objects.bulk_create(question_attempts, batch_size=1000)
+    for model, rows in compute_statistics().items():
+        model.objects.bulk_create(rows, batch_size=1000)
+
+    return Dataset(teachers, students, quiz_objects, seed)
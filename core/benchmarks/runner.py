@@ -0,0 +1,139 @@
+"""
+Run benchmark scenarios and compare them against a saved baseline.
+"""
+import gc
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+from .scenarios import SCENARIOS
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(values, fraction):
+    """
+    Linearly interpolated percentile of a sorted list.
+    """
+    position = (len(values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def _send(name, request):
+    response = request()
+    if response.status_code >= 400:
+        raise BenchmarkError(
+            f"{name}: HTTP {response.status_code} {getattr(response, 'data', '')}"
+        )
+    return response
+
+
+def run_scenario(name, dataset, iterations=50, warmup=5, alloc_iterations=5, seed=0):
+    """
+    Time ``iterations`` requests of a scenario after ``warmup`` untimed ones,
+    counting their queries; then trace the allocations of
+    ``alloc_iterations`` more, separately since tracing slows them down.
+    """
+    prepare = SCENARIOS[name]
+    rng = random.Random(f"{seed}:{name}")
+    connection = connections[DEFAULT_DB_ALIAS]
+
+    for _ in range(warmup):
+        _send(name, prepare(dataset, rng))
+
+    latencies, queries = [], []
+    for _ in range(iterations):
+        request = prepare(dataset, rng)
+        with CaptureQueriesContext(connection) as context:
+            started = time.perf_counter_ns()
+            _send(name, request)
+            latencies.append((time.perf_counter_ns() - started) / 1e6)
+        queries.append(len(context))
+
+    peaks, allocated = [], []
+    for _ in range(alloc_iterations):
+        request = prepare(dataset, rng)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            _send(name, request)
+            current, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peaks.append(peak / 1024)
+        allocated.append(current / 1024)
+
+    latencies.sort()
+    result = {
+        "iterations": iterations,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p90": percentile(latencies, 0.90),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "mean": statistics.fmean(latencies),
+            "max": latencies[-1],
+        },
+        "queries": {"median": statistics.median(queries), "max": max(queries)},
+    }
+    if peaks:
+        result["allocations_kib"] = {
+            "peak": statistics.median(peaks),
+            "retained": statistics.median(allocated),
+        }
+    return result
+
+
+def run(dataset, names=None, **options):
+    return {name: run_scenario(name, dataset, **options) for name in names or SCENARIOS}
+
+
+def compare(results, baseline, tolerance=0.25):
+    """
+    Regressions of ``results`` against a baseline's scenarios: p50 or p95
+    latency or peak allocations above the baseline by more than
+    ``tolerance``, or any increase in the most queries per request.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        checks = [
+            (
+                "p50 latency",
+                result["latency_ms"]["p50"],
+                previous["latency_ms"]["p50"],
+                tolerance,
+            ),
+            (
+                "p95 latency",
+                result["latency_ms"]["p95"],
+                previous["latency_ms"]["p95"],
+                tolerance,
+            ),
+            ("max queries", result["queries"]["max"], previous["queries"]["max"], 0),
+        ]
+        if "allocations_kib" in result and "allocations_kib" in previous:
+            checks.append(
+                (
+                    "peak allocations",
+                    result["allocations_kib"]["peak"],
+                    previous["allocations_kib"]["peak"],
+                    tolerance,
+                )
+            )
+        for metric, value, limit, allowed in checks:
+            if value > limit * (1 + allowed):
+                regressions.append(
+                    f"{name}: {metric} {value:.2f}, baseline {limit:.2f}"
+                )
+    return regressions
@@ -0,0 +1,98 @@
+"""
+Benchmark scenarios.
+
+A scenario prepares one request, outside the timed section, and returns a
+callable that sends it. ``prepare(dataset, rng)`` may write to the database,
+e.g. to start the attempt a submission goes to.
+"""
+import uuid
+
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from quiz_attempts import services as attempt_services
+from quizzes import cache as quiz_cache
+from quizzes.answer_keys import get_answer_key
+from .data import question_payloads
+
+SCENARIOS = {}
+
+
+def scenario(name):
+    def register(prepare):
+        SCENARIOS[name] = prepare
+        return prepare
+
+    return register
+
+
+def client_for(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@scenario("quiz_create")
+def quiz_create(dataset, rng):
+    client = client_for(rng.choice(dataset.teachers))
+    payload = {
+        "title": f"Benchmark quiz {uuid.uuid4()}",
+        "description": "Created by the benchmark suite",
+        "quiz_questions": question_payloads(rng, 10),
+    }
+    return lambda: client.post(reverse("quiz_list_create"), payload, format="json")
+
+
+@scenario("quiz_detail")
+def quiz_detail(dataset, rng):
+    client = client_for(rng.choice(dataset.students))
+    url = reverse("quiz_detail", kwargs={"slug": rng.choice(dataset.quizzes).slug})
+    return lambda: client.get(url)
+
+
+@scenario("quiz_detail_uncached")
+def quiz_detail_uncached(dataset, rng):
+    client = client_for(rng.choice(dataset.students))
+    slug = rng.choice(dataset.quizzes).slug
+    quiz_cache.bump_version(slug)
+    url = reverse("quiz_detail", kwargs={"slug": slug})
+    return lambda: client.get(url)
+
+
+@scenario("quiz_list")
+def quiz_list(dataset, rng):
+    client = client_for(rng.choice(dataset.students))
+    return lambda: client.get(reverse("quiz_list_create"))
+
+
+@scenario("quiz_list_summary")
+def quiz_list_summary(dataset, rng):
+    client = client_for(rng.choice(dataset.students))
+    return lambda: client.get(reverse("quiz_list_create"), {"mode": "summary"})
+
+
+def _start_attempt(dataset, rng):
+    student = rng.choice(dataset.students)
+    quiz = rng.choice(dataset.quizzes)
+    quiz_attempt = attempt_services.start_attempt(student, quiz)
+    answers = [
+        {"question": str(question_id), "answer_selected": str(rng.choice(list(ids)))}
+        for question_id, (correct_id, ids) in get_answer_key(quiz.pk).questions.items()
+    ]
+    return client_for(student), quiz_attempt, answers
+
+
+@scenario("answer_submit")
+def answer_submit(dataset, rng):
+    client, quiz_attempt, answers = _start_attempt(dataset, rng)
+    url = reverse("quiz_attempt_submit", kwargs={"pk": quiz_attempt.pk})
+    return lambda: client.post(url, {"answers": answers}, format="json")
+
+
+@scenario("answer_submit_single")
+def answer_submit_single(dataset, rng):
+    client, quiz_attempt, answers = _start_attempt(dataset, rng)
+    payload = {"quiz_attempt": quiz_attempt.pk, **answers[0]}
+    return lambda: client.post(
+        reverse("question_attempt_list_create"), payload, format="json"
+    )
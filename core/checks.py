@@ -0,0 +1,128 @@
+"""
+Startup checks for settings that cost throughput in production.
+
+When DJANGO_ENV is "production" they run with every management command that
+checks the project, and are logged when project/wsgi.py or project/asgi.py
+loads the application, as WSGI and ASGI servers never run system checks.
+Elsewhere they run with ``manage.py check --deploy``.
+"""
+import logging
+
+from django.conf import settings
+from django.core.checks import Warning, register
+
+logger = logging.getLogger(__name__)
+
+DEBUG_APPS = {"debug_toolbar", "django_extensions"}
+DEBUG_MIDDLEWARE = {"debug_toolbar.middleware.DebugToolbarMiddleware"}
+
+
+def _template_loaders_cached(config):
+    for template in config.TEMPLATES:
+        if template["BACKEND"] != "django.template.backends.django.DjangoTemplates":
+            continue
+        loaders = template.get("OPTIONS", {}).get("loaders")
+        if loaders is None:
+            # Django caches the default loaders unless DEBUG is on
+            if config.DEBUG:
+                return False
+        elif not any(
+            isinstance(loader, (list, tuple))
+            and loader[0] == "django.template.loaders.cached.Loader"
+            for loader in loaders
+        ):
+            return False
+    return True
+
+
+def throughput_warnings(config=settings):
+    """
+    Warnings for the settings of ``config``, the project's by default.
+    """
+    warnings = []
+    if config.DEBUG:
+        warnings.append(
+            Warning(
+                "DEBUG is on: every query is kept in memory and errors render "
+                "full debug pages.",
+                hint="Unset DJANGO_DEBUG.",
+                id="core.W001",
+            )
+        )
+    for app in sorted(DEBUG_APPS & set(config.INSTALLED_APPS)):
+        warnings.append(Warning(f"Development app {app} is installed.", id="core.W002"))
+    for middleware in sorted(DEBUG_MIDDLEWARE & set(config.MIDDLEWARE)):
+        warnings.append(
+            Warning(f"Development middleware {middleware} is active.", id="core.W003")
+        )
+    for alias, database in config.DATABASES.items():
+        if not database.get("CONN_MAX_AGE"):
+            warnings.append(
+                Warning(
+                    f"Database {alias!r} opens a new connection per request.",
+                    hint="Set CONN_MAX_AGE to keep connections open.",
+                    id="core.W004",
+                )
+            )
+        elif not database.get("CONN_HEALTH_CHECKS"):
+            warnings.append(
+                Warning(
+                    f"Database {alias!r} reuses connections without checking them.",
+                    hint="Set CONN_HEALTH_CHECKS = True.",
+                    id="core.W005",
+                )
+            )
+    if not _template_loaders_cached(config):
+        warnings.append(
+            Warning(
+                "Templates are reloaded from disk on every render.",
+                hint="Use django.template.loaders.cached.Loader.",
+                id="core.W006",
+            )
+        )
+    session_engine = config.SESSION_ENGINE
+    if session_engine == "django.contrib.sessions.backends.db":
+        warnings.append(
+            Warning(
+                "Sessions are stored in the database.",
+                hint="Use the cache or signed_cookies session engine.",
+                id="core.W007",
+            )
+        )
+    elif session_engine.startswith("django.contrib.sessions.backends.cache") and (
+        config.CACHES["default"]["BACKEND"]
+        == "django.core.cache.backends.locmem.LocMemCache"
+    ):
+        warnings.append(
+            Warning(
+                "Sessions are cached in per-process memory and are lost "
+                "between workers.",
+                hint="Point CACHE_BACKEND at a shared cache.",
+                id="core.W008",
+            )
+        )
+    return warnings
+
+
+@register()
+def check_production_settings(app_configs, **kwargs):
+    if getattr(settings, "DJANGO_ENV", None) != "production":
+        return []
+    return throughput_warnings()
+
+
+@register(deploy=True)
+def check_deploy_settings(app_configs, **kwargs):
+    # Already reported by check_production_settings in production
+    if getattr(settings, "DJANGO_ENV", None) == "production":
+        return []
+    return throughput_warnings()
+
+
+def log_production_warnings():
+    """
+    Log what ``check_production_settings`` reports, for servers that load
+    the application without running the checks.
+    """
+    for warning in check_production_settings(None):
+        logger.warning("%s", warning)
@@ -0,0 +1,135 @@
+"""
+Read replica routing.
+
+``ReplicaRouter`` sends reads to one of the ``DATABASE_REPLICAS`` aliases
+while the current request allows it, and every write, and every read outside
+such requests, to ``default``. ``ReplicaMiddleware`` allows it for safe-method
+requests to views that declare ``replica_reads = True``, unless the client is
+pinned to the primary. Streaming responses are produced after the middleware
+returns, so they read from the primary.
+
+Read-your-writes: a write pins the rest of its request to the primary, and
+the response sets a short-lived cookie that pins the client's following
+requests too, for ``REPLICA_PIN_SECONDS``, which should exceed the
+replication lag.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_COOKIE = "read_primary"
+
+_current = contextvars.ContextVar("replica_routing", default=None)
+
+
+def get_replicas():
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+def _pin_seconds():
+    return getattr(settings, "REPLICA_PIN_SECONDS", 10)
+
+
+class RoutingState:
+    """
+    What the request being handled may read from, and whether it wrote.
+    Shared with the threads that run an async request's queries.
+    """
+
+    __slots__ = ("replica_reads", "wrote")
+
+    def __init__(self, replica_reads):
+        self.replica_reads = replica_reads
+        self.wrote = False
+
+
+@contextmanager
+def request_routing(replica_reads=False):
+    """
+    Route the queries run inside the block as those of one request.
+    """
+    state = RoutingState(replica_reads)
+    token = _current.set(state)
+    try:
+        yield state
+    finally:
+        _current.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or not state.replica_reads or state.wrote:
+            return None
+        replicas = get_replicas()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with request_routing() as state:
+            response = self.get_response(request)
+        return self.pin(request, response, state)
+
+    async def __acall__(self, request):
+        with request_routing() as state:
+            response = await self.get_response(request)
+        return self.pin(request, response, state)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, "cls", None) or getattr(
+            view_func, "view_class", None
+        )
+        _current.get().replica_reads = (
+            request.method in SAFE_METHODS
+            and PIN_COOKIE not in request.COOKIES
+            and getattr(view_class, "replica_reads", False)
+        )
+
+    def pin(self, request, response, state):
+        if not get_replicas():
+            return response
+        if state.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=_pin_seconds(),
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
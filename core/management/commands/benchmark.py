@@ -0,0 +1,153 @@
+import json
+import platform
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+from django.utils import timezone
+
+from core.benchmarks import SCENARIOS, BenchmarkError, compare, generate, run
+
+# The benchmark's quizzes must not touch the shared caches or leaderboards.
+ISOLATED_SETTINGS = {
+    "CACHES": {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "benchmark",
+        }
+    },
+    "QUIZ_CACHE_ALIAS": "default",
+    "LEADERBOARD_STORE": "quiz_attempts.leaderboard.MemoryLeaderboardStore",
+    "LEADERBOARD_STORE_OPTIONS": {},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the quiz and attempt APIs on a generated data set in a test "
+        "database, optionally comparing the results with a saved baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenarios",
+            nargs="*",
+            metavar="scenario",
+            help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)}).",
+        )
+        parser.add_argument("--list", action="store_true", help="List scenarios.")
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--quizzes", type=int, default=20)
+        parser.add_argument("--questions", type=int, default=10)
+        parser.add_argument("--attempts", type=int, default=200)
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument("--warmup", type=int, default=5)
+        parser.add_argument(
+            "--alloc-iterations",
+            type=int,
+            default=5,
+            help="Requests traced with tracemalloc, after the timed ones.",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument(
+            "--baseline", help="Fail on regressions against this results file."
+        )
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.25,
+            help="Allowed relative slowdown before a regression is reported.",
+        )
+
+    def handle(self, *args, **options):
+        if options["list"]:
+            for name in SCENARIOS:
+                self.stdout.write(name)
+            return
+
+        unknown = set(options["scenarios"]) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}.")
+
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)
+
+        verbosity = options["verbosity"]
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity, interactive=False, aliases={DEFAULT_DB_ALIAS}
+        )
+        try:
+            with override_settings(**ISOLATED_SETTINGS):
+                dataset = generate(
+                    users=options["users"],
+                    quizzes=options["quizzes"],
+                    questions=options["questions"],
+                    attempts=options["attempts"],
+                    seed=options["seed"],
+                )
+                report = {
+                    "meta": {
+                        "created": timezone.now().isoformat(),
+                        "python": platform.python_version(),
+                        "django": django.get_version(),
+                        "database": connections[DEFAULT_DB_ALIAS].vendor,
+                        "dataset": dataset.describe(),
+                    },
+                    "scenarios": run(
+                        dataset,
+                        options["scenarios"],
+                        iterations=options["iterations"],
+                        warmup=options["warmup"],
+                        alloc_iterations=options["alloc_iterations"],
+                        seed=options["seed"],
+                    ),
+                }
+        except BenchmarkError as error:
+            raise CommandError(str(error))
+        finally:
+            teardown_databases(old_config, verbosity)
+            teardown_test_environment()
+
+        self.write_report(report)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(report, output, indent=2)
+
+        if baseline is not None:
+            regressions = compare(
+                report["scenarios"], baseline["scenarios"], options["tolerance"]
+            )
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regressions.")
+            self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def write_report(self, report):
+        self.stdout.write(
+            " ".join(
+                f"{key}={value}" for key, value in report["meta"]["dataset"].items()
+            )
+        )
+        self.stdout.write(
+            f"{'scenario':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'queries':>9}"
+            f"{'peak KiB':>10}"
+        )
+        for name, result in report["scenarios"].items():
+            latency = result["latency_ms"]
+            peak = result.get("allocations_kib", {}).get("peak", 0)
+            self.stdout.write(
+                f"{name:<22}{latency['p50']:>9.2f}{latency['p95']:>9.2f}"
+                f"{latency['p99']:>9.2f}{result['queries']['max']:>9}{peak:>10.0f}"
+            )
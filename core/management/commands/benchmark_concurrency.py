@@ -0,0 +1,134 @@
+import json
+import os
+import random
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from core.benchmarks import BenchmarkError, concurrency, generate
+from .benchmark import ISOLATED_SETTINGS
+
+# Sync-only middleware would make Django run async views in a thread anyway.
+SYNC_ONLY_MIDDLEWARE = {"debug_toolbar.middleware.DebugToolbarMiddleware"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the sync attempt endpoints under WSGI with "
+        "their async counterparts under ASGI, for one burst of concurrent "
+        "requests against a generated data set in a test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "scenario",
+            nargs="?",
+            choices=sorted(concurrency.SCENARIOS),
+            default="submit",
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument(
+            "--concurrency", type=int, default=50, help="Concurrent clients."
+        )
+        parser.add_argument(
+            "--threads", type=int, default=4, help="Threads of the WSGI server."
+        )
+        parser.add_argument(
+            "--db-latency",
+            type=float,
+            default=0,
+            help="Milliseconds of simulated network latency added to each query.",
+        )
+        parser.add_argument("--users", type=int, default=50)
+        parser.add_argument("--quizzes", type=int, default=20)
+        parser.add_argument("--questions", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+
+    def handle(self, *args, **options):
+        verbosity = options["verbosity"]
+        connection = connections[DEFAULT_DB_ALIAS]
+        if connection.vendor == "sqlite":
+            # Concurrent writers to SQLite's shared in-memory test database
+            # fail on table locks; a file makes them wait for each other.
+            self.stderr.write(
+                "SQLite serializes writes; use PostgreSQL for representative "
+                "results."
+            )
+            database_dir = tempfile.TemporaryDirectory()
+            connection.settings_dict["TEST"]["NAME"] = os.path.join(
+                database_dir.name, "benchmark.sqlite3"
+            )
+        setup_test_environment()
+        old_config = setup_databases(
+            verbosity, interactive=False, aliases={DEFAULT_DB_ALIAS}
+        )
+        try:
+            middleware = [
+                middleware
+                for middleware in settings.MIDDLEWARE
+                if middleware not in SYNC_ONLY_MIDDLEWARE
+            ]
+            with override_settings(**ISOLATED_SETTINGS, MIDDLEWARE=middleware):
+                dataset = generate(
+                    users=options["users"],
+                    quizzes=options["quizzes"],
+                    questions=options["questions"],
+                    attempts=0,
+                    seed=options["seed"],
+                )
+                report = {
+                    "database": connections[DEFAULT_DB_ALIAS].vendor,
+                    "scenario": options["scenario"],
+                    "concurrency": options["concurrency"],
+                    "threads": options["threads"],
+                    "db_latency_ms": options["db_latency"],
+                    "results": concurrency.run(
+                        dataset,
+                        options["scenario"],
+                        random.Random(options["seed"]),
+                        requests=options["requests"],
+                        concurrency=options["concurrency"],
+                        threads=options["threads"],
+                        db_latency=options["db_latency"] / 1000,
+                    ),
+                }
+        except BenchmarkError as error:
+            raise CommandError(str(error))
+        finally:
+            teardown_databases(old_config, verbosity)
+            teardown_test_environment()
+
+        self.write_report(report)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(report, output, indent=2)
+
+    def write_report(self, report):
+        self.stdout.write(
+            f"{report['scenario']} on {report['database']}: "
+            f"{report['concurrency']} clients, {report['threads']} WSGI threads, "
+            f"{report['db_latency_ms']} ms simulated query latency"
+        )
+        self.stdout.write(
+            f"{'server':<8}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'errors':>8}"
+        )
+        for server, result in report["results"].items():
+            latency = result["latency_ms"]
+            self.stdout.write(
+                f"{server:<8}{result['throughput_rps']:>9.1f}{latency['p50']:>9.2f}"
+                f"{latency['p95']:>9.2f}{latency['p99']:>9.2f}{result['errors']:>8}"
+            )
+        wsgi, asgi = report["results"]["wsgi"], report["results"]["asgi"]
+        self.stdout.write(
+            f"ASGI throughput: {asgi['throughput_rps'] / wsgi['throughput_rps']:.2f}x"
+        )
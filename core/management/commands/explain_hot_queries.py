@@ -0,0 +1,137 @@
+import re
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from quiz_attempts.models import QuizAttempt, QuestionAttempt
+from quizzes.models import Quiz, Question, Answer
+
+
+def hot_queries(using):
+    """
+    ``(description, queryset, index)`` for each hot lookup path. ``index`` is
+    the name of the index the plan must use, or ``None`` for a unique
+    constraint's index, whose name depends on the database.
+    """
+    some_id, some_uuid = 0, uuid.uuid4()
+    return [
+        (
+            "A user's attempts, newest first",
+            QuizAttempt.objects.using(using)
+            .filter(user_id=some_id)
+            .order_by("-created")[:20],
+            "quizattempt_user_created_idx",
+        ),
+        (
+            "Expired open attempts (expire_attempts)",
+            QuizAttempt.objects.using(using).expired().order_by("expires")[:500],
+            "quizattempt_open_expires_idx",
+        ),
+        (
+            "An attempt's latest answer (answer timing)",
+            QuestionAttempt.objects.using(using)
+            .filter(quiz_attempt_id=some_id)
+            .order_by("-created")[:1],
+            "qattempt_attempt_created_idx",
+        ),
+        (
+            "A quiz's questions in order",
+            Question.objects.using(using)
+            .non_polymorphic()
+            .filter(quiz_id=some_uuid)
+            .order_by("order"),
+            "question_quiz_order_idx",
+        ),
+        (
+            "A question's answers in order",
+            Answer.objects.using(using).filter(question_id=some_uuid).order_by("order"),
+            None,
+        ),
+        (
+            "Published quizzes, newest first",
+            Quiz.objects.using(using)
+            .filter(status=Quiz.STATUS.published)
+            .order_by("-created")[:10],
+            "quiz_published_created_idx",
+        ),
+        (
+            "A quiz by slug",
+            Quiz.objects.using(using).filter(slug="some-quiz"),
+            None,
+        ),
+    ]
+
+
+def plan_problems(plan, vendor, table, index, ordered):
+    """
+    What's wrong with a query plan: a full scan of ``table``, a sort that
+    the index should have made unnecessary, or not using ``index``.
+    """
+    problems = []
+    if vendor == "postgresql":
+        full_scan = f"Seq Scan on {table}" in plan
+        sort = re.search(r"^\s*(->\s*)?(Incremental )?Sort\b", plan, re.MULTILINE)
+    elif vendor == "sqlite":
+        full_scan = re.search(rf"\bSCAN {table}\b(?! USING)", plan)
+        sort = "TEMP B-TREE FOR ORDER BY" in plan
+    else:
+        full_scan = sort = False
+    if full_scan:
+        problems.append(f"scans all of {table}")
+    if ordered and sort:
+        problems.append("sorts the rows instead of reading them in index order")
+    if index and index not in plan:
+        problems.append(f"doesn't use {index}")
+    return problems
+
+
+class Command(BaseCommand):
+    help = (
+        "Run EXPLAIN on the hot lookup paths and verify that each plan uses "
+        "the index meant for it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            "--real-costs",
+            action="store_true",
+            help=(
+                "On PostgreSQL, leave sequential scans enabled, so the plans "
+                "are the ones chosen for the current table sizes. Small "
+                "tables are then scanned whatever their indexes."
+            ),
+        )
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        vendor = connections[using].vendor
+        failures = 0
+        with transaction.atomic(using=using):
+            if vendor == "postgresql" and not options["real_costs"]:
+                with connections[using].cursor() as cursor:
+                    cursor.execute("SET LOCAL enable_seqscan = off")
+
+            for description, queryset, index in hot_queries(using):
+                plan = queryset.explain()
+                problems = plan_problems(
+                    plan,
+                    vendor,
+                    queryset.model._meta.db_table,
+                    index,
+                    bool(queryset.query.order_by),
+                )
+                if problems:
+                    failures += 1
+                    self.stdout.write(
+                        self.style.ERROR(f"FAIL {description}: {'; '.join(problems)}")
+                    )
+                else:
+                    self.stdout.write(f"ok   {description}: {index or 'unique index'}")
+                if problems or options["verbosity"] > 1:
+                    self.stdout.write(f"{plan}\n")
+
+        if failures:
+            raise CommandError(f"{failures} hot queries don't use their index.")
+        self.stdout.write(self.style.SUCCESS("Every hot query uses its index."))
@@ -0,0 +1,153 @@
+"""
+In-process metrics, rendered in the Prometheus text format.
+
+Every worker process keeps its own registry; scrape each process, or run a
+single worker per metrics port.
+"""
+import threading
+from bisect import bisect_left
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        """
+        Yield ``(labels, cumulative bucket counts, sum, count)`` per series.
+        """
+        with self._lock:
+            snapshot = [
+                (key, list(counts), total, count)
+                for key, (counts, total, count) in self._series.items()
+            ]
+        for key, counts, total, count in snapshot:
+            cumulative, running = [], 0
+            for bucket_count in counts:
+                running += bucket_count
+                cumulative.append(running)
+            yield dict(key), cumulative, total, count
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, cumulative, total, count in self.collect():
+            for bound, value in zip(self.buckets + ("+Inf",), cumulative):
+                lines.append(f"{self.name}_bucket{_labels(labels, le=bound)} {value}")
+            lines.append(f"{self.name}_sum{_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_labels(labels)} {count}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+class Counter:
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def render(self):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        with self._lock:
+            series = list(self._series.items())
+        for key, value in series:
+            lines.append(f"{self.name}{_labels(dict(key))} {value}")
+        return lines
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def histogram(self, name, documentation, buckets=SECONDS_BUCKETS):
+        metric = Histogram(name, documentation, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation):
+        metric = Counter(name, documentation)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        return (
+            "\n".join(line for metric in self.metrics for line in metric.render())
+            + "\n"
+        )
+
+    def clear(self):
+        for metric in self.metrics:
+            metric.clear()
+
+
+registry = Registry()
+
+requests_total = registry.counter(
+    "quiz_http_requests_total", "Requests handled, by view, method and status."
+)
+request_duration = registry.histogram(
+    "quiz_http_request_duration_seconds", "Wall time of requests, by view."
+)
+db_queries = registry.histogram(
+    "quiz_db_queries_per_request", "Database queries per request.", QUERY_BUCKETS
+)
+db_duration = registry.histogram(
+    "quiz_db_duration_seconds", "Time spent in database queries per request."
+)
+serializer_duration = registry.histogram(
+    "quiz_serializer_duration_seconds", "Time spent serializing per request."
+)
+response_size = registry.histogram(
+    "quiz_http_response_size_bytes", "Size of non-streaming responses.", BYTES_BUCKETS
+)
+payload_cache_lookups = registry.counter(
+    "quiz_payload_cache_lookups_total", "Quiz payload cache lookups, by result."
+)
@@ -0,0 +1,214 @@
+"""
+Per-request performance instrumentation.
+
+``PerformanceMiddleware`` times a sample of requests, sync or async, and
+records their database queries through an execute wrapper installed on every
+connection, the time spent in serializers using ``TimedSerializerMixin``, and
+the response size. Each sampled request is logged as one JSON line on the
+``core.performance`` logger and counted in the histograms of
+``core.metrics``, labelled with the URL name of its view. Requests slower
+than the threshold are logged as warnings with their SQL.
+
+Configured with the ``PERFORMANCE_METRICS`` setting, see ``DEFAULTS``.
+"""
+import contextvars
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics
+
+logger = logging.getLogger("core.performance")
+
+DEFAULTS = {
+    # Fraction of requests instrumented; the others pass straight through.
+    # Off unless configured, so tests and benchmarks don't log every request.
+    "SAMPLE_RATE": 0.0,
+    # Sampled requests slower than this are logged with their SQL.
+    "SLOW_REQUEST_MS": 500,
+    # Most statements kept per request for slow request logs.
+    "MAX_CAPTURED_QUERIES": 50,
+}
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "PERFORMANCE_METRICS", {})}
+
+
+class RequestMetrics:
+    __slots__ = (
+        "queries",
+        "db_time",
+        "serializer_time",
+        "serializer_depth",
+        "statements",
+        "max_statements",
+    )
+
+    def __init__(self, max_statements):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.statements = []
+        self.max_statements = max_statements
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            if len(self.statements) < self.max_statements:
+                self.statements.append((sql, elapsed))
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Execute wrapper installed on every connection. It records into the
+    metrics of the current context, which async requests share with the
+    threads running their queries.
+    """
+    request_metrics = _current.get()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+    return request_metrics(execute, sql, params, many, context)
+
+
+def install_query_hook(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_hook)
+
+
+def current_metrics():
+    """
+    The metrics of the request being handled, or ``None`` if it isn't sampled.
+    """
+    return _current.get()
+
+
+class TimedSerializerMixin:
+    """
+    Adds the time spent in ``to_representation`` to the current request's
+    metrics. Only the outermost timed serializer is measured, so nested ones
+    aren't counted twice.
+    """
+
+    def to_representation(self, instance):
+        request_metrics = _current.get()
+        if request_metrics is None or request_metrics.serializer_depth:
+            return super().to_representation(instance)
+
+        request_metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            request_metrics.serializer_depth -= 1
+            request_metrics.serializer_time += time.perf_counter() - started
+
+
+class PerformanceMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        config = get_config()
+        self.sample_rate = config["SAMPLE_RATE"]
+        self.slow_seconds = config["SLOW_REQUEST_MS"] / 1000
+        self.max_statements = config["MAX_CAPTURED_QUERIES"]
+        # Connections opened before this module was imported
+        for connection in connections.all():
+            install_query_hook(connection)
+
+    def sampled(self):
+        return self.sample_rate >= 1 or random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.sampled():
+            return self.get_response(request)
+
+        request_metrics = RequestMetrics(self.max_statements)
+        token = _current.set(request_metrics)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        self.record(request, response, request_metrics, duration)
+        return response
+
+    async def __acall__(self, request):
+        if not self.sampled():
+            return await self.get_response(request)
+
+        request_metrics = RequestMetrics(self.max_statements)
+        token = _current.set(request_metrics)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        duration = time.perf_counter() - started
+
+        self.record(request, response, request_metrics, duration)
+        return response
+
+    def record(self, request, response, request_metrics, duration):
+        match = request.resolver_match
+        view = (match.url_name if match else None) or "unmatched"
+        size = None if getattr(response, "streaming", False) else len(response.content)
+
+        metrics.requests_total.inc(
+            view=view, method=request.method, status=response.status_code
+        )
+        metrics.request_duration.observe(duration, view=view)
+        metrics.db_queries.observe(request_metrics.queries, view=view)
+        metrics.db_duration.observe(request_metrics.db_time, view=view)
+        metrics.serializer_duration.observe(request_metrics.serializer_time, view=view)
+        if size is not None:
+            metrics.response_size.observe(size, view=view)
+
+        line = {
+            "event": "request",
+            "view": view,
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round(duration * 1000, 2),
+            "db_queries": request_metrics.queries,
+            "db_ms": round(request_metrics.db_time * 1000, 2),
+            "serializer_ms": round(request_metrics.serializer_time * 1000, 2),
+            "response_bytes": size,
+        }
+        if duration < self.slow_seconds:
+            logger.info(json.dumps(line), extra={"performance": line})
+            return
+
+        line["event"] = "slow_request"
+        line["sql"] = [
+            {"sql": sql, "ms": round(elapsed * 1000, 2)}
+            for sql, elapsed in request_metrics.statements
+        ]
+        logger.warning(json.dumps(line), extra={"performance": line})
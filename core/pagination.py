@@ -0,0 +1,43 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedCursorPagination(CursorPagination):
+    """
+    Keyset pagination over the newest-first ``created`` ordering.
+
+    Each page is a ``WHERE created < <cursor> ORDER BY created DESC LIMIT n``
+    range scan on an index that ends in ``created``, so deep pages cost the
+    same as the first one and no ``COUNT(*)`` is run. Rows created at the
+    same instant are ordered by primary key, so the cursor's offset past
+    them points at the same rows from one page to the next.
+    """
+
+    ordering = ("-created", "-pk")
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+
+class QuizCursorPagination(CreatedCursorPagination):
+    # Every quiz carries its questions and answers
+    page_size = 10
+    max_page_size = 25
+
+
+class AnswerCursorPagination(CreatedCursorPagination):
+    max_page_size = 200
+
+
+class QuizAttemptCursorPagination(CreatedCursorPagination):
+    max_page_size = 100
+
+
+class SearchPagination(PageNumberPagination):
+    """
+    Page numbers for relevance-ordered results, which have no stable column
+    to keep a cursor on.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 50
@@ -0,0 +1,100 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+from quizzes.models import Quiz
+from quizzes.services import bulk_create_questions
+
+
+@contextmanager
+def query_budget(budget, using=DEFAULT_DB_ALIAS):
+    """
+    Fail when the block runs more than ``budget`` queries.
+
+    Unlike ``assertNumQueries`` this allows fewer queries, so a budget only has
+    to be updated when an endpoint gets slower, not when it gets faster.
+    """
+    with CaptureQueriesContext(connections[using]) as context:
+        yield context
+
+    if len(context) > budget:
+        queries = "\n".join(
+            f"{number}. {query['sql']}"
+            for number, query in enumerate(context.captured_queries, start=1)
+        )
+        raise AssertionError(
+            f"{len(context)} queries executed, budget is {budget}:\n{queries}"
+        )
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin for checking views against their declared ``query_budget``.
+    """
+
+    def assertWithinQueryBudget(self, view_class, using=DEFAULT_DB_ALIAS):
+        return query_budget(view_class.query_budget, using=using)
+
+
+@contextmanager
+def sqlite_database(alias):
+    """
+    Add a database ``alias``: an SQLite file in a temporary directory with the
+    project's tables, e.g. as a stand-in for a replica. Test cases enter it
+    in ``setUpClass`` and leave it in ``tearDownClass``, so it isn't one of
+    their ``databases`` and isn't rolled back between tests.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        connections.settings[alias] = connections.configure_settings(
+            {
+                DEFAULT_DB_ALIAS: connections.settings[DEFAULT_DB_ALIAS],
+                alias: {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": os.path.join(directory, "db.sqlite3"),
+                },
+            }
+        )[alias]
+        try:
+            call_command("migrate", database=alias, run_syncdb=True, verbosity=0)
+            yield connections[alias]
+        finally:
+            connections[alias].close()
+            del connections[alias]
+            del connections.settings[alias]
+
+
+def make_quiz(author, title, question_count):
+    """
+    A published quiz of alternating true/false (correct answer "True") and
+    multiple choice (correct answer "Right") questions.
+    """
+    quiz = Quiz.objects.create(title=title, author=author, status=Quiz.STATUS.published)
+    questions_data = []
+    for order in range(1, question_count + 1):
+        if order % 2:
+            questions_data.append(
+                {
+                    "question_type": "true_false",
+                    "question_text": f"Question {order}",
+                    "correct_answer": "true",
+                    "order": order,
+                }
+            )
+        else:
+            questions_data.append(
+                {
+                    "question_type": "multiple_choice",
+                    "question_text": f"Question {order}",
+                    "order": order,
+                    "question_answers": [
+                        {"answer_text": "Right", "is_correct": True},
+                        {"answer_text": "Wrong"},
+                    ],
+                }
+            )
+    bulk_create_questions(quiz, questions_data, author=author)
+    return quiz
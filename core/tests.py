@@ -1,3 +1,300 @@
-from django.test import TestCase
+import importlib
+import json
+from types import SimpleNamespace
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.http import Http404, JsonResponse
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+
+from profiles.models import Student, Teacher
+from profiles.permissions import IsTeacher
+from profiles.serializers import ClaimsTokenObtainPairSerializer
+from quizzes.models import Quiz
+from . import checks, metrics
+from .async_views import AsyncAPIView
+from .benchmarks import SCENARIOS, compare, generate, run
+from .db_routers import PIN_COOKIE, ReplicaRouter, request_routing
+from .testing import sqlite_database
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = generate(users=10, quizzes=2, questions=4, attempts=5)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_every_scenario_runs(self):
+        results = run(self.dataset, iterations=2, warmup=1, alloc_iterations=1)
+
+        self.assertEqual(set(results), set(SCENARIOS))
+        for result in results.values():
+            self.assertEqual(
+                set(result), {"iterations", "latency_ms", "queries", "allocations_kib"}
+            )
+            self.assertGreater(result["queries"]["max"], 0)
+
+    def test_compare_reports_regressions(self):
+        baseline = {
+            "quiz_detail": {
+                "latency_ms": {"p50": 10.0, "p95": 20.0},
+                "queries": {"max": 5},
+            }
+        }
+        result = {
+            "quiz_detail": {
+                "latency_ms": {"p50": 11.0, "p95": 30.0},
+                "queries": {"max": 6},
+            }
+        }
+
+        regressions = compare(result, baseline, tolerance=0.25)
+
+        self.assertEqual(len(regressions), 2)
+        self.assertIn("p95 latency", regressions[0])
+        self.assertIn("max queries", regressions[1])
+
+
+@override_settings(
+    PERFORMANCE_METRICS={"SAMPLE_RATE": 1.0, "SLOW_REQUEST_MS": 60_000, "TOKEN": "t"}
+)
+class PerformanceMiddlewareTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.dataset = generate(users=2, quizzes=2, questions=2, attempts=0)
+
+    def setUp(self):
+        cache.clear()
+        metrics.registry.clear()
+
+    def test_sampled_requests_are_logged(self):
+        with self.assertLogs("core.performance", "INFO") as logs:
+            response = self.client.get(reverse("quiz_list_create"))
+
+        (record,) = logs.records
+        line = record.performance
+        self.assertEqual(record.levelname, "INFO")
+        self.assertEqual(line["event"], "request")
+        self.assertEqual(line["view"], "quiz_list_create")
+        self.assertEqual(line["method"], "GET")
+        self.assertEqual(line["status"], 200)
+        self.assertGreater(line["db_queries"], 0)
+        self.assertGreater(line["serializer_ms"], 0)
+        self.assertEqual(line["response_bytes"], len(response.content))
+        self.assertNotIn("sql", line)
+
+    def test_slow_requests_are_logged_with_their_sql(self):
+        with self.settings(
+            PERFORMANCE_METRICS={"SAMPLE_RATE": 1.0, "SLOW_REQUEST_MS": 0}
+        ):
+            with self.assertLogs("core.performance", "WARNING") as logs:
+                self.client.get(reverse("quiz_list_create"))
+
+        line = logs.records[0].performance
+        self.assertEqual(line["event"], "slow_request")
+        self.assertEqual(len(line["sql"]), line["db_queries"])
+        self.assertTrue(
+            any("quizzes_quiz" in statement["sql"] for statement in line["sql"])
+        )
+
+    def test_requests_are_not_sampled_by_default(self):
+        with self.settings(PERFORMANCE_METRICS={}):
+            with self.assertNoLogs("core.performance"):
+                self.client.get(reverse("quiz_list_create"))
+
+    def test_metrics_endpoint(self):
+        with self.assertLogs("core.performance"):
+            self.client.get(reverse("quiz_list_create"))
+            forbidden = self.client.get(reverse("metrics"))
+            response = self.client.get(
+                reverse("metrics"), HTTP_AUTHORIZATION="Bearer t"
+            )
+
+        self.assertEqual(forbidden.status_code, 403)
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn(
+            'quiz_http_requests_total{method="GET",status="200",'
+            'view="quiz_list_create"} 1',
+            body,
+        )
+        self.assertIn(
+            'quiz_db_queries_per_request_count{view="quiz_list_create"} 1', body
+        )
+
+
+class ReplicaRoutingTests(APITestCase):
+    """
+    The replica is a separate SQLite database, so which one a request read
+    from shows in what it returns. Nothing writes to it after ``setUpClass``.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.replica = sqlite_database("replica")
+        cls.replica.__enter__()
+        Quiz.objects.using("replica").create(
+            title="Replica quiz", status=Quiz.STATUS.published
+        )
+        # Only now, as the router keeps the schema off replicas
+        cls.replicas = override_settings(DATABASE_REPLICAS=["replica"])
+        cls.replicas.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.replicas.disable()
+        cls.replica.__exit__(None, None, None)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        Quiz.objects.create(title="Primary quiz", status=Quiz.STATUS.published)
+
+    def setUp(self):
+        cache.clear()
+
+    def list_titles(self):
+        response = self.client.get(reverse("quiz_list_create"))
+        self.assertEqual(response.status_code, 200)
+        return [quiz["title"] for quiz in response.data["results"]]
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertEqual(self.list_titles(), ["Replica quiz"])
+
+    def test_views_without_replica_reads_read_from_the_primary(self):
+        url = reverse("quiz_detail", kwargs={"slug": "primary-quiz"})
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        url = reverse("quiz_detail", kwargs={"slug": "replica-quiz"})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.post(
+            reverse("quiz_list_create"),
+            {
+                "title": "New quiz",
+                "status": Quiz.STATUS.published,
+                "quiz_questions": [
+                    {
+                        "question_type": "multiple_choice",
+                        "question_text": "Question",
+                        "order": 1,
+                        "question_answers": [
+                            {"answer_text": "Right", "is_correct": True},
+                            {"answer_text": "Wrong"},
+                        ],
+                    }
+                ],
+            },
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+        self.assertCountEqual(self.list_titles(), ["Primary quiz", "New quiz"])
+
+    def test_reads_after_a_write_use_the_primary(self):
+        router = ReplicaRouter()
+        with request_routing(replica_reads=True):
+            self.assertEqual(router.db_for_read(Quiz), "replica")
+            router.db_for_write(Quiz)
+            self.assertIsNone(router.db_for_read(Quiz))
+        self.assertIsNone(router.db_for_read(Quiz))
+
+
+class ThroughputChecksTests(SimpleTestCase):
+    def test_production_settings_pass(self):
+        production = importlib.import_module("project.settings_production")
+
+        self.assertEqual(checks.throughput_warnings(production), [])
+        self.assertFalse(checks.DEBUG_APPS & set(production.INSTALLED_APPS))
+
+    def test_costly_settings_are_reported(self):
+        config = SimpleNamespace(
+            DEBUG=True,
+            INSTALLED_APPS=["debug_toolbar"],
+            MIDDLEWARE=list(checks.DEBUG_MIDDLEWARE),
+            DATABASES={"default": {}, "replica": {"CONN_MAX_AGE": 60}},
+            TEMPLATES=[{"BACKEND": "django.template.backends.django.DjangoTemplates"}],
+            SESSION_ENGINE="django.contrib.sessions.backends.db",
+            CACHES={},
+        )
+
+        self.assertEqual(
+            [warning.id for warning in checks.throughput_warnings(config)],
+            [f"core.W00{number}" for number in range(1, 8)],
+        )
+
+    def test_warnings_are_logged_at_startup_in_production(self):
+        with override_settings(DEBUG=True):
+            with self.assertNoLogs("core.checks"):
+                checks.log_production_warnings()
+            with override_settings(DJANGO_ENV="production"), self.assertLogs(
+                "core.checks", "WARNING"
+            ) as logs:
+                checks.log_production_warnings()
+
+        self.assertIn("core.W001", logs.output[0])
+
+
+class TeacherOnlyView(AsyncAPIView):
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    async def get(self, request, *args, **kwargs):
+        return JsonResponse({"user": request.user.username})
+
+    async def delete(self, request, *args, **kwargs):
+        raise Http404
+
+
+class AsyncAPIViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        cls.student = Student.objects.create(username="student")
+
+    def call(self, method, user=None, **extra):
+        request = getattr(APIRequestFactory(), method)("/", **extra)
+        if user is not None:
+            force_authenticate(request, user)
+        return async_to_sync(TeacherOnlyView.as_view())(request)
+
+    def assertDetail(self, response, status_code):
+        self.assertEqual(response.status_code, status_code)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertIn("detail", json.loads(response.content))
+
+    def test_handlers_render_their_response(self):
+        response = self.call("get", self.teacher)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), {"user": "teacher"})
+
+    def test_bearer_tokens_are_authenticated(self):
+        token = ClaimsTokenObtainPairSerializer.get_token(self.teacher).access_token
+
+        response = self.call("get", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_anonymous_requests_are_asked_to_authenticate(self):
+        response = self.call("get")
+
+        self.assertDetail(response, 401)
+        self.assertTrue(response.has_header("WWW-Authenticate"))
+        self.assertDetail(self.call("get", HTTP_AUTHORIZATION="Bearer nope"), 401)
+
+    def test_permissions_are_enforced(self):
+        self.assertDetail(self.call("get", self.student), 403)
+
+    def test_errors_are_rendered_like_drf(self):
+        self.assertDetail(self.call("delete", self.teacher), 404)
+        self.assertDetail(self.call("post", self.teacher), 405)
@@ -1,3 +1,24 @@
-from django.shortcuts import render
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
 
-# Create your views here.
+from . import metrics
+from .middleware import get_config
+
+
+def metrics_view(request):
+    """
+    This process's metrics in the Prometheus text format, for staff users or
+    scrapers sending ``Authorization: Bearer <PERFORMANCE_METRICS["TOKEN"]>``.
+    """
+    token = get_config().get("TOKEN")
+    authorized = request.user.is_staff or (
+        token
+        and constant_time_compare(
+            request.headers.get("Authorization", ""), f"Bearer {token}"
+        )
+    )
+    if not authorized:
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.registry.render(), content_type="text/plain; version=0.0.4"
+    )
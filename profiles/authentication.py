@@ -0,0 +1,166 @@
+"""
+JWT authentication that trusts the claims of the access token.
+
+Access tokens carry the user's id, username, type and staff flag (see
+``profiles.serializers.ClaimsTokenObtainPairSerializer``). For safe methods
+``ClaimsJWTCookieAuthentication`` builds the user from those claims, so a GET
+doesn't query the user table; requests that write get the real user, read
+through a short-lived cache of user rows.
+
+Tokens are revoked through a denylist in the cache: single access tokens by
+their ``jti`` on logout, and every token of a user obtained before a change
+to their username, type, staff flag, password or active flag. Each request
+checks both in a single cache round trip.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db import router
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from dj_rest_auth.jwt_auth import JWTCookieAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+# User fields embedded in access tokens; changing one revokes the user's tokens.
+CLAIMS = ("username", "type", "is_staff")
+REVOKING_FIELDS = CLAIMS + ("password", "is_active")
+
+# When the user last logged in, carried over to refreshed access tokens.
+AUTH_TIME_CLAIM = "auth_time"
+
+
+def _cache():
+    return caches[getattr(settings, "AUTH_CACHE_ALIAS", "default")]
+
+
+def _user_timeout():
+    return getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 60)
+
+
+def _user_key(user_id):
+    return f"auth:user:{user_id}:row"
+
+
+def _user_revoked_key(user_id):
+    return f"auth:user:{user_id}:revoked"
+
+
+def _token_revoked_key(jti):
+    return f"auth:token:{jti}:revoked"
+
+
+# Cached user rows
+def _cached_fields(model):
+    # The password hash never leaves the database; it loads on access
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.attname != "password"
+    ]
+
+
+def cached_user(user_id, cached=None):
+    """
+    The user with ``user_id``, from the cache when it was loaded recently.
+
+    Only the column values are cached, without the password, and the user is
+    rebuilt from them with the password deferred.
+    """
+    model = get_user_model()
+    fields = _cached_fields(model)
+    row = cached if cached is not None else _cache().get(_user_key(user_id))
+    if row is None:
+        row = model.objects.filter(pk=user_id).values(*fields).first()
+        if row is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        _cache().set(_user_key(user_id), row, _user_timeout())
+    if not row["is_active"]:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    return model.from_db(
+        router.db_for_read(model), fields, [row[field] for field in fields]
+    )
+
+
+def forget_user(user_id):
+    _cache().delete(_user_key(user_id))
+
+
+# Denylist
+def revoke_token(token):
+    """
+    Reject ``token`` until it expires.
+    """
+    remaining = token["exp"] - time.time()
+    if remaining > 0:
+        _cache().set(
+            _token_revoked_key(token[jwt_settings.JTI_CLAIM]), True, int(remaining) + 1
+        )
+
+
+def revoke_user(user_id):
+    """
+    Reject every token of the user obtained until now. Kept as long as a
+    refresh token lives, so tokens refreshed afterwards are rejected too.
+    """
+    _cache().set(
+        _user_revoked_key(user_id),
+        time.time(),
+        int(jwt_settings.REFRESH_TOKEN_LIFETIME.total_seconds()),
+    )
+
+
+class ClaimsUser(TokenUser):
+    """
+    A user built from the claims of an access token. Attributes that aren't
+    claims are read from the cached user row.
+    """
+
+    @cached_property
+    def type(self):
+        return self.token["type"]
+
+    @cached_property
+    def user(self):
+        return cached_user(self.id)
+
+    def __getattr__(self, name):
+        if name.startswith("_") or name == "token":
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+class ClaimsJWTCookieAuthentication(JWTCookieAuthentication):
+    def authenticate(self, request):
+        self.request = request
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(jwt_settings.USER_ID_CLAIM)
+        if user_id is None:
+            return super().get_user(validated_token)
+
+        keys = [
+            _token_revoked_key(validated_token[jwt_settings.JTI_CLAIM]),
+            _user_revoked_key(user_id),
+        ]
+        safe = self.request.method in SAFE_METHODS
+        if not safe:
+            keys.append(_user_key(user_id))
+        found = _cache().get_many(keys)
+
+        if keys[0] in found:
+            raise AuthenticationFailed(_("Token has been revoked"), code="revoked")
+        auth_time = validated_token.get(AUTH_TIME_CLAIM)
+        revoked = found.get(keys[1])
+        if revoked is not None and (auth_time is None or auth_time <= revoked):
+            raise AuthenticationFailed(_("Token has been revoked"), code="revoked")
+
+        # Tokens obtained before the claims were added fall back to the row
+        if safe and all(claim in validated_token for claim in CLAIMS):
+            return ClaimsUser(validated_token)
+        return cached_user(user_id, found.get(_user_key(user_id)))
@@ -1,6 +1,11 @@
+import time
+
 from dj_rest_auth.serializers import JWTSerializer
 from dj_rest_auth.registration.serializers import RegisterSerializer
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+
+from .authentication import AUTH_TIME_CLAIM, CLAIMS
 
 
 class CustomJWTSerializer(JWTSerializer):
@@ -11,6 +16,20 @@ class CustomJWTSerializer(JWTSerializer):
         return data
 
 
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Embeds the claims read by ClaimsJWTCookieAuthentication in the tokens.
+    """
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        for claim in CLAIMS:
+            token[claim] = getattr(user, claim)
+        token[AUTH_TIME_CLAIM] = time.time()
+        return token
+
+
 class CustomRegisterSerializer(RegisterSerializer):
     first_name = serializers.CharField(required=True)
     last_name = serializers.CharField(
@@ -0,0 +1,45 @@
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import authentication
+from .models import User, Student, Teacher
+
+
+@receiver(pre_save, sender=User)
+@receiver(pre_save, sender=Student)
+@receiver(pre_save, sender=Teacher)
+def revoke_changed_claims(sender, instance, update_fields=None, **kwargs):
+    """
+    Revoke the user's tokens when a field they carry or depend on changes.
+    """
+    if instance._state.adding or instance.pk is None:
+        return
+    fields = authentication.REVOKING_FIELDS
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+        if not fields:
+            return
+    previous = User.objects.filter(pk=instance.pk).values(*fields).first()
+    if previous and any(
+        previous[field] != getattr(instance, field) for field in fields
+    ):
+        authentication.revoke_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=Student)
+@receiver(post_save, sender=Teacher)
+@receiver(post_delete, sender=User)
+@receiver(post_delete, sender=Student)
+@receiver(post_delete, sender=Teacher)
+def forget_cached_user(sender, instance, **kwargs):
+    authentication.forget_user(instance.pk)
+
+
+@receiver(user_logged_out)
+def revoke_access_token(sender, request, **kwargs):
+    token = getattr(request, "auth", None)
+    if isinstance(token, AccessToken):
+        authentication.revoke_token(token)
@@ -1,3 +1,76 @@
+from django.core.cache import cache
 from django.test import TestCase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIRequestFactory
 
-# Create your tests here.
+from . import authentication
+from .models import Teacher, User
+from .serializers import ClaimsTokenObtainPairSerializer
+
+
+class ClaimsAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = Teacher(username="teacher")
+        cls.user.set_password("secret")
+        cls.user.save()
+
+    def setUp(self):
+        cache.clear()
+        self.token = ClaimsTokenObtainPairSerializer.get_token(self.user).access_token
+
+    def authenticate(self, method="get", token=None):
+        request = getattr(APIRequestFactory(), method)(
+            "/", HTTP_AUTHORIZATION=f"Bearer {token or self.token}"
+        )
+        user, _ = authentication.ClaimsJWTCookieAuthentication().authenticate(request)
+        return user
+
+    def assertRejected(self, code, method="get"):
+        with self.assertRaises(AuthenticationFailed) as context:
+            self.authenticate(method)
+        self.assertEqual(context.exception.get_codes(), code)
+
+    def test_reads_trust_the_claims(self):
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+
+        self.assertIsInstance(user, authentication.ClaimsUser)
+        self.assertEqual(user.id, self.user.pk)
+        self.assertEqual(user.username, "teacher")
+        self.assertEqual(user.type, User.Types.TEACHER)
+
+    def test_writes_load_the_user_once_without_the_password(self):
+        with self.assertNumQueries(1):
+            user = self.authenticate("post")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate("post"), user)
+
+        self.assertIsInstance(user, User)
+        self.assertEqual(user.type, User.Types.TEACHER)
+        cached = cache.get(authentication._user_key(self.user.pk))
+        self.assertNotIn("password", cached)
+        self.assertEqual(user.get_deferred_fields(), {"password"})
+        self.assertTrue(user.check_password("secret"))
+
+    def test_revoked_tokens_are_rejected(self):
+        authentication.revoke_token(self.token)
+
+        self.assertRejected("revoked")
+
+    def test_tokens_are_revoked_when_the_password_changes(self):
+        self.user.set_password("changed")
+        self.user.save()
+
+        self.assertRejected("revoked")
+        self.assertRejected("revoked", method="post")
+
+    def test_deactivated_users_are_rejected(self):
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertRejected("revoked")
+
+        # Even without a revocation, writes check the user row
+        cache.clear()
+        self.assertRejected("user_inactive", method="post")
@@ -0,0 +1,10 @@
+import os
+
+
+def settings_module():
+    """
+    The settings module for the DJANGO_ENV environment variable.
+    """
+    if os.environ.get("DJANGO_ENV") == "production":
+        return "project.settings_production"
+    return "project.settings"
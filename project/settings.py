@@ -27,6 +27,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get("SECRET_KEY")
 
+# Deployment environment; DJANGO_ENV=production selects
+# project/settings_production.py.
+DJANGO_ENV = os.environ.get("DJANGO_ENV", "development")
+
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
@@ -66,7 +70,11 @@ ACCOUNT_EMAIL_VERIFICATION = "none"
 SITE_ID = 1
 
 REST_FRAMEWORK = {
-    "DEFAULT_AUTHENTICATION_CLASSES": ("dj_rest_auth.jwt_auth.JWTCookieAuthentication",)
+    "DEFAULT_AUTHENTICATION_CLASSES": (
+        "profiles.authentication.ClaimsJWTCookieAuthentication",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.CreatedCursorPagination",
+    "PAGE_SIZE": 20,
 }
 
 REST_AUTH = {
@@ -74,6 +82,9 @@ REST_AUTH = {
     "JWT_AUTH_COOKIE": "access",
     "JWT_AUTH_REFRESH_COOKIE": "refresh",
     "JWT_SERIALIZER": "profiles.serializers.CustomJWTSerializer",
+    "JWT_TOKEN_CLAIMS_SERIALIZER": (
+        "profiles.serializers.ClaimsTokenObtainPairSerializer"
+    ),
     "REGISTER_SERIALIZER": "profiles.serializers.CustomRegisterSerializer",
     "JWT_AUT_COOKIE_USE_CSRF": True,
     "JWT_AUTH_HTTPONLY": True,
@@ -90,6 +101,8 @@ SIMPLE_JWT = {
 }
 
 MIDDLEWARE = [
+    "core.middleware.PerformanceMiddleware",
+    "core.db_routers.ReplicaMiddleware",
     "debug_toolbar.middleware.DebugToolbarMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -136,6 +149,50 @@ DATABASES = {
     }
 }
 
+# Read replicas (see core/db_routers.py): aliases in DATABASES that safe
+# requests to views with replica_reads = True read from. Clients are pinned
+# to the primary for REPLICA_PIN_SECONDS after a write.
+DATABASE_REPLICAS = []
+DATABASE_ROUTERS = ["core.db_routers.ReplicaRouter"]
+REPLICA_PIN_SECONDS = 10
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory by default; point CACHE_BACKEND/CACHE_LOCATION at a shared
+# cache (e.g. django.core.cache.backends.redis.RedisCache) when running more
+# than one process.
+
+CACHES = {
+    "default": {
+        "BACKEND": os.environ.get(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("CACHE_LOCATION", "quiz-drf"),
+    }
+}
+
+# Published quiz payloads (see quizzes/cache.py):
+QUIZ_CACHE_ALIAS = "default"
+QUIZ_CACHE_TIMEOUT = 60 * 60
+
+# Answer keys kept in memory per process for grading (see quizzes/answer_keys.py):
+QUIZ_ANSWER_KEY_CACHE_SIZE = 256
+
+# Leaderboards (see quiz_attempts/leaderboard.py). The in-process store is per
+# process; use the Redis store, e.g. LEADERBOARD_STORE_URL=redis://..., when
+# running several workers.
+if os.environ.get("LEADERBOARD_STORE_URL"):
+    LEADERBOARD_STORE = "quiz_attempts.leaderboard.RedisLeaderboardStore"
+    LEADERBOARD_STORE_OPTIONS = {"url": os.environ["LEADERBOARD_STORE_URL"]}
+else:
+    LEADERBOARD_STORE = "quiz_attempts.leaderboard.MemoryLeaderboardStore"
+    LEADERBOARD_STORE_OPTIONS = {}
+
+# Cached user rows and the token denylist (see profiles/authentication.py).
+# Revocations only reach every process through a shared cache.
+AUTH_CACHE_ALIAS = "default"
+AUTH_USER_CACHE_TIMEOUT = 60
+
 # AUTH_USER Setting:
 AUTH_USER_MODEL = "profiles.User"
 
@@ -190,6 +247,45 @@ CORS_ALLOWED_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000"]
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Most answers one batch submission may carry; a batch is recorded in one
+# transaction that locks its attempt.
+ANSWER_BATCH_MAX_SIZE = 200
+
+# Write-behind answer submissions (see quiz_attempts/write_behind.py). The
+# journal directory must be on local disk; answers journaled by a process
+# that stops are written by the next one, or by manage.py flush_answers.
+ANSWER_WRITE_BEHIND = {
+    "ENABLED": os.environ.get("ANSWER_WRITE_BEHIND") == "1",
+    "DIRECTORY": os.environ.get(
+        "ANSWER_JOURNAL_DIR", str(BASE_DIR / "var" / "answer-journal")
+    ),
+}
+
+# Request instrumentation (see core/middleware.py), off unless
+# PERFORMANCE_SAMPLE_RATE is set, e.g. to 1 to time every request; the
+# metrics endpoint takes a bearer token from PERFORMANCE_METRICS_TOKEN.
+PERFORMANCE_METRICS = {
+    "SAMPLE_RATE": float(os.environ.get("PERFORMANCE_SAMPLE_RATE", 0)),
+    "SLOW_REQUEST_MS": int(os.environ.get("PERFORMANCE_SLOW_REQUEST_MS", 500)),
+    "TOKEN": os.environ.get("PERFORMANCE_METRICS_TOKEN"),
+}
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {"message": {"format": "%(message)s"}},
+    "handlers": {
+        "performance": {"class": "logging.StreamHandler", "formatter": "message"},
+    },
+    "loggers": {
+        "core.performance": {
+            "handlers": ["performance"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
+
 # Debug Toolbar Settings:
 INTERNAL_IPS = [
     "127.0.0.1",
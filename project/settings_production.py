@@ -0,0 +1,96 @@
+"""
+Production settings, selected with DJANGO_ENV=production.
+
+Builds on project/settings.py: debugging tools are removed, database
+connections are kept open between requests, templates are cached and
+sessions don't touch the database. core/checks.py warns at startup when
+any of these are undone.
+"""
+import os
+
+from core.checks import DEBUG_APPS, DEBUG_MIDDLEWARE
+
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES, INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, TEMPLATES
+
+DJANGO_ENV = "production"
+
+DEBUG = os.environ.get("DJANGO_DEBUG") == "1"
+
+ALLOWED_HOSTS = [
+    host.strip()
+    for host in os.environ.get("DJANGO_ALLOWED_HOSTS", "").split(",")
+    if host.strip()
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in DEBUG_APPS]
+MIDDLEWARE = [
+    middleware for middleware in MIDDLEWARE if middleware not in DEBUG_MIDDLEWARE
+]
+
+# Persistent connections, checked before reuse so a dropped connection
+# doesn't fail the request that picks it up.
+DATABASES = {
+    "default": {
+        **DATABASES["default"],
+        "NAME": os.environ.get("DATABASE_NAME", DATABASES["default"]["NAME"]),
+        "USER": os.environ.get("DATABASE_USER", DATABASES["default"]["USER"]),
+        "PASSWORD": os.environ.get(
+            "DATABASE_PASSWORD", DATABASES["default"]["PASSWORD"]
+        ),
+        "HOST": os.environ.get("DATABASE_HOST", DATABASES["default"]["HOST"]),
+        "PORT": os.environ.get("DATABASE_PORT", DATABASES["default"]["PORT"]),
+        "CONN_MAX_AGE": int(os.environ.get("DATABASE_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+}
+
+# Read replicas of the primary, e.g. DATABASE_REPLICA_HOSTS=db-r1,db-r2.
+# Tests run them as mirrors of the test database.
+DATABASE_REPLICAS = []
+replica_hosts = [
+    host.strip()
+    for host in os.environ.get("DATABASE_REPLICA_HOSTS", "").split(",")
+    if host.strip()
+]
+for number, host in enumerate(replica_hosts, start=1):
+    alias = f"replica{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+# Templates are compiled once per process.
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        "APP_DIRS": False,
+        "OPTIONS": {
+            **TEMPLATES[0]["OPTIONS"],
+            "loaders": [
+                (
+                    "django.template.loaders.cached.Loader",
+                    [
+                        "django.template.loaders.filesystem.Loader",
+                        "django.template.loaders.app_directories.Loader",
+                    ],
+                )
+            ],
+        },
+    }
+]
+
+# Sessions in the shared cache when there is one, otherwise in signed cookies;
+# never a database round trip per request.
+if os.environ.get("CACHE_BACKEND"):
+    SESSION_ENGINE = "django.contrib.sessions.backends.cache"
+else:
+    SESSION_ENGINE = "django.contrib.sessions.backends.signed_cookies"
+
+# JSON only; the browsable API renders forms for every response.
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    "DEFAULT_RENDERER_CLASSES": ("rest_framework.renderers.JSONRenderer",),
+}
@@ -11,6 +11,14 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project.settings')
+from project import settings_module
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module())
 
 application = get_wsgi_application()
+
+# Servers don't run the system checks; report production settings that cost
+# throughput in the logs instead.
+from core.checks import log_production_warnings  # noqa: E402
+
+log_production_warnings()
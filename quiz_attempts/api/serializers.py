@@ -1,11 +1,30 @@
+from django.conf import settings
 from rest_framework import serializers
-from ..models import QuizAttempt, QuestionAttempt
+from core.middleware import TimedSerializerMixin
+from ..models import (
+    QuizAttempt,
+    QuestionAttempt,
+    QuizStatistics,
+    QuestionStatistics,
+    AnswerStatistics,
+)
 
 
-class QuizAttemptSerializer(serializers.ModelSerializer):
+class QuizAttemptSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = QuizAttempt
-        fields = ["pk", "user", "quiz", "created", "modified", "completed", "score"]
+        fields = [
+            "pk",
+            "user",
+            "quiz",
+            "questions",
+            "created",
+            "modified",
+            "expires",
+            "completed",
+            "timed_out",
+            "score",
+        ]
         # read_only_fields = ['pk', 'user', 'quiz',
         #           'created', 'modified', 'completed', 'score']
 
@@ -15,7 +34,7 @@ class QuizAttemptSerializer(serializers.ModelSerializer):
         return instance
 
 
-class QuestionAttemptSerializer(serializers.ModelSerializer):
+class QuestionAttemptSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = QuestionAttempt
         fields = [
@@ -28,14 +47,108 @@ class QuestionAttemptSerializer(serializers.ModelSerializer):
             "is_correct",
             "time_taken",
         ]
-        # read_only_fields = ['pk', 'is_correct']
+        read_only_fields = ["pk", "is_correct"]
+
+
+class AnswerSubmissionSerializer(serializers.Serializer):
+    """
+    Input for submitting one answer. Plain ids, so that validating them takes
+    a single joined query in ``services.submit_answer`` rather than a lookup
+    per related field.
+    """
+
+    quiz_attempt = serializers.IntegerField()
+    question = serializers.UUIDField()
+    answer_selected = serializers.UUIDField()
+
+
+class BatchAnswerSerializer(serializers.Serializer):
+    """
+    One answer of a batch submission; the attempt comes from the URL.
+    """
+
+    question = serializers.UUIDField()
+    answer_selected = serializers.UUIDField()
+
+
+class BatchSubmissionSerializer(serializers.Serializer):
+    # Items are validated one by one, so one bad item doesn't reject the rest
+    answers = serializers.ListField(child=serializers.DictField(), allow_empty=False)
+    complete = serializers.BooleanField(default=True)
+
+    def validate_answers(self, value):
+        max_size = getattr(settings, "ANSWER_BATCH_MAX_SIZE", 200)
+        if len(value) > max_size:
+            raise serializers.ValidationError(
+                f"Submit at most {max_size} answers at a time."
+            )
+        return value
+
+
+class AnswerStatisticsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnswerStatistics
+        fields = ["answer", "selection_count"]
+
+
+class QuestionStatisticsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    correct_rate = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = QuestionStatistics
+        fields = ["question", "attempt_count", "correct_count", "correct_rate"]
+
+
+class QuestionStatisticsDetailSerializer(QuestionStatisticsSerializer):
+    answers = serializers.SerializerMethodField()
+    most_selected_answer = serializers.SerializerMethodField()
+
+    class Meta(QuestionStatisticsSerializer.Meta):
+        fields = QuestionStatisticsSerializer.Meta.fields + [
+            "answers",
+            "most_selected_answer",
+        ]
+
+    def get_answers(self, obj):
+        return AnswerStatisticsSerializer(self.answer_statistics(obj), many=True).data
+
+    def get_most_selected_answer(self, obj):
+        answers = self.answer_statistics(obj)
+        return answers[0].answer_id if answers else None
+
+    def answer_statistics(self, obj):
+        if not hasattr(self, "_answer_statistics"):
+            self._answer_statistics = list(
+                AnswerStatistics.objects.filter(question_id=obj.question_id).order_by(
+                    "-selection_count"
+                )
+            )
+        return self._answer_statistics
+
+
+class QuizStatisticsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    average_score = serializers.FloatField(read_only=True)
+    questions = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QuizStatistics
+        fields = [
+            "quiz",
+            "attempt_count",
+            "completed_count",
+            "average_score",
+            "questions",
+        ]
+
+    def get_questions(self, obj):
+        return QuestionStatisticsSerializer(
+            QuestionStatistics.objects.filter(question__quiz_id=obj.quiz_id),
+            many=True,
+        ).data
 
-        def create(self, validated_data):
-            instance = QuestionAttempt.objects.create(**validated_data)
 
-            # updating score
-            quiz_attempt = instance.quiz_attempt
-            if instance.is_correct:
-                quiz_attempt.score = (quiz_attempt.score or 0) + 1
-                quiz_attempt.save()
-            return instance
+class LeaderboardEntrySerializer(TimedSerializerMixin, serializers.Serializer):
+    rank = serializers.IntegerField()
+    user = serializers.IntegerField()
+    username = serializers.CharField(allow_null=True)
+    score = serializers.FloatField()
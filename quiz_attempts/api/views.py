@@ -1,38 +1,61 @@
+import uuid
+
 from rest_framework.generics import (
+    GenericAPIView,
     ListCreateAPIView,
+    RetrieveAPIView,
     RetrieveUpdateDestroyAPIView,
 )
 from rest_framework.permissions import (
+    IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework import status
 from django.shortcuts import get_object_or_404
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse, StreamingHttpResponse
 from django.db.models import Prefetch
-from serializers import (
+from core.async_views import AsyncAPIView
+from core.pagination import QuizAttemptCursorPagination
+from profiles.permissions import IsTeacher
+from .serializers import (
     QuizAttemptSerializer,
     QuestionAttemptSerializer,
+    AnswerSubmissionSerializer,
+    BatchAnswerSerializer,
+    BatchSubmissionSerializer,
+    QuizStatisticsSerializer,
+    QuestionStatisticsDetailSerializer,
+    LeaderboardEntrySerializer,
 )
+from .. import exports, leaderboard, ordering, services, write_behind
 from ..models import (
     QuizAttempt,
     QuestionAttempt,
+    QuizStatistics,
+    QuestionStatistics,
 )
 
-from quizzes.models import (
-    Quiz,
-    Question,
-    Answer,
-)
+from quizzes import sampling
+from quizzes.api.serializers import QuestionSerializer
+from quizzes.models import Quiz, Question
 
-from quizzes.api.views import IsAuthorOrReadOnly
+from quizzes.api.views import IsAuthorOrReadOnly, cached_quiz_payload
 
 
 class QuizAttemptListCreateAPIView(ListCreateAPIView):
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    replica_reads = True
     serializer_class = QuizAttemptSerializer
+    pagination_class = QuizAttemptCursorPagination
 
     def get_queryset(self):
-        return QuizAttempt.objects.filter(user=self.request.user).prefetch_related(
+        write_behind.settle(self.request.user.id)
+        return QuizAttempt.objects.filter(
+            user_id=self.request.user.id
+        ).prefetch_related(
             Prefetch("question_attempts", queryset=QuestionAttempt.objects.all())
         )
 
@@ -41,45 +64,380 @@ class QuizAttemptListCreateAPIView(ListCreateAPIView):
         quiz_id = request.data.get("quiz")
 
         quiz = get_object_or_404(Quiz, id=quiz_id)
-        quiz_attempt = QuizAttempt.objects.create(user=user, quiz=quiz)
+        quiz_attempt = services.start_attempt(user, quiz)
 
         serializer = QuizAttemptSerializer(quiz_attempt)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
+class QuizAttemptQuestionsAPIView(GenericAPIView):
+    """
+    The questions of one of the user's attempts, in the attempt's own order
+    for shuffled quizzes, without the correct answers. Built from the cached
+    quiz payload, or for sampled quizzes from the drawn questions only.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request, pk, *args, **kwargs):
+        quiz_attempt = get_object_or_404(
+            QuizAttempt.objects.select_related("quiz").only(
+                "seed",
+                "questions",
+                "quiz__title",
+                "quiz__slug",
+                "quiz__shuffle_questions",
+                "quiz__shuffle_answers",
+            ),
+            pk=pk,
+            user_id=request.user.id,
+        )
+        quiz = quiz_attempt.quiz
+        if quiz_attempt.questions is None:
+            questions = cached_quiz_payload(
+                quiz.slug,
+                lambda: Quiz.objects.with_questions().get(pk=quiz.pk),
+            )["quiz_questions"]
+        else:
+            questions = QuestionSerializer(
+                sampling.drawn_questions(quiz_attempt.questions), many=True
+            ).data
+        return Response(
+            {
+                "quiz_attempt": quiz_attempt.pk,
+                "quiz": quiz.pk,
+                "title": quiz.title,
+                "questions": ordering.attempt_questions(
+                    questions,
+                    quiz_attempt.seed,
+                    quiz.shuffle_questions,
+                    quiz.shuffle_answers,
+                ),
+            }
+        )
+
+
 # QuestionAttempt Views
+def _submitted_status(question_attempt):
+    # Answers buffered by the write-behind mode are accepted, not created yet
+    if question_attempt.pk is None:
+        return status.HTTP_202_ACCEPTED
+    return status.HTTP_201_CREATED
+
+
 class QuestionAttemptListCreateAPIView(ListCreateAPIView):
-    permission_classes = (IsAuthenticatedOrReadOnly,)
+    permission_classes = (IsAuthenticated,)
+    replica_reads = True
     serializer_class = QuestionAttemptSerializer
 
-    def create(self, request, *args, **kwargs):
-        user = request.user
-        quiz_attempt_id = request.data.get("quiz_attempt")
-        question_id = request.data.get("question")
-        answer_id = request.data.get("answer_selected")
+    def get_queryset(self):
+        write_behind.settle(self.request.user.id)
+        return QuestionAttempt.objects.filter(
+            quiz_attempt__user_id=self.request.user.id
+        )
 
-        quiz_attempt = get_object_or_404(QuizAttempt, id=quiz_attempt_id, user=user)
-        question = Question.objects.get(id=question_id)
-        answer = Answer.objects.get(id=answer_id)
+    def create(self, request, *args, **kwargs):
+        submission = AnswerSubmissionSerializer(data=request.data)
+        submission.is_valid(raise_exception=True)
 
-        question_attempt = QuestionAttempt.objects.create(
-            quiz_attempt=quiz_attempt,
-            question=question,
-            answer_selected=answer,
-            is_correct=(answer.is_correct),
+        question_attempt = services.submit_answer(
+            request.user,
+            submission.validated_data["quiz_attempt"],
+            submission.validated_data["question"],
+            submission.validated_data["answer_selected"],
         )
 
         serializer = QuestionAttemptSerializer(question_attempt)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return Response(serializer.data, status=_submitted_status(question_attempt))
+
+
+class QuizAttemptSubmitAPIView(GenericAPIView):
+    """
+    Submit all answers of an attempt at once, optionally completing it.
+
+    Invalid items are reported by their index in ``errors`` and don't stop
+    the valid ones from being recorded.
+    """
+
+    permission_classes = (IsAuthenticated,)
+    serializer_class = BatchSubmissionSerializer
+
+    def post(self, request, pk, *args, **kwargs):
+        batch = self.get_serializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+
+        submissions, errors = [], []
+        for index, item in enumerate(batch.validated_data["answers"]):
+            answer = BatchAnswerSerializer(data=item)
+            if answer.is_valid():
+                submissions.append((index, answer.validated_data))
+            else:
+                errors.append({"index": index, "errors": answer.errors})
+
+        question_attempts, rejected = services.submit_answers(
+            request.user, pk, submissions, complete=batch.validated_data["complete"]
+        )
+        errors = sorted(errors + rejected, key=lambda error: error["index"])
+
+        return Response(
+            {
+                "quiz_attempt": QuizAttemptSerializer(
+                    QuizAttempt.objects.get(pk=pk)
+                ).data,
+                "question_attempts": QuestionAttemptSerializer(
+                    question_attempts, many=True
+                ).data,
+                "errors": errors,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+# Async attempt Views:
+class AsyncQuizAttemptStartAPIView(AsyncAPIView):
+    """
+    Start an attempt, like ``QuizAttemptListCreateAPIView.create``, without
+    holding a thread while waiting on the database when served under ASGI.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    async def post(self, request, *args, **kwargs):
+        quiz_attempt = await services.astart_attempt(
+            request.user, request.data.get("quiz")
+        )
+        return JsonResponse(
+            QuizAttemptSerializer(quiz_attempt).data, status=status.HTTP_201_CREATED
+        )
+
+
+class AsyncQuestionAttemptCreateAPIView(AsyncAPIView):
+    """
+    Submit one answer, like ``QuestionAttemptListCreateAPIView.create``.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    async def post(self, request, *args, **kwargs):
+        submission = AnswerSubmissionSerializer(data=request.data)
+        submission.is_valid(raise_exception=True)
+
+        question_attempt = await services.asubmit_answer(
+            request.user,
+            submission.validated_data["quiz_attempt"],
+            submission.validated_data["question"],
+            submission.validated_data["answer_selected"],
+        )
+        return JsonResponse(
+            QuestionAttemptSerializer(question_attempt).data,
+            status=_submitted_status(question_attempt),
+        )
+
+
+class AsyncQuizAttemptSubmitAPIView(AsyncAPIView):
+    """
+    Submit all answers of an attempt at once, like ``QuizAttemptSubmitAPIView``.
+    """
+
+    permission_classes = (IsAuthenticated,)
+
+    async def post(self, request, pk, *args, **kwargs):
+        batch = BatchSubmissionSerializer(data=request.data)
+        batch.is_valid(raise_exception=True)
+
+        submissions, errors = [], []
+        for index, item in enumerate(batch.validated_data["answers"]):
+            answer = BatchAnswerSerializer(data=item)
+            if answer.is_valid():
+                submissions.append((index, answer.validated_data))
+            else:
+                errors.append({"index": index, "errors": answer.errors})
+
+        question_attempts, rejected = await services.asubmit_answers(
+            request.user, pk, submissions, complete=batch.validated_data["complete"]
+        )
+        errors = sorted(errors + rejected, key=lambda error: error["index"])
+        quiz_attempt = await QuizAttempt.objects.aget(pk=pk)
+
+        return JsonResponse(
+            {
+                "quiz_attempt": QuizAttemptSerializer(quiz_attempt).data,
+                "question_attempts": QuestionAttemptSerializer(
+                    question_attempts, many=True
+                ).data,
+                "errors": errors,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class QuizAttemptExportAPIView(GenericAPIView):
+    """
+    Stream every attempt at the requesting teacher's quizzes, with their
+    question attempts, as CSV or JSON Lines (``?file_format=csv|jsonl``).
+    ``?quiz=<id>`` limits the export to one quiz.
+    """
+
+    permission_classes = (IsAuthenticated, IsTeacher)
+
+    def get_queryset(self):
+        queryset = QuizAttempt.objects.filter(quiz__author_id=self.request.user.id)
+        quiz_id = self.request.query_params.get("quiz")
+        if quiz_id:
+            try:
+                quiz_id = uuid.UUID(quiz_id)
+            except ValueError:
+                raise NotFound("No quiz of yours with this id.")
+            queryset = queryset.filter(
+                quiz=get_object_or_404(
+                    Quiz.objects.only("pk"), pk=quiz_id, author_id=self.request.user.id
+                )
+            )
+        return queryset
+
+    def get(self, request, *args, **kwargs):
+        file_format = request.query_params.get("file_format", "csv")
+        if file_format not in exports.FORMATS:
+            return Response(
+                {"file_format": f"Choose one of: {', '.join(exports.FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        rows, content_type = exports.FORMATS[file_format]
+        response = StreamingHttpResponse(
+            rows(exports.attempts_for_export(self.get_queryset())),
+            content_type=content_type,
+        )
+        response[
+            "Content-Disposition"
+        ] = f'attachment; filename="quiz_attempts.{file_format}"'
+        return response
 
 
 class QuizAttemptRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
     permission_classes = (IsAuthorOrReadOnly,)
+    replica_reads = True
     queryset = QuizAttempt.objects.all()
     serializer_class = QuizAttemptSerializer
 
+    def get_queryset(self):
+        write_behind.settle(self.request.user.id)
+        return super().get_queryset()
+
 
 class QuestionAttemptRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
     permission_classes = (IsAuthorOrReadOnly,)
+    replica_reads = True
     queryset = QuestionAttempt.objects.all()
     serializer_class = QuestionAttemptSerializer
+
+    def get_queryset(self):
+        write_behind.settle(self.request.user.id)
+        return super().get_queryset()
+
+
+# Statistics Views
+class QuizStatisticsAPIView(RetrieveAPIView):
+    """
+    Attempt counts and average score of a quiz, with per-question statistics.
+    Read from the statistics tables only.
+    """
+
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    replica_reads = True
+    serializer_class = QuizStatisticsSerializer
+
+    def get_object(self):
+        quiz_id = self.kwargs["quiz_id"]
+        statistics = QuizStatistics.objects.filter(quiz_id=quiz_id).first()
+        if statistics is None:
+            # No attempts yet
+            quiz = get_object_or_404(Quiz, pk=quiz_id)
+            statistics = QuizStatistics(quiz=quiz)
+        return statistics
+
+
+class QuestionStatisticsAPIView(RetrieveAPIView):
+    """
+    Attempt and correct counts of a question, with selection counts of its
+    answers, most selected first.
+    """
+
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    replica_reads = True
+    serializer_class = QuestionStatisticsDetailSerializer
+
+    def get_object(self):
+        question_id = self.kwargs["question_id"]
+        statistics = QuestionStatistics.objects.filter(question_id=question_id).first()
+        if statistics is None:
+            question = get_object_or_404(Question, pk=question_id)
+            statistics = QuestionStatistics(question=question)
+        return statistics
+
+
+# Leaderboard Views
+class LeaderboardAPIView(GenericAPIView):
+    """
+    Top users of the global leaderboard, or of a quiz's leaderboard when a
+    ``quiz_id`` is given. ``?limit=`` sets how many (at most 100), and
+    ``?user=<id>`` adds that user's rank.
+    """
+
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    serializer_class = LeaderboardEntrySerializer
+    default_limit = 10
+    max_limit = 100
+
+    def get_board(self):
+        quiz_id = self.kwargs.get("quiz_id")
+        if quiz_id is None:
+            return leaderboard.GLOBAL_BOARD
+        get_object_or_404(Quiz.objects.only("pk"), pk=quiz_id)
+        return leaderboard.quiz_board(quiz_id)
+
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        return max(1, min(limit, self.max_limit))
+
+    def get(self, request, *args, **kwargs):
+        board = self.get_board()
+        store = leaderboard.get_store()
+
+        entries = [
+            {"rank": rank, "user": user_id, "score": score}
+            for rank, (user_id, score) in enumerate(
+                store.top(board, self.get_limit()), start=1
+            )
+        ]
+        user_entry = None
+        user_id = request.query_params.get("user")
+        if user_id is not None and user_id.isdigit():
+            ranked = store.rank(board, int(user_id))
+            if ranked is not None:
+                user_entry = {
+                    "rank": ranked[0],
+                    "user": int(user_id),
+                    "score": ranked[1],
+                }
+
+        usernames = dict(
+            get_user_model()
+            .objects.filter(
+                pk__in={entry["user"] for entry in entries + [user_entry] if entry}
+            )
+            .values_list("pk", "username")
+        )
+        for entry in filter(None, entries + [user_entry]):
+            entry["username"] = usernames.get(entry["user"])
+
+        return Response(
+            {
+                "results": self.get_serializer(entries, many=True).data,
+                "user": self.get_serializer(user_entry).data if user_entry else None,
+                "count": store.size(board),
+            }
+        )
@@ -2,5 +2,8 @@ from django.apps import AppConfig
 
 
 class QuizAttemptsConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'quiz_attempts'
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "quiz_attempts"
+
+    def ready(self):
+        from . import signals  # noqa: F401
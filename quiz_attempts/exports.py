@@ -0,0 +1,127 @@
+"""
+Streaming exports of quiz attempts.
+
+Attempts are read with ``QuerySet.iterator(chunk_size=...)``, which uses a
+server-side cursor where the database supports one and prefetches question
+attempts one chunk at a time, so memory use doesn't grow with the number of
+attempts.
+"""
+import csv
+import json
+
+from django.db.models import Prefetch
+
+from .models import QuestionAttempt
+
+CHUNK_SIZE = 2000
+
+CSV_COLUMNS = [
+    "attempt_id",
+    "quiz_id",
+    "user_id",
+    "username",
+    "created",
+    "completed",
+    "score",
+    "question_id",
+    "answer_id",
+    "is_correct",
+    "answered",
+]
+
+
+def attempts_for_export(queryset, chunk_size=CHUNK_SIZE):
+    return (
+        queryset.select_related("user")
+        .only(
+            "pk",
+            "quiz_id",
+            "user__username",
+            "created",
+            "completed",
+            "score",
+        )
+        .prefetch_related(
+            Prefetch(
+                "question_attempts",
+                queryset=QuestionAttempt.objects.only(
+                    "quiz_attempt_id",
+                    "question_id",
+                    "answer_selected_id",
+                    "is_correct",
+                    "created",
+                ).order_by("created"),
+            )
+        )
+        .order_by("pk")
+        .iterator(chunk_size=chunk_size)
+    )
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def _attempt_fields(attempt):
+    return {
+        "attempt_id": attempt.pk,
+        "quiz_id": str(attempt.quiz_id),
+        "user_id": attempt.user_id,
+        "username": attempt.user.username,
+        "created": _isoformat(attempt.created),
+        "completed": _isoformat(attempt.completed),
+        "score": attempt.score,
+    }
+
+
+def _question_attempt_fields(question_attempt):
+    return {
+        "question_id": str(question_attempt.question_id),
+        "answer_id": str(question_attempt.answer_selected_id),
+        "is_correct": question_attempt.is_correct,
+        "answered": _isoformat(question_attempt.created),
+    }
+
+
+class Echo:
+    """
+    File-like object that hands back what's written, for ``csv.writer``.
+    """
+
+    def write(self, value):
+        return value
+
+
+def csv_rows(attempts):
+    """
+    One line per question attempt, repeating the attempt's columns; attempts
+    without answers get a single line with empty question columns.
+    """
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    for attempt in attempts:
+        fields = _attempt_fields(attempt)
+        question_attempts = attempt.question_attempts.all()
+        if not question_attempts:
+            yield writer.writerow(fields)
+        for question_attempt in question_attempts:
+            yield writer.writerow(fields | _question_attempt_fields(question_attempt))
+
+
+def jsonl_rows(attempts):
+    """
+    One JSON object per attempt, with its question attempts nested.
+    """
+    for attempt in attempts:
+        fields = _attempt_fields(attempt)
+        fields["question_attempts"] = [
+            _question_attempt_fields(question_attempt)
+            for question_attempt in attempt.question_attempts.all()
+        ]
+        yield json.dumps(fields) + "\n"
+
+
+FORMATS = {
+    "csv": (csv_rows, "text/csv"),
+    "jsonl": (jsonl_rows, "application/x-ndjson"),
+}
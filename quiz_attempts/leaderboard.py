@@ -0,0 +1,273 @@
+"""
+Per-quiz and global leaderboards.
+
+A quiz board ranks users by their best completed score on that quiz; the
+global board ranks them by the sum of their best scores over all quizzes.
+Boards are updated when an attempt completes, and answer top-N and rank
+queries without touching the database.
+
+The store is chosen with ``LEADERBOARD_STORE``. ``MemoryLeaderboardStore``
+keeps sorted lists per process and loads itself from the database on first
+use; ``RedisLeaderboardStore`` keeps sorted sets shared by every process.
+"""
+import threading
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db.models import Max, Value
+from django.db.models.functions import Coalesce
+from django.utils.module_loading import import_string
+
+from .models import QuizAttempt
+
+GLOBAL_BOARD = "global"
+
+
+def quiz_board(quiz_id):
+    return f"quiz:{quiz_id}"
+
+
+class MemoryLeaderboardStore:
+    """
+    Boards as lists of ``(-score, member)`` kept sorted, so top-N is a slice
+    and a member's rank is a binary search on its current score.
+    """
+
+    persistent = False
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._scores = {}
+
+    def _remove(self, board, member):
+        score = self._scores.get(board, {}).pop(member, None)
+        if score is not None:
+            entries = self._entries[board]
+            del entries[bisect_left(entries, (-score, member))]
+        return score
+
+    def _set(self, board, member, score):
+        self._remove(board, member)
+        self._scores.setdefault(board, {})[member] = score
+        insort(self._entries.setdefault(board, []), (-score, member))
+
+    def score(self, board, member):
+        with self._lock:
+            return self._scores.get(board, {}).get(member)
+
+    def update_best(self, board, member, score, total_board=None):
+        """
+        Keep the higher of the stored and the new score, and add by how much
+        it went up to the member's score on ``total_board``, atomically.
+        Returns the gain.
+        """
+        with self._lock:
+            previous = self._scores.get(board, {}).get(member)
+            if previous is not None and previous >= score:
+                return 0
+            self._set(board, member, score)
+            gained = score - (previous or 0)
+            if total_board is not None:
+                self.increment(total_board, member, gained)
+            return gained
+
+    def increment(self, board, member, amount):
+        with self._lock:
+            self._set(board, member, (self.score(board, member) or 0) + amount)
+
+    def top(self, board, limit):
+        with self._lock:
+            return [
+                (member, -score)
+                for score, member in self._entries.get(board, [])[:limit]
+            ]
+
+    def rank(self, board, member):
+        """
+        1-based rank and score of a member, or ``None`` if not on the board.
+        """
+        with self._lock:
+            score = self._scores.get(board, {}).get(member)
+            if score is None:
+                return None
+            return bisect_left(self._entries[board], (-score, member)) + 1, score
+
+    def size(self, board):
+        with self._lock:
+            return len(self._entries.get(board, []))
+
+    def rebuild(self, rows):
+        """
+        Replace every board from ``(quiz_id, member, best_score)`` rows.
+        """
+        scores = {}
+        for quiz_id, member, score in rows:
+            scores.setdefault(quiz_board(quiz_id), {})[member] = score
+            totals = scores.setdefault(GLOBAL_BOARD, {})
+            totals[member] = totals.get(member, 0) + score
+        entries = {
+            board: sorted((-score, member) for member, score in members.items())
+            for board, members in scores.items()
+        }
+        with self._lock:
+            self._scores, self._entries = scores, entries
+
+
+# KEYS: board, total board (optional). ARGV: member, score. Returns the gain
+# as a string, as Lua numbers are converted to integer replies.
+UPDATE_BEST_SCRIPT = """
+local previous = tonumber(redis.call("ZSCORE", KEYS[1], ARGV[1]))
+local score = tonumber(ARGV[2])
+if previous and previous >= score then
+    return "0"
+end
+redis.call("ZADD", KEYS[1], ARGV[2], ARGV[1])
+local gained = score - (previous or 0)
+if KEYS[2] then
+    redis.call("ZINCRBY", KEYS[2], gained, ARGV[1])
+end
+return tostring(gained)
+"""
+
+
+class RedisLeaderboardStore:
+    """
+    Boards as Redis sorted sets, shared by every process.
+
+    Requires the ``redis`` package; options are passed to ``Redis.from_url``.
+    """
+
+    persistent = True
+
+    def __init__(self, url="redis://localhost:6379/0", prefix="leaderboard", **options):
+        import redis
+
+        self.client = redis.Redis.from_url(url, **options)
+        self.prefix = prefix
+        self._update_best = self.client.register_script(UPDATE_BEST_SCRIPT)
+
+    def _key(self, board):
+        return f"{self.prefix}:{board}"
+
+    def score(self, board, member):
+        return self.client.zscore(self._key(board), member)
+
+    def update_best(self, board, member, score, total_board=None):
+        # One script, so concurrent updates can't both add their gain
+        keys = [self._key(board)]
+        if total_board is not None:
+            keys.append(self._key(total_board))
+        return float(self._update_best(keys=keys, args=[member, score]))
+
+    def increment(self, board, member, amount):
+        self.client.zincrby(self._key(board), amount, member)
+
+    def top(self, board, limit):
+        return [
+            (int(member), score)
+            for member, score in self.client.zrevrange(
+                self._key(board), 0, limit - 1, withscores=True
+            )
+        ]
+
+    def rank(self, board, member):
+        pipeline = self.client.pipeline()
+        pipeline.zrevrank(self._key(board), member)
+        pipeline.zscore(self._key(board), member)
+        rank, score = pipeline.execute()
+        if rank is None:
+            return None
+        return rank + 1, score
+
+    def size(self, board):
+        return self.client.zcard(self._key(board))
+
+    def rebuild(self, rows, batch_size=1000):
+        """
+        Build every board under temporary keys, then swap them in.
+        """
+        building = f"{self.prefix}:rebuild"
+        boards = set()
+        pipeline = self.client.pipeline(transaction=False)
+        for count, (quiz_id, member, score) in enumerate(rows, start=1):
+            boards.update([quiz_board(quiz_id), GLOBAL_BOARD])
+            pipeline.zadd(f"{building}:{quiz_board(quiz_id)}", {member: score})
+            pipeline.zincrby(f"{building}:{GLOBAL_BOARD}", score, member)
+            if count % batch_size == 0:
+                pipeline.execute()
+        pipeline.execute()
+
+        stale = set(self.client.scan_iter(f"{self.prefix}:*")) - {
+            f"{building}:{board}".encode() for board in boards
+        }
+        pipeline = self.client.pipeline()
+        if stale:
+            pipeline.delete(*stale)
+        for board in boards:
+            pipeline.rename(f"{building}:{board}", self._key(board))
+        pipeline.execute()
+
+
+def best_scores(batch_size=2000):
+    """
+    Stream ``(quiz_id, user_id, best_score)`` for every completed attempt.
+    """
+    return (
+        QuizAttempt.objects.filter(completed__isnull=False)
+        .order_by()
+        .values_list("quiz_id", "user_id")
+        .annotate(best=Coalesce(Max("score"), Value(0.0)))
+        .iterator(chunk_size=batch_size)
+    )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store_class():
+    return import_string(
+        getattr(
+            settings,
+            "LEADERBOARD_STORE",
+            "quiz_attempts.leaderboard.MemoryLeaderboardStore",
+        )
+    )
+
+
+def _create_store():
+    return get_store_class()(**getattr(settings, "LEADERBOARD_STORE_OPTIONS", {}))
+
+
+def get_store():
+    """
+    The configured store. An in-process store is loaded from the database
+    the first time it's used.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                store = _create_store()
+                if not store.persistent:
+                    store.rebuild(best_scores())
+                _store = store
+    return _store
+
+
+def rebuild(batch_size=2000):
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = _create_store()
+    _store.rebuild(best_scores(batch_size))
+
+
+def record_completed_attempt(user_id, quiz_id, score):
+    """
+    Update the quiz and global boards with a completed attempt's score.
+    """
+    get_store().update_best(
+        quiz_board(quiz_id), user_id, score or 0, total_board=GLOBAL_BOARD
+    )
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz_attempts.services import close_expired_attempts
+
+
+class Command(BaseCommand):
+    help = (
+        "Close the attempts that are past their quiz's time limit. Run it "
+        "from a scheduler, or keep it running with --every."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--every",
+            type=float,
+            metavar="SECONDS",
+            help="Sweep again every SECONDS instead of once.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.perf_counter()
+            closed = close_expired_attempts(batch_size=options["batch_size"])
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{closed} expired attempts closed in "
+                    f"{time.perf_counter() - started:.2f}s."
+                )
+            )
+            if not options["every"]:
+                return
+            time.sleep(options["every"])
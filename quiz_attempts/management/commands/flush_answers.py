@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz_attempts import write_behind
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the answers buffered in write-behind journals that no running "
+        "process holds, e.g. after a crash or once write-behind is disabled."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--directory",
+            help="Journal directory (default: ANSWER_WRITE_BEHIND['DIRECTORY']).",
+        )
+
+    def handle(self, *args, **options):
+        config = write_behind.get_config()
+        if options["directory"]:
+            config["DIRECTORY"] = options["directory"]
+        try:
+            buffer = write_behind.WriteBehindBuffer(config)
+        except ValueError as error:
+            raise CommandError(str(error))
+
+        started = time.perf_counter()
+        recovered = len(buffer.pending)
+        written = buffer.flush()
+        buffer.journal.close()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{recovered} buffered answers recovered, {written} written "
+                f"in {time.perf_counter() - started:.2f}s."
+            )
+        )
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz_attempts import leaderboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Repopulate the per-quiz and global leaderboards from the completed "
+        "attempts, streaming best scores from the database in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000)
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Rebuild an in-process store, which only this command sees.",
+        )
+
+    def handle(self, *args, **options):
+        # Server processes load their own in-process boards on first use
+        if not leaderboard.get_store_class().persistent and not options["force"]:
+            raise CommandError(
+                "The leaderboard store is in-process, so servers wouldn't see "
+                "the rebuilt boards. Configure a shared LEADERBOARD_STORE, or "
+                "pass --force."
+            )
+        started = time.perf_counter()
+        leaderboard.rebuild(batch_size=options["batch_size"])
+        store = leaderboard.get_store()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Leaderboards rebuilt in {time.perf_counter() - started:.2f}s; "
+                f"{store.size(leaderboard.GLOBAL_BOARD)} users ranked."
+            )
+        )
@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+
+from quiz_attempts.models import (
+    QuizAttempt,
+    QuestionAttempt,
+    QuizStatistics,
+    QuestionStatistics,
+    AnswerStatistics,
+)
+from quiz_attempts.statistics import compute_statistics
+
+COLUMNS = {
+    "QuizStatistics": ["attempt_count", "completed_count", "total_score"],
+    "QuestionStatistics": ["attempt_count", "correct_count"],
+    "AnswerStatistics": ["question_id", "selection_count"],
+}
+
+
+def lock_tables(using):
+    """
+    On PostgreSQL, hold off writes to the attempt and statistics tables until
+    the transaction ends, so no submission is counted twice or lost between
+    computing the statistics and replacing them. Reads go on meanwhile.
+    Other databases aren't locked.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    quote = connection.ops.quote_name
+    attempt_tables = ", ".join(
+        quote(model._meta.db_table) for model in (QuizAttempt, QuestionAttempt)
+    )
+    statistics_tables = ", ".join(
+        quote(model._meta.db_table)
+        for model in (QuizStatistics, QuestionStatistics, AnswerStatistics)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {attempt_tables} IN SHARE MODE")
+        cursor.execute(f"LOCK TABLE {statistics_tables} IN EXCLUSIVE MODE")
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the quiz, question and answer statistics from the attempt "
+        "tables, then verify the stored rows against a fresh computation. "
+        "Run it with submissions paused: on PostgreSQL they wait for the "
+        "rebuild, on other databases they may be miscounted, and the "
+        "verification reports the answers submitted while it runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify-only",
+            action="store_true",
+            help="Only compare the stored statistics, without rebuilding them.",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if not options["verify_only"]:
+            using = router.db_for_write(QuizStatistics)
+            with transaction.atomic(using=using):
+                lock_tables(using)
+                for model, rows in compute_statistics().items():
+                    model.objects.all().delete()
+                    model.objects.bulk_create(rows, batch_size=options["batch_size"])
+                    self.stdout.write(f"{model.__name__}: {len(rows)} rows rebuilt")
+
+        mismatches = 0
+        for model, rows in compute_statistics().items():
+            columns = COLUMNS[model.__name__]
+            expected = {
+                row.pk: tuple(getattr(row, column) for column in columns)
+                for row in rows
+            }
+            stored = {
+                pk: tuple(values)
+                for pk, *values in model.objects.values_list("pk", *columns)
+            }
+            for pk in expected.keys() | stored.keys():
+                if expected.get(pk) != stored.get(pk):
+                    mismatches += 1
+                    self.stderr.write(
+                        f"{model.__name__} {pk}: stored {stored.get(pk)}, "
+                        f"expected {expected.get(pk)}"
+                    )
+
+        if mismatches:
+            raise CommandError(f"{mismatches} statistics rows don't match.")
+        self.stdout.write(self.style.SUCCESS("Statistics verified."))
@@ -0,0 +1,221 @@
+# Generated by Django 4.2.6 on 2026-10-18 10:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import model_utils.fields
+import quiz_attempts.models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("quizzes", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="QuestionStatistics",
+            fields=[
+                (
+                    "question",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="statistics",
+                        serialize=False,
+                        to="quizzes.question",
+                    ),
+                ),
+                ("attempt_count", models.PositiveIntegerField(default=0)),
+                ("correct_count", models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="QuizStatistics",
+            fields=[
+                (
+                    "quiz",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="statistics",
+                        serialize=False,
+                        to="quizzes.quiz",
+                    ),
+                ),
+                ("attempt_count", models.PositiveIntegerField(default=0)),
+                ("completed_count", models.PositiveIntegerField(default=0)),
+                ("total_score", models.FloatField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="QuizAttempt",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                ("completed", models.DateTimeField(blank=True, null=True)),
+                ("score", models.FloatField(blank=True, null=True)),
+                (
+                    "seed",
+                    models.PositiveIntegerField(
+                        default=quiz_attempts.models.new_seed, editable=False
+                    ),
+                ),
+                ("questions", models.JSONField(blank=True, editable=False, null=True)),
+                (
+                    "expires",
+                    models.DateTimeField(blank=True, editable=False, null=True),
+                ),
+                ("timed_out", models.BooleanField(default=False, editable=False)),
+                (
+                    "quiz",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attempts",
+                        to="quizzes.quiz",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="quiz_attempts",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="QuestionAttempt",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created",
+                    model_utils.fields.AutoCreatedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="created",
+                    ),
+                ),
+                (
+                    "modified",
+                    model_utils.fields.AutoLastModifiedField(
+                        default=django.utils.timezone.now,
+                        editable=False,
+                        verbose_name="modified",
+                    ),
+                ),
+                ("is_correct", models.BooleanField(default=False)),
+                ("time_taken", models.DurationField(blank=True, null=True)),
+                (
+                    "answer_selected",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="selections",
+                        to="quizzes.answer",
+                    ),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="attempts",
+                        to="quizzes.question",
+                    ),
+                ),
+                (
+                    "quiz_attempt",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="question_attempts",
+                        to="quiz_attempts.quizattempt",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="AnswerStatistics",
+            fields=[
+                (
+                    "answer",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="statistics",
+                        serialize=False,
+                        to="quizzes.answer",
+                    ),
+                ),
+                ("selection_count", models.PositiveIntegerField(default=0)),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="answer_statistics",
+                        to="quizzes.question",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name="quizattempt",
+            index=models.Index(
+                fields=["user", "-created"], name="quizattempt_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="quizattempt",
+            index=models.Index(
+                condition=models.Q(
+                    ("completed__isnull", True), ("expires__isnull", False)
+                ),
+                fields=["expires"],
+                name="quizattempt_open_expires_idx",
+            ),
+        ),
+        migrations.AlterUniqueTogether(
+            name="quizattempt",
+            unique_together={("user", "quiz", "created")},
+        ),
+        migrations.AddConstraint(
+            model_name="questionattempt",
+            constraint=models.UniqueConstraint(
+                fields=("quiz_attempt", "question"), name="unique_question_per_attempt"
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.6 on 2026-10-18 10:53
+
+import core.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # PostgreSQL can't create indexes concurrently inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("quiz_attempts", "0001_initial"),
+    ]
+
+    operations = [
+        core.indexes.PortableAddIndexConcurrently(
+            model_name="questionattempt",
+            index=models.Index(
+                fields=["quiz_attempt", "-created"], name="qattempt_attempt_created_idx"
+            ),
+        ),
+    ]
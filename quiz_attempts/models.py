@@ -1,9 +1,49 @@
+import secrets
+
 from model_utils.models import TimeStampedModel
 from django.db import models
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from profiles.models import User
 from quizzes.models import Quiz, Question, Answer
 
 
+def new_seed():
+    return secrets.randbits(31)
+
+
+class QuizAttemptQuerySet(models.QuerySet):
+    def open(self, now=None):
+        """
+        Attempts that still take answers: not completed, and not past their
+        time limit even if the sweeper hasn't closed them yet.
+        """
+        return self.filter(completed__isnull=True).filter(
+            models.Q(expires__isnull=True) | models.Q(expires__gt=now or timezone.now())
+        )
+
+    def expired(self, now=None):
+        """
+        Attempts past their time limit that haven't been closed yet.
+        """
+        return self.filter(completed__isnull=True, expires__lte=now or timezone.now())
+
+    def with_last_submission(self):
+        """
+        Annotate when the latest answer was recorded, or when the attempt
+        started if it has none, which is where the next answer's
+        ``time_taken`` is counted from.
+        """
+        latest = (
+            QuestionAttempt.objects.filter(quiz_attempt=models.OuterRef("pk"))
+            .order_by("-created")
+            .values("created")[:1]
+        )
+        return self.annotate(
+            last_submission=Coalesce(models.Subquery(latest), models.F("created"))
+        )
+
+
 class QuizAttempt(TimeStampedModel):
     user = models.ForeignKey(
         User, related_name="quiz_attempts", on_delete=models.CASCADE
@@ -11,9 +51,31 @@ class QuizAttempt(TimeStampedModel):
     quiz = models.ForeignKey(Quiz, related_name="attempts", on_delete=models.CASCADE)
     completed = models.DateTimeField(blank=True, null=True)
     score = models.FloatField(null=True, blank=True)
+    # Orders the questions and answers of shuffled quizzes for this attempt
+    seed = models.PositiveIntegerField(default=new_seed, editable=False)
+    # Ids of the questions drawn for this attempt, for sampled quizzes
+    questions = models.JSONField(null=True, blank=True, editable=False)
+    # Deadline of timed quizzes, counted from ``created``. Expired attempts
+    # are closed in bulk by the expire_attempts command and marked timed out.
+    expires = models.DateTimeField(null=True, blank=True, editable=False)
+    timed_out = models.BooleanField(default=False, editable=False)
+
+    objects = QuizAttemptQuerySet.as_manager()
 
     class Meta:
         unique_together = ["user", "quiz", "created"]
+        indexes = [
+            # Cursor pagination of a user's attempts
+            models.Index(
+                fields=["user", "-created"], name="quizattempt_user_created_idx"
+            ),
+            # The sweeper's scan for expired attempts
+            models.Index(
+                fields=["expires"],
+                condition=models.Q(completed__isnull=True, expires__isnull=False),
+                name="quizattempt_open_expires_idx",
+            ),
+        ]
 
 
 class QuestionAttempt(TimeStampedModel):
@@ -26,4 +88,63 @@ class QuestionAttempt(TimeStampedModel):
     answer_selected = models.ForeignKey(
         Answer, related_name="selections", on_delete=models.CASCADE
     )
+    is_correct = models.BooleanField(default=False)
     time_taken = models.DurationField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # One answer per question per attempt, so a resubmission can't
+            # be scored twice.
+            models.UniqueConstraint(
+                fields=["quiz_attempt", "question"],
+                name="unique_question_per_attempt",
+            ),
+        ]
+        indexes = [
+            # An attempt's latest answer, which the next answer is timed from
+            models.Index(
+                fields=["quiz_attempt", "-created"], name="qattempt_attempt_created_idx"
+            ),
+        ]
+
+
+# Statistics, maintained incrementally by quiz_attempts.statistics so that
+# reading them never scans the attempt tables.
+class QuizStatistics(models.Model):
+    quiz = models.OneToOneField(
+        Quiz, primary_key=True, related_name="statistics", on_delete=models.CASCADE
+    )
+    attempt_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    total_score = models.FloatField(default=0)
+
+    @property
+    def average_score(self):
+        if not self.completed_count:
+            return None
+        return self.total_score / self.completed_count
+
+
+class QuestionStatistics(models.Model):
+    question = models.OneToOneField(
+        Question, primary_key=True, related_name="statistics", on_delete=models.CASCADE
+    )
+    attempt_count = models.PositiveIntegerField(default=0)
+    correct_count = models.PositiveIntegerField(default=0)
+
+    @property
+    def correct_rate(self):
+        if not self.attempt_count:
+            return None
+        return self.correct_count / self.attempt_count
+
+
+class AnswerStatistics(models.Model):
+    answer = models.OneToOneField(
+        Answer, primary_key=True, related_name="statistics", on_delete=models.CASCADE
+    )
+    # Denormalized so a question's answer counts are read without a join
+    question = models.ForeignKey(
+        Question, related_name="answer_statistics", on_delete=models.CASCADE
+    )
+    selection_count = models.PositiveIntegerField(default=0)
@@ -0,0 +1,48 @@
+"""
+Per-attempt order of questions and answers.
+
+Quizzes with ``shuffle_questions`` or ``shuffle_answers`` are shown to every
+attempt in an order derived from the attempt's ``seed``, so the same attempt
+always sees the same order and nothing but the seed is stored. The order is
+computed from the serialized questions in a single pass.
+"""
+import random
+
+
+def shuffled(items, rng):
+    """
+    A copy of ``items`` in uniformly random order (Fisher-Yates).
+    """
+    items = list(items)
+    for i in range(len(items) - 1, 0, -1):
+        j = rng.randint(0, i)
+        items[i], items[j] = items[j], items[i]
+    return items
+
+
+def attempt_questions(questions, seed, shuffle_questions, shuffle_answers):
+    """
+    Serialized questions in the order of the attempt with ``seed``, without
+    revealing the correct answers.
+
+    Each question's answers are shuffled with a generator of their own, so
+    their order doesn't change when questions are added to the quiz.
+    """
+    if shuffle_questions:
+        questions = shuffled(questions, random.Random(seed))
+
+    ordered = []
+    for question in questions:
+        answers = question["question_answers"]
+        if shuffle_answers:
+            answers = shuffled(answers, random.Random(f"{seed}:{question['pk']}"))
+        ordered.append(
+            {
+                **question,
+                "question_answers": [
+                    {key: value for key, value in answer.items() if key != "is_correct"}
+                    for answer in answers
+                ],
+            }
+        )
+    return ordered
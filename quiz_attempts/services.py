@@ -0,0 +1,283 @@
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+
+from quizzes import sampling
+from quizzes.answer_keys import get_answer_key
+from quizzes.models import Quiz
+from . import leaderboard, statistics, write_behind
+from .models import QuizAttempt, QuestionAttempt
+
+
+def add_to_score(quiz_attempt_id, points):
+    """
+    Add points to an open attempt's score in the database, so concurrent
+    submissions can't overwrite each other's increments. The update locks
+    the attempt until the transaction ends; returns False if the attempt was
+    closed, e.g. by ``close_expired_attempts``, since it was read.
+    """
+    changes = {"modified": timezone.now()}
+    if points:
+        changes["score"] = Coalesce(F("score"), Value(0.0)) + points
+    return bool(QuizAttempt.objects.open().filter(pk=quiz_attempt_id).update(**changes))
+
+
+@transaction.atomic
+def start_attempt(user, quiz):
+    quiz_attempt = QuizAttempt(user=user, quiz=quiz)
+    quiz_attempt.questions = sampling.draw(quiz, quiz_attempt.seed)
+    if quiz.time_limit:
+        quiz_attempt.expires = quiz_attempt.created + quiz.time_limit
+    quiz_attempt.save()
+    statistics.record_attempt_started(quiz.pk)
+    return quiz_attempt
+
+
+def _open_attempt(user, quiz_attempt_id):
+    return (
+        QuizAttempt.objects.open()
+        .filter(pk=quiz_attempt_id, user=user)
+        .with_last_submission()
+        .values_list("quiz_id", "questions", "last_submission")
+    )
+
+
+def _grade(quiz_id, question_id, answer_id, drawn=None):
+    """
+    Grade an answer to a question of an open attempt; ``drawn`` are the ids
+    of the attempt's questions if the quiz is sampled.
+    """
+    is_correct = None
+    if quiz_id is not None and (drawn is None or str(question_id) in drawn):
+        is_correct = get_answer_key(quiz_id).grade(question_id, answer_id)
+    if is_correct is None:
+        raise ValidationError(
+            "The answer must belong to the question, and the question to an "
+            "open attempt of yours."
+        )
+    return is_correct
+
+
+def _record_answer(quiz_attempt_id, question_id, answer_id, is_correct, since):
+    """
+    Insert a graded answer, timed from ``since``, the attempt's previous
+    submission or its start.
+    """
+    now = timezone.now()
+    try:
+        with transaction.atomic():
+            # First, so the attempt can't be closed before the answer is in
+            if not add_to_score(quiz_attempt_id, int(is_correct)):
+                raise ValidationError("The attempt is closed.")
+            question_attempt = QuestionAttempt.objects.create(
+                quiz_attempt_id=quiz_attempt_id,
+                question_id=question_id,
+                answer_selected_id=answer_id,
+                is_correct=is_correct,
+                time_taken=now - since,
+                created=now,
+                modified=now,
+            )
+            statistics.record_question_attempts([question_attempt])
+    except IntegrityError:
+        raise ValidationError("This question has already been answered.")
+    return question_attempt
+
+
+def submit_answer(user, quiz_attempt_id, question_id, answer_id):
+    """
+    Record the user's answer to a question of one of their open attempts.
+
+    The attempt is checked, and its previous submission found for timing the
+    answer, with one query; the answer is graded against the quiz's
+    in-memory answer key. The insert and the score increment then run
+    in a single transaction, or in write-behind mode the answer is buffered
+    and written later with others (see ``write_behind``).
+    """
+    if write_behind.enabled():
+        return write_behind.submit(
+            user, quiz_attempt_id, question_id, answer_id, grade=_grade
+        )
+    row = _open_attempt(user, quiz_attempt_id).first()
+    quiz_id, drawn, since = row or (None, None, None)
+    is_correct = _grade(quiz_id, question_id, answer_id, drawn)
+    return _record_answer(quiz_attempt_id, question_id, answer_id, is_correct, since)
+
+
+def submit_answers(user, quiz_attempt_id, submissions, complete=True):
+    """
+    Record a batch of answers for one of the user's open attempts.
+
+    ``submissions`` is a list of ``(index, {"question", "answer_selected"})``
+    pairs. Every answer is graded against the quiz's answer key; valid ones
+    are inserted with a single ``bulk_create`` and scored in one update, which
+    also marks the attempt completed if ``complete`` is set. The time since
+    the previous submission is split evenly between the batch's answers.
+
+    Returns the created question attempts and a list of per-item errors.
+    """
+    # Buffered answers count as answered, and towards the score
+    write_behind.settle(user.pk)
+    with transaction.atomic():
+        # Locking the attempt serializes batches for it, so the "already
+        # answered" check below can't race another batch.
+        quiz_attempt = (
+            QuizAttempt.objects.open()
+            .select_for_update()
+            .filter(pk=quiz_attempt_id, user=user)
+            .with_last_submission()
+            .first()
+        )
+        if quiz_attempt is None:
+            raise NotFound("No open attempt with this id.")
+
+        answer_key = get_answer_key(quiz_attempt.quiz_id)
+        drawn = quiz_attempt.questions
+        answered = set(
+            quiz_attempt.question_attempts.values_list("question_id", flat=True)
+        )
+
+        now = timezone.now()
+        question_attempts, errors = [], []
+        for index, submission in submissions:
+            question_id = submission["question"]
+            is_correct = answer_key.grade(question_id, submission["answer_selected"])
+            if drawn is not None and str(question_id) not in drawn:
+                is_correct = None
+            if is_correct is None:
+                errors.append(
+                    {
+                        "index": index,
+                        "errors": [
+                            "The answer must belong to a question of this attempt."
+                        ],
+                    }
+                )
+                continue
+            if question_id in answered:
+                errors.append(
+                    {"index": index, "errors": ["This question was already answered."]}
+                )
+                continue
+
+            answered.add(question_id)
+            question_attempts.append(
+                QuestionAttempt(
+                    quiz_attempt=quiz_attempt,
+                    question_id=question_id,
+                    answer_selected_id=submission["answer_selected"],
+                    is_correct=is_correct,
+                    created=now,
+                    modified=now,
+                )
+            )
+
+        if question_attempts:
+            time_taken = (now - quiz_attempt.last_submission) / len(question_attempts)
+            for question_attempt in question_attempts:
+                question_attempt.time_taken = time_taken
+        QuestionAttempt.objects.bulk_create(question_attempts)
+        statistics.record_question_attempts(question_attempts)
+
+        changes = {"modified": now}
+        points = sum(
+            question_attempt.is_correct for question_attempt in question_attempts
+        )
+        if points:
+            changes["score"] = Coalesce(F("score"), Value(0.0)) + points
+        if complete:
+            changes["completed"] = now
+        QuizAttempt.objects.filter(pk=quiz_attempt.pk).update(**changes)
+        if complete:
+            score = QuizAttempt.objects.values_list("score", flat=True).get(
+                pk=quiz_attempt.pk
+            )
+            statistics.record_attempt_completed(quiz_attempt.quiz_id, score)
+            transaction.on_commit(
+                lambda: leaderboard.record_completed_attempt(
+                    user.pk, quiz_attempt.quiz_id, score
+                )
+            )
+
+    return question_attempts, errors
+
+
+def close_expired_attempts(now=None, batch_size=500):
+    """
+    Close the attempts that are past their time limit, ``batch_size`` at a
+    time: each batch is marked completed at its deadline and timed out with
+    one UPDATE, then counted in the statistics and leaderboards with the
+    score it had. Attempts locked by a submission are left for the next run.
+    Returns the number of attempts closed.
+    """
+    now = now or timezone.now()
+    closed = 0
+    while True:
+        if write_behind.enabled():
+            # Buffered answers were accepted before the deadline, so they count
+            for user_id in set(
+                QuizAttempt.objects.expired(now)
+                .order_by("expires")
+                .values_list("user_id", flat=True)[:batch_size]
+            ):
+                write_behind.settle(user_id)
+
+        with transaction.atomic():
+            attempts = list(
+                QuizAttempt.objects.expired(now)
+                .select_for_update(skip_locked=True)
+                .order_by("expires")
+                .values_list("pk", "user_id", "quiz_id", "score")[:batch_size]
+            )
+            if not attempts:
+                return closed
+            QuizAttempt.objects.filter(
+                pk__in=[pk for pk, user_id, quiz_id, score in attempts]
+            ).update(completed=F("expires"), timed_out=True, modified=now)
+            statistics.record_attempts_completed(
+                (quiz_id, score) for pk, user_id, quiz_id, score in attempts
+            )
+
+            def record_leaderboards(attempts=attempts):
+                for pk, user_id, quiz_id, score in attempts:
+                    leaderboard.record_completed_attempt(user_id, quiz_id, score)
+
+            transaction.on_commit(record_leaderboards)
+        closed += len(attempts)
+
+
+# Async variants, for the views served under ASGI. Reads use the async ORM;
+# writes that must be atomic run in a thread, since transactions can't span
+# async queries.
+async def astart_attempt(user, quiz_id):
+    try:
+        quiz = await Quiz.objects.only(
+            "pk", "sample_size", "stratify_sample", "time_limit"
+        ).aget(pk=quiz_id)
+    except (Quiz.DoesNotExist, ValueError, DjangoValidationError):
+        raise NotFound("No quiz with this id.")
+    return await sync_to_async(start_attempt)(user, quiz)
+
+
+async def asubmit_answer(user, quiz_attempt_id, question_id, answer_id):
+    if write_behind.enabled():
+        return await sync_to_async(submit_answer)(
+            user, quiz_attempt_id, question_id, answer_id
+        )
+    row = await _open_attempt(user, quiz_attempt_id).afirst()
+    quiz_id, drawn, since = row or (None, None, None)
+    # The answer key only queries when it isn't cached in this process
+    is_correct = await sync_to_async(_grade)(quiz_id, question_id, answer_id, drawn)
+    return await sync_to_async(_record_answer)(
+        quiz_attempt_id, question_id, answer_id, is_correct, since
+    )
+
+
+async def asubmit_answers(user, quiz_attempt_id, submissions, complete=True):
+    return await sync_to_async(submit_answers)(
+        user, quiz_attempt_id, submissions, complete
+    )
@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from quizzes import cache as quiz_cache
+from .models import QuizAttempt
+
+
+@receiver(post_delete, sender=QuizAttempt)
+def invalidate_quiz_lists(sender, instance, **kwargs):
+    # Summary lists count attempts, and their ETags only see new ones
+    quiz_cache.invalidate()
@@ -0,0 +1,164 @@
+"""
+Incremental maintenance of the statistics tables.
+
+Every change is an ``UPDATE ... SET count = count + n``, so concurrent writers
+never lose increments. Rows are created on first use with an
+``INSERT ... ON CONFLICT DO NOTHING``; ``rebuild_statistics`` recomputes them
+all from the attempt tables.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, Q, Sum
+
+from .models import (
+    QuizAttempt,
+    QuestionAttempt,
+    QuizStatistics,
+    QuestionStatistics,
+    AnswerStatistics,
+)
+
+
+def _increment(model, increments):
+    """
+    Apply ``{pk: {column: amount}}`` increments, with one UPDATE per distinct
+    set of amounts rather than one per row.
+    """
+    by_amounts = defaultdict(list)
+    for pk, amounts in increments.items():
+        by_amounts[tuple(sorted(amounts.items()))].append(pk)
+
+    for amounts, pks in by_amounts.items():
+        model.objects.filter(pk__in=pks).update(
+            **{column: F(column) + amount for column, amount in amounts}
+        )
+
+
+def record_attempt_started(quiz_id):
+    QuizStatistics.objects.bulk_create(
+        [QuizStatistics(quiz_id=quiz_id)], ignore_conflicts=True
+    )
+    _increment(QuizStatistics, {quiz_id: {"attempt_count": 1}})
+
+
+def record_attempt_completed(quiz_id, score):
+    record_attempts_completed([(quiz_id, score)])
+
+
+def record_attempts_completed(attempts):
+    """
+    Count ``(quiz_id, score)`` completed attempts towards their quizzes.
+    """
+    increments = {}
+    for quiz_id, score in attempts:
+        amounts = increments.setdefault(
+            quiz_id, {"completed_count": 0, "total_score": 0}
+        )
+        amounts["completed_count"] += 1
+        amounts["total_score"] += score or 0
+    if not increments:
+        return
+
+    QuizStatistics.objects.bulk_create(
+        [QuizStatistics(quiz_id=quiz_id) for quiz_id in increments],
+        ignore_conflicts=True,
+    )
+    _increment(QuizStatistics, increments)
+
+
+def record_question_attempts(question_attempts):
+    """
+    Count new question attempts towards their question and answer statistics.
+    """
+    if not question_attempts:
+        return
+
+    attempts = Counter(qa.question_id for qa in question_attempts)
+    correct = Counter(qa.question_id for qa in question_attempts if qa.is_correct)
+    selections = Counter(qa.answer_selected_id for qa in question_attempts)
+    answer_questions = {
+        qa.answer_selected_id: qa.question_id for qa in question_attempts
+    }
+
+    QuestionStatistics.objects.bulk_create(
+        [QuestionStatistics(question_id=question_id) for question_id in attempts],
+        ignore_conflicts=True,
+    )
+    AnswerStatistics.objects.bulk_create(
+        [
+            AnswerStatistics(answer_id=answer_id, question_id=question_id)
+            for answer_id, question_id in answer_questions.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+    _increment(
+        QuestionStatistics,
+        {
+            question_id: {
+                "attempt_count": count,
+                "correct_count": correct[question_id],
+            }
+            for question_id, count in attempts.items()
+        },
+    )
+    _increment(
+        AnswerStatistics,
+        {
+            answer_id: {"selection_count": count}
+            for answer_id, count in selections.items()
+        },
+    )
+
+
+def compute_statistics():
+    """
+    Statistics computed from scratch from the attempt tables, as lists of
+    unsaved rows.
+    """
+    quizzes = [
+        QuizStatistics(
+            quiz_id=row["quiz_id"],
+            attempt_count=row["attempt_count"],
+            completed_count=row["completed_count"],
+            total_score=row["total_score"] or 0,
+        )
+        for row in QuizAttempt.objects.order_by()
+        .values("quiz_id")
+        .annotate(
+            attempt_count=Count("pk"),
+            completed_count=Count("pk", filter=Q(completed__isnull=False)),
+            total_score=Sum("score", filter=Q(completed__isnull=False)),
+        )
+        .iterator()
+    ]
+    questions = [
+        QuestionStatistics(
+            question_id=row["question_id"],
+            attempt_count=row["attempt_count"],
+            correct_count=row["correct_count"],
+        )
+        for row in QuestionAttempt.objects.order_by()
+        .values("question_id")
+        .annotate(
+            attempt_count=Count("pk"),
+            correct_count=Count("pk", filter=Q(is_correct=True)),
+        )
+        .iterator()
+    ]
+    answers = [
+        AnswerStatistics(
+            answer_id=row["answer_selected_id"],
+            question_id=row["question_id"],
+            selection_count=row["selection_count"],
+        )
+        for row in QuestionAttempt.objects.order_by()
+        .values("answer_selected_id", "question_id")
+        .annotate(selection_count=Count("pk"))
+        .iterator()
+    ]
+    return {
+        QuizStatistics: quizzes,
+        QuestionStatistics: questions,
+        AnswerStatistics: answers,
+    }
@@ -1,3 +1,932 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import tempfile
+import threading
+import uuid
+from datetime import timedelta
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.apps import apps
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APITestCase
+
+from core.testing import make_quiz
+from profiles.models import Student, Teacher
+from quizzes.models import Answer
+from . import exports, leaderboard, ordering, services, write_behind
+from .models import (
+    AnswerStatistics,
+    QuestionAttempt,
+    QuestionStatistics,
+    QuizAttempt,
+    QuizStatistics,
+)
+
+
+def answers_of(quiz):
+    """
+    ``[(question, correct answer, wrong answer)]`` in question order.
+    """
+    answers = {}
+    for answer in Answer.objects.filter(question__quiz=quiz).select_related("question"):
+        answers.setdefault(answer.question, {})[answer.is_correct] = answer
+    return [
+        (question, choices[True], choices[False])
+        for question, choices in sorted(answers.items(), key=lambda item: item[0].order)
+    ]
+
+
+class AttemptTestCase(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        cls.student = Student.objects.create(username="student")
+        cls.quiz = make_quiz(cls.teacher, "Quiz", 4)
+        cls.answers = answers_of(cls.quiz)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(self.student)
+
+    def start_attempt(self):
+        return services.start_attempt(self.student, self.quiz)
+
+
+class SingleSubmissionTests(AttemptTestCase):
+    def submit(self, quiz_attempt, question, answer):
+        return self.client.post(
+            reverse("question_attempt_list_create"),
+            {
+                "quiz_attempt": quiz_attempt.pk,
+                "question": str(question.pk),
+                "answer_selected": str(answer.pk),
+            },
+            format="json",
+        )
+
+    def test_answers_are_recorded_and_scored(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (q2, _, wrong2), _, _ = self.answers
+
+        first = self.submit(quiz_attempt, q1, right1)
+        second = self.submit(quiz_attempt, q2, wrong2)
+
+        self.assertEqual(first.status_code, 201)
+        self.assertTrue(first.data["is_correct"])
+        self.assertFalse(second.data["is_correct"])
+        quiz_attempt.refresh_from_db()
+        self.assertEqual(quiz_attempt.score, 1.0)
+
+    def test_answers_of_another_question_are_rejected(self):
+        quiz_attempt = self.start_attempt()
+        (q1, _, _), (_, right2, _), _, _ = self.answers
+
+        response = self.submit(quiz_attempt, q1, right2)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(quiz_attempt.question_attempts.exists())
+
+    def test_questions_are_answered_once(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, wrong1), _, _, _ = self.answers
+        self.submit(quiz_attempt, q1, wrong1)
+
+        response = self.submit(quiz_attempt, q1, right1)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            list(quiz_attempt.question_attempts.values_list("is_correct", flat=True)),
+            [False],
+        )
+        quiz_attempt.refresh_from_db()
+        self.assertIsNone(quiz_attempt.score)
+
+    def test_scores_are_incremented_in_the_database(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (q2, right2, _), _, _ = self.answers
+        services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+        # Points added meanwhile by another submission aren't overwritten
+        QuizAttempt.objects.filter(pk=quiz_attempt.pk).update(score=5.0)
+
+        services.submit_answer(self.student, quiz_attempt.pk, q2.pk, right2.pk)
+
+        quiz_attempt.refresh_from_db()
+        self.assertEqual(quiz_attempt.score, 6.0)
+
+
+class BatchSubmissionTests(AttemptTestCase):
+    def submit(self, quiz_attempt, answers, complete=True):
+        return self.client.post(
+            reverse("quiz_attempt_submit", kwargs={"pk": quiz_attempt.pk}),
+            {"answers": answers, "complete": complete},
+            format="json",
+        )
+
+    def test_valid_items_are_recorded_and_invalid_ones_reported(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (q2, _, wrong2), (q3, right3, _), _ = self.answers
+
+        response = self.submit(
+            quiz_attempt,
+            [
+                {"question": str(q1.pk), "answer_selected": str(right1.pk)},
+                {"question": str(q2.pk), "answer_selected": str(wrong2.pk)},
+                {"question": "not a uuid", "answer_selected": str(right1.pk)},
+                {"question": str(q1.pk), "answer_selected": str(right1.pk)},
+                {"question": str(q3.pk), "answer_selected": str(right1.pk)},
+            ],
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            [item["is_correct"] for item in response.data["question_attempts"]],
+            [True, False],
+        )
+        errors = {error["index"]: error["errors"] for error in response.data["errors"]}
+        self.assertEqual(list(errors), [2, 3, 4])
+        self.assertIn("question", errors[2])
+        self.assertEqual(errors[3], ["This question was already answered."])
+        self.assertEqual(
+            errors[4], ["The answer must belong to a question of this attempt."]
+        )
+
+        quiz_attempt.refresh_from_db()
+        self.assertEqual(quiz_attempt.score, 1.0)
+        self.assertIsNotNone(quiz_attempt.completed)
+        self.assertEqual(response.data["quiz_attempt"]["score"], 1.0)
+
+    def test_incomplete_batches_leave_the_attempt_open(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (q2, right2, _), _, _ = self.answers
+
+        self.submit(
+            quiz_attempt,
+            [{"question": str(q1.pk), "answer_selected": str(right1.pk)}],
+            complete=False,
+        )
+        quiz_attempt.refresh_from_db()
+        self.assertIsNone(quiz_attempt.completed)
+
+        response = self.submit(
+            quiz_attempt,
+            [{"question": str(q2.pk), "answer_selected": str(right2.pk)}],
+        )
+
+        self.assertEqual(response.status_code, 201)
+        quiz_attempt.refresh_from_db()
+        self.assertEqual(quiz_attempt.score, 2.0)
+        self.assertIsNotNone(quiz_attempt.completed)
+
+        # Completed attempts take no more answers
+        response = self.submit(
+            quiz_attempt,
+            [{"question": str(q2.pk), "answer_selected": str(right2.pk)}],
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(ANSWER_BATCH_MAX_SIZE=2)
+    def test_batches_are_capped(self):
+        quiz_attempt = self.start_attempt()
+        answers = [
+            {"question": str(question.pk), "answer_selected": str(right.pk)}
+            for question, right, _ in self.answers[:3]
+        ]
+
+        response = self.submit(quiz_attempt, answers)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("answers", response.data)
+        self.assertFalse(quiz_attempt.question_attempts.exists())
+
+
+class AsyncEndpointTests(AttemptTestCase):
+    def post(self, name, data, **kwargs):
+        return self.client.post(reverse(name, kwargs=kwargs), data, format="json")
+
+    def test_attempts_are_started(self):
+        response = self.post("async_quiz_attempt_start", {"quiz": str(self.quiz.pk)})
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        quiz_attempt = QuizAttempt.objects.get()
+        self.assertEqual(data["pk"], quiz_attempt.pk)
+        self.assertEqual(data["user"], self.student.pk)
+        self.assertEqual(quiz_attempt.quiz, self.quiz)
+
+    def test_anonymous_requests_are_rejected(self):
+        self.client.force_authenticate(None)
+
+        response = self.post("async_quiz_attempt_start", {"quiz": str(self.quiz.pk)})
+
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(QuizAttempt.objects.exists())
+
+    def test_errors_are_mapped_to_responses(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), _, _, _ = self.answers
+        answers = [{"question": str(q1.pk), "answer_selected": str(right1.pk)}]
+
+        unknown = self.post("async_quiz_attempt_start", {"quiz": str(uuid.uuid4())})
+        invalid = self.post(
+            "async_question_attempt_create",
+            {"quiz_attempt": quiz_attempt.pk, "question": str(q1.pk)},
+        )
+        missing = self.post("async_quiz_attempt_submit", {"answers": answers}, pk=0)
+
+        self.assertEqual(unknown.status_code, 404)
+        self.assertEqual(invalid.status_code, 400)
+        self.assertIn("answer_selected", invalid.json())
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(
+            self.client.get(reverse("async_quiz_attempt_start")).status_code, 405
+        )
+
+    def test_answers_are_submitted(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (q2, _, wrong2), (q3, right3, _), _ = self.answers
+
+        single = self.post(
+            "async_question_attempt_create",
+            {
+                "quiz_attempt": quiz_attempt.pk,
+                "question": str(q1.pk),
+                "answer_selected": str(right1.pk),
+            },
+        )
+        batch = self.post(
+            "async_quiz_attempt_submit",
+            {
+                "answers": [
+                    {"question": str(q2.pk), "answer_selected": str(wrong2.pk)},
+                    {"question": str(q3.pk), "answer_selected": str(right1.pk)},
+                ]
+            },
+            pk=quiz_attempt.pk,
+        )
+
+        self.assertEqual(single.status_code, 201)
+        self.assertTrue(single.json()["is_correct"])
+        self.assertEqual(batch.status_code, 201)
+        data = batch.json()
+        self.assertEqual(data["quiz_attempt"]["score"], 1.0)
+        self.assertIsNotNone(data["quiz_attempt"]["completed"])
+        self.assertEqual(
+            [item["is_correct"] for item in data["question_attempts"]], [False]
+        )
+        self.assertEqual([error["index"] for error in data["errors"]], [1])
+
+
+class StatisticsTests(AttemptTestCase):
+    def answer_all(self, complete=True):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (q2, _, wrong2), (q3, right3, _), _ = self.answers
+        services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+        services.submit_answers(
+            self.student,
+            quiz_attempt.pk,
+            [
+                (0, {"question": q2.pk, "answer_selected": wrong2.pk}),
+                (1, {"question": q3.pk, "answer_selected": right3.pk}),
+            ],
+            complete=complete,
+        )
+        return quiz_attempt
+
+    def test_submissions_are_counted(self):
+        self.answer_all()
+        self.answer_all(complete=False)
+        (q1, _, wrong1), (q2, _, wrong2), _, (q4, _, _) = self.answers
+
+        quiz_statistics = QuizStatistics.objects.get(quiz=self.quiz)
+        self.assertEqual(quiz_statistics.attempt_count, 2)
+        self.assertEqual(quiz_statistics.completed_count, 1)
+        self.assertEqual(quiz_statistics.average_score, 2.0)
+
+        self.assertEqual(QuestionStatistics.objects.get(question=q1).correct_rate, 1)
+        self.assertEqual(QuestionStatistics.objects.get(question=q2).correct_rate, 0)
+        self.assertFalse(QuestionStatistics.objects.filter(question=q4).exists())
+        self.assertEqual(AnswerStatistics.objects.get(answer=wrong2).selection_count, 2)
+        self.assertFalse(AnswerStatistics.objects.filter(answer=wrong1).exists())
+
+    def test_rebuild_restores_drifted_statistics(self):
+        self.answer_all()
+        QuizStatistics.objects.update(attempt_count=99)
+        QuestionStatistics.objects.filter(question=self.answers[0][0]).delete()
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_statistics", verify_only=True, stderr=StringIO())
+
+        call_command("rebuild_statistics", stdout=StringIO())
+        self.assertEqual(QuizStatistics.objects.get().attempt_count, 1)
+        self.assertEqual(
+            QuestionStatistics.objects.get(question=self.answers[0][0]).attempt_count,
+            1,
+        )
+
+
+class AttemptOrderTests(AttemptTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.quiz = make_quiz(cls.teacher, "Shuffled", 12)
+        cls.quiz.shuffle_questions = cls.quiz.shuffle_answers = True
+        cls.quiz.save()
+
+    def questions_of(self, seed):
+        quiz_attempt = self.start_attempt()
+        QuizAttempt.objects.filter(pk=quiz_attempt.pk).update(seed=seed)
+        response = self.client.get(
+            reverse("quiz_attempt_questions", kwargs={"pk": quiz_attempt.pk})
+        )
+        return response.data["questions"]
+
+    def test_the_seed_decides_the_order(self):
+        questions = self.questions_of(seed=1)
+
+        self.assertEqual(self.questions_of(seed=1), questions)
+        self.assertNotEqual(
+            [question["pk"] for question in self.questions_of(seed=2)],
+            [question["pk"] for question in questions],
+        )
+
+    def test_answers_are_shuffled_per_question(self):
+        questions = [
+            {"pk": pk, "question_answers": [{"pk": answer} for answer in range(8)]}
+            for pk in range(2)
+        ]
+
+        first, second = ordering.attempt_questions(questions, 1, False, True)
+        (again,) = ordering.attempt_questions(questions[:1], 1, False, True)
+
+        self.assertEqual(first, again)
+        self.assertNotEqual(first["question_answers"], second["question_answers"])
+        self.assertEqual(
+            sorted(answer["pk"] for answer in first["question_answers"]),
+            list(range(8)),
+        )
+
+    def test_correct_answers_are_never_revealed(self):
+        questions = self.questions_of(seed=1)
+
+        self.assertEqual(len(questions), 12)
+        answers = [
+            answer for question in questions for answer in question["question_answers"]
+        ]
+        self.assertEqual(len(answers), 24)
+        for answer in answers:
+            self.assertNotIn("is_correct", answer)
+
+    def test_true_false_answers_are_submitted_from_the_payload(self):
+        quiz_attempt = self.start_attempt()
+        response = self.client.get(
+            reverse("quiz_attempt_questions", kwargs={"pk": quiz_attempt.pk})
+        )
+        question = next(
+            question
+            for question in response.data["questions"]
+            if question["question_text"] == "Question 1"
+        )
+        (true,) = [
+            answer
+            for answer in question["question_answers"]
+            if answer["answer_text"] == "True"
+        ]
+
+        response = self.client.post(
+            reverse("question_attempt_list_create"),
+            {
+                "quiz_attempt": quiz_attempt.pk,
+                "question": str(question["pk"]),
+                "answer_selected": str(true["pk"]),
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(response.data["is_correct"])
+
+
+class SampledAttemptTests(AttemptTestCase):
+    def sample(self, size):
+        self.quiz.sample_size = size
+        self.quiz.save()
+
+    def questions_of(self, quiz_attempt):
+        response = self.client.get(
+            reverse("quiz_attempt_questions", kwargs={"pk": quiz_attempt.pk})
+        )
+        return response.data["questions"]
+
+    def test_drawn_questions_are_shown_like_the_whole_quiz(self):
+        questions = self.questions_of(self.start_attempt())
+        self.sample(len(self.answers))
+
+        sampled = self.questions_of(self.start_attempt())
+
+        self.assertEqual(sampled, questions)
+        self.assertEqual(
+            [answer["answer_text"] for answer in sampled[0]["question_answers"]],
+            ["True", "False"],
+        )
+        self.assertEqual(len(sampled[1]["question_answers"]), 2)
+
+    def test_only_drawn_questions_can_be_answered(self):
+        self.sample(2)
+        quiz_attempt = self.start_attempt()
+        drawn = [
+            (question, right)
+            for question, right, _ in self.answers
+            if str(question.pk) in quiz_attempt.questions
+        ]
+        (question, right), *_ = [
+            (question, right)
+            for question, right, _ in self.answers
+            if str(question.pk) not in quiz_attempt.questions
+        ]
+
+        with self.assertRaises(ValidationError):
+            services.submit_answer(self.student, quiz_attempt.pk, question.pk, right.pk)
+        for question, right in drawn:
+            services.submit_answer(self.student, quiz_attempt.pk, question.pk, right.pk)
+
+        quiz_attempt.refresh_from_db()
+        self.assertEqual(len(drawn), 2)
+        self.assertEqual(quiz_attempt.score, 2.0)
+
+
+class TimeLimitTests(AttemptTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.quiz.time_limit = timedelta(minutes=10)
+        cls.quiz.save()
+
+    def expire(self, quiz_attempt):
+        QuizAttempt.objects.filter(pk=quiz_attempt.pk).update(
+            expires=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_expired_attempts_are_closed_at_their_deadline(self):
+        quiz_attempt = self.start_attempt()
+        open_attempt = self.start_attempt()
+        (q1, right1, _), _, _, _ = self.answers
+        services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+        self.expire(quiz_attempt)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("expire_attempts", stdout=StringIO())
+
+        quiz_attempt.refresh_from_db()
+        self.assertTrue(quiz_attempt.timed_out)
+        self.assertEqual(quiz_attempt.completed, quiz_attempt.expires)
+        self.assertEqual(quiz_attempt.score, 1.0)
+        open_attempt.refresh_from_db()
+        self.assertIsNone(open_attempt.completed)
+        self.assertFalse(open_attempt.timed_out)
+        self.assertEqual(QuizStatistics.objects.get().completed_count, 1)
+        self.assertEqual(services.close_expired_attempts(), 0)
+
+    def test_late_submissions_are_rejected(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), _, _, _ = self.answers
+        self.expire(quiz_attempt)
+
+        # Before the sweeper has closed the attempt
+        with self.assertRaises(ValidationError):
+            services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+        response = self.client.post(
+            reverse("quiz_attempt_submit", kwargs={"pk": quiz_attempt.pk}),
+            {"answers": [{"question": str(q1.pk), "answer_selected": str(right1.pk)}]},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(quiz_attempt.question_attempts.exists())
+
+    def test_answers_are_not_recorded_once_the_attempt_is_closed(self):
+        (q1, right1, _), (q2, _, wrong2), _, _ = self.answers
+        for close in [
+            self.expire,
+            lambda quiz_attempt: services.close_expired_attempts(),
+        ]:
+            quiz_attempt = self.start_attempt()
+            self.expire(quiz_attempt)
+            close(quiz_attempt)
+
+            # As if closed between reading the attempt and recording the answer
+            for question, answer, is_correct in [
+                (q1, right1, True),
+                (q2, wrong2, False),
+            ]:
+                with self.assertRaises(ValidationError):
+                    services._record_answer(
+                        quiz_attempt.pk,
+                        question.pk,
+                        answer.pk,
+                        is_correct,
+                        timezone.now(),
+                    )
+
+            self.assertFalse(quiz_attempt.question_attempts.exists())
+            self.assertIsNone(QuizAttempt.objects.get(pk=quiz_attempt.pk).score)
+
+    def test_answers_are_timed_from_the_previous_submission(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (q2, right2, _), (q3, right3, _), _ = self.answers
+        QuizAttempt.objects.filter(pk=quiz_attempt.pk).update(
+            created=timezone.now() - timedelta(seconds=30)
+        )
+
+        first = services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+        QuestionAttempt.objects.filter(pk=first.pk).update(
+            created=timezone.now() - timedelta(seconds=20)
+        )
+        batch, _ = services.submit_answers(
+            self.student,
+            quiz_attempt.pk,
+            [
+                (0, {"question": q2.pk, "answer_selected": right2.pk}),
+                (1, {"question": q3.pk, "answer_selected": right3.pk}),
+            ],
+        )
+
+        margin = timedelta(seconds=5)
+        self.assertAlmostEqual(first.time_taken, timedelta(seconds=30), delta=margin)
+        for question_attempt in QuestionAttempt.objects.filter(
+            pk__in=[question_attempt.pk for question_attempt in batch]
+        ):
+            self.assertAlmostEqual(
+                question_attempt.time_taken, timedelta(seconds=10), delta=margin
+            )
+
+
+class ExportTests(AttemptTestCase):
+    def setUp(self):
+        super().setUp()
+        self.answered = self.start_attempt()
+        (q1, right1, _), (q2, _, wrong2), _, _ = self.answers
+        services.submit_answer(self.student, self.answered.pk, q1.pk, right1.pk)
+        services.submit_answer(self.student, self.answered.pk, q2.pk, wrong2.pk)
+        self.unanswered = self.start_attempt()
+        self.client.force_authenticate(self.teacher)
+
+    def export(self, **params):
+        response = self.client.get(reverse("quiz_attempt_export"), params)
+        if response.status_code != 200:
+            return response, None
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_only_teachers_export(self):
+        self.client.force_authenticate(self.student)
+
+        response, _ = self.export()
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_other_teachers_quizzes_are_not_exported(self):
+        self.client.force_authenticate(Teacher.objects.create(username="other"))
+
+        response, _ = self.export(quiz=str(self.quiz.pk))
+        self.assertEqual(response.status_code, 404)
+        _, content = self.export()
+        self.assertEqual(content.splitlines(), [",".join(exports.CSV_COLUMNS)])
+
+    def test_csv_has_a_line_per_answer(self):
+        response, content = self.export(quiz=str(self.quiz.pk))
+
+        self.assertEqual(response["Content-Type"], "text/csv")
+        header, *rows = csv.reader(StringIO(content))
+        self.assertEqual(header, exports.CSV_COLUMNS)
+        rows = [dict(zip(header, row)) for row in rows]
+        self.assertEqual(
+            [(row["attempt_id"], row["is_correct"]) for row in rows],
+            [
+                (str(self.answered.pk), "True"),
+                (str(self.answered.pk), "False"),
+                (str(self.unanswered.pk), ""),
+            ],
+        )
+        self.assertEqual(rows[0]["username"], "student")
+        self.assertEqual(rows[0]["score"], "1.0")
+        self.assertEqual(rows[0]["question_id"], str(self.answers[0][0].pk))
+
+    def test_jsonl_has_a_line_per_attempt(self):
+        response, content = self.export(file_format="jsonl")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        answered, unanswered = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(answered["attempt_id"], self.answered.pk)
+        self.assertEqual(
+            [item["is_correct"] for item in answered["question_attempts"]],
+            [True, False],
+        )
+        self.assertEqual(unanswered["question_attempts"], [])
+
+    def test_unknown_formats_are_rejected(self):
+        response, _ = self.export(file_format="xlsx")
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_attempts_are_read_in_chunks_with_their_answers(self):
+        attempts = exports.attempts_for_export(
+            QuizAttempt.objects.filter(quiz=self.quiz), chunk_size=1
+        )
+
+        # The attempts, then the answers of each chunk of one attempt
+        with self.assertNumQueries(3):
+            rows = list(exports.csv_rows(attempts))
+        self.assertEqual(len(rows), 4)
+
+
+class LeaderboardStoreTests:
+    """
+    Tests run against every store; subclasses provide ``make_store()``.
+    """
+
+    def setUp(self):
+        self.store = self.make_store()
+
+    def test_boards_keep_best_scores_and_totals(self):
+        for board, score in [
+            ("quiz:a", 5),
+            ("quiz:a", 7),
+            ("quiz:a", 6),
+            ("quiz:b", 2),
+        ]:
+            self.store.update_best(board, 1, score, total_board="global")
+        self.store.update_best("quiz:a", 2, 8, total_board="global")
+
+        self.assertEqual(self.store.score("quiz:a", 1), 7)
+        self.assertEqual(self.store.score("global", 1), 9)
+        self.assertEqual(self.store.top("quiz:a", 10), [(2, 8), (1, 7)])
+        self.assertEqual(self.store.rank("global", 1), (1, 9))
+        self.assertEqual(self.store.rank("global", 2), (2, 8))
+        self.assertIsNone(self.store.rank("global", 3))
+        self.assertEqual(self.store.size("quiz:b"), 1)
+
+    def test_gains_are_returned(self):
+        self.assertEqual(self.store.update_best("quiz:a", 1, 5), 5)
+        self.assertEqual(self.store.update_best("quiz:a", 1, 7.5), 2.5)
+        self.assertEqual(self.store.update_best("quiz:a", 1, 7), 0)
+
+    def test_concurrent_updates_add_each_gain_once(self):
+        self.store.update_best("quiz:a", 1, 5, total_board="global")
+        barrier = threading.Barrier(20)
+
+        def complete(score):
+            barrier.wait()
+            self.store.update_best("quiz:a", 1, score, total_board="global")
+
+        threads = [
+            threading.Thread(target=complete, args=(score,)) for score in range(6, 26)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.store.score("quiz:a", 1), 25)
+        self.assertEqual(self.store.score("global", 1), 25)
+
+    def test_rebuild_replaces_every_board(self):
+        self.store.update_best("quiz:stale", 9, 1, total_board="global")
+        self.store.rebuild([("a", 1, 3.0), ("b", 1, 2.0), ("a", 2, 4.0)])
+
+        self.assertEqual(self.store.top("quiz:a", 10), [(2, 4.0), (1, 3.0)])
+        self.assertEqual(self.store.top("global", 10), [(1, 5.0), (2, 4.0)])
+        self.assertEqual(self.store.size("quiz:stale"), 0)
+
+
+class MemoryLeaderboardStoreTests(LeaderboardStoreTests, SimpleTestCase):
+    def make_store(self):
+        return leaderboard.MemoryLeaderboardStore()
+
+
+@skipUnless(
+    os.environ.get("LEADERBOARD_TEST_REDIS_URL"),
+    "Set LEADERBOARD_TEST_REDIS_URL to test the Redis store.",
+)
+class RedisLeaderboardStoreTests(LeaderboardStoreTests, SimpleTestCase):
+    def make_store(self):
+        return leaderboard.RedisLeaderboardStore(
+            url=os.environ["LEADERBOARD_TEST_REDIS_URL"],
+            prefix=f"test-leaderboard-{uuid.uuid4().hex}",
+        )
+
+    def tearDown(self):
+        keys = list(self.store.client.scan_iter(f"{self.store.prefix}:*"))
+        if keys:
+            self.store.client.delete(*keys)
+
+
+class LeaderboardTests(AttemptTestCase):
+    def setUp(self):
+        super().setUp()
+        leaderboard.rebuild()
+
+    def complete_attempt(self, correct):
+        quiz_attempt = self.start_attempt()
+        submissions = [
+            (index, {"question": question.pk, "answer_selected": right.pk})
+            for index, (question, right, _) in enumerate(self.answers[:correct])
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            services.submit_answers(self.student, quiz_attempt.pk, submissions)
+
+    def test_completed_attempts_count_with_their_best_score(self):
+        self.complete_attempt(correct=3)
+        self.complete_attempt(correct=1)
+
+        store = leaderboard.get_store()
+        board = leaderboard.quiz_board(self.quiz.pk)
+        self.assertEqual(store.top(board, 10), [(self.student.pk, 3.0)])
+        self.assertEqual(
+            store.rank(leaderboard.GLOBAL_BOARD, self.student.pk), (1, 3.0)
+        )
+
+    def test_in_process_stores_are_only_rebuilt_by_force(self):
+        self.complete_attempt(correct=2)
+        store = leaderboard.get_store()
+        store.rebuild([])
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_leaderboards", stdout=StringIO())
+        self.assertEqual(store.size(leaderboard.GLOBAL_BOARD), 0)
+
+        call_command("rebuild_leaderboards", force=True, stdout=StringIO())
+        self.assertEqual(
+            store.rank(leaderboard.GLOBAL_BOARD, self.student.pk), (1, 2.0)
+        )
+
+
+class WriteBehindTests(AttemptTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        settings = self.settings(
+            ANSWER_WRITE_BEHIND={
+                "ENABLED": True,
+                "DIRECTORY": self.directory,
+                "FSYNC": False,
+            }
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        # A buffer without its background thread, flushed by the tests
+        self.buffer = write_behind.WriteBehindBuffer()
+        self.addCleanup(setattr, write_behind, "_buffer", None)
+        write_behind._buffer = self.buffer
+
+    def submit(self, quiz_attempt, question, answer):
+        return self.client.post(
+            reverse("question_attempt_list_create"),
+            {
+                "quiz_attempt": quiz_attempt.pk,
+                "question": str(question.pk),
+                "answer_selected": str(answer.pk),
+            },
+            format="json",
+        )
+
+    def test_buffered_answers_are_read_back(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (q2, _, wrong2), _, _ = self.answers
+
+        self.assertEqual(self.submit(quiz_attempt, q1, right1).status_code, 202)
+        self.assertEqual(self.submit(quiz_attempt, q2, wrong2).status_code, 202)
+        self.assertFalse(QuestionAttempt.objects.exists())
+
+        response = self.client.get(
+            reverse("quiz_attempt_detail", kwargs={"pk": quiz_attempt.pk})
+        )
+        self.assertEqual(response.data["score"], 1.0)
+        response = self.client.get(reverse("question_attempt_list_create"))
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertEqual(write_behind.buffered(self.student.pk), [])
+
+        # Writing the journal again adds nothing
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(QuestionAttempt.objects.count(), 2)
+
+    def test_questions_are_answered_once(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, wrong1), (q2, right2, _), _, _ = self.answers
+        services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+
+        with self.assertRaises(ValidationError):
+            services.submit_answer(self.student, quiz_attempt.pk, q1.pk, wrong1.pk)
+
+        # Claimed by a submission to another process
+        write_behind.claim(
+            {"id": "other", "quiz_attempt": quiz_attempt.pk, "question": str(q2.pk)}
+        )
+        with self.assertRaises(ValidationError):
+            services.submit_answer(self.student, quiz_attempt.pk, q2.pk, right2.pk)
+
+        # Written answers stay answered once their claims are released
+        self.buffer.flush()
+        with self.assertRaises(ValidationError):
+            services.submit_answer(self.student, quiz_attempt.pk, q1.pk, wrong1.pk)
+        self.assertEqual(
+            list(QuestionAttempt.objects.values_list("answer_selected", flat=True)),
+            [right1.pk],
+        )
+
+    def test_rejected_answers_release_their_claim(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (_, right2, _), _, _ = self.answers
+
+        with self.assertRaises(ValidationError):
+            services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right2.pk)
+        services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+
+        self.assertEqual(len(self.buffer.pending), 1)
+
+    def test_failed_flushes_keep_answers_pending(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), _, _, _ = self.answers
+        services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+
+        with mock.patch.object(
+            write_behind, "write_entries", side_effect=RuntimeError
+        ), self.assertRaises(RuntimeError):
+            self.buffer.flush()
+
+        self.assertEqual(len(self.buffer.pending), 1)
+        self.assertEqual(len(self.buffer.segments), 1)
+        self.assertEqual(self.buffer.flush(), 1)
+        # Only the open segment is left
+        self.assertEqual(
+            os.listdir(self.directory),
+            [os.path.basename(self.buffer.journal.file.name)],
+        )
+
+    def test_orphaned_journals_are_replayed(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), _, _, _ = self.answers
+        services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+        # The process stops without flushing, releasing its journal
+        self.buffer.journal.file.close()
+
+        call_command("flush_answers", directory=self.directory, stdout=StringIO())
+
+        quiz_attempt.refresh_from_db()
+        self.assertEqual(quiz_attempt.score, 1.0)
+        self.assertEqual(QuestionAttempt.objects.get().answer_selected, right1)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_the_buffer_starts_with_the_first_submission(self):
+        quiz_attempt = self.start_attempt()
+        (q1, right1, _), (q2, right2, _), _, _ = self.answers
+        services.submit_answer(self.student, quiz_attempt.pk, q1.pk, right1.pk)
+        # The process stops without flushing, releasing its journal
+        self.buffer.journal.file.close()
+        write_behind._buffer = None
+
+        with mock.patch.object(write_behind, "get_buffer") as get_buffer:
+            apps.get_app_config("quiz_attempts").ready()
+        get_buffer.assert_not_called()
+
+        with mock.patch.object(write_behind.WriteBehindBuffer, "start") as start:
+            services.submit_answer(self.student, quiz_attempt.pk, q2.pk, right2.pk)
+        start.assert_called_once_with()
+        # It took over the orphaned journal
+        self.assertEqual(len(write_behind._buffer.pending), 2)
+
+    def test_idle_buffers_leave_their_journal_alone(self):
+        segment = os.path.basename(self.buffer.journal.file.name)
+
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(os.listdir(self.directory), [segment])
+
+        self.buffer._flush_at_exit()
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_scores_are_recounted_from_correct_answers(self):
+        quiz_attempt = self.start_attempt()
+        other_attempt = self.start_attempt()
+        for question, right, wrong in self.answers[:3]:
+            QuestionAttempt.objects.create(
+                quiz_attempt=quiz_attempt,
+                question=question,
+                answer_selected=wrong if question.order == 2 else right,
+                is_correct=question.order != 2,
+            )
+        QuizAttempt.objects.update(score=9)
+
+        write_behind.recount_scores({quiz_attempt.pk, other_attempt.pk})
+
+        quiz_attempt.refresh_from_db()
+        other_attempt.refresh_from_db()
+        self.assertEqual(quiz_attempt.score, 2.0)
+        self.assertEqual(other_attempt.score, 0.0)
@@ -12,6 +12,32 @@ urlpatterns = [
         views.QuizAttemptRetrieveUpdateDestroyAPIView.as_view(),
         name="quiz_attempt_detail",
     ),
+    path(
+        "quiz_attempts/<int:pk>/questions/",
+        views.QuizAttemptQuestionsAPIView.as_view(),
+        name="quiz_attempt_questions",
+    ),
+    path(
+        "quiz_attempts/<int:pk>/submit/",
+        views.QuizAttemptSubmitAPIView.as_view(),
+        name="quiz_attempt_submit",
+    ),
+    path(
+        "quiz_attempts/export/",
+        views.QuizAttemptExportAPIView.as_view(),
+        name="quiz_attempt_export",
+    ),
+    # Leaderboard URLs
+    path(
+        "quiz_attempts/leaderboard/",
+        views.LeaderboardAPIView.as_view(),
+        name="leaderboard",
+    ),
+    path(
+        "quiz_attempts/leaderboard/<uuid:quiz_id>/",
+        views.LeaderboardAPIView.as_view(),
+        name="quiz_leaderboard",
+    ),
     # QuestionAttempt URLs
     path(
         "question_attempts/",
@@ -23,4 +49,31 @@ urlpatterns = [
         views.QuestionAttemptRetrieveUpdateDestroyAPIView.as_view(),
         name="question_attempt_detail",
     ),
+    # Async URLs, served without blocking a thread under ASGI
+    path(
+        "async/quiz_attempts/",
+        views.AsyncQuizAttemptStartAPIView.as_view(),
+        name="async_quiz_attempt_start",
+    ),
+    path(
+        "async/quiz_attempts/<int:pk>/submit/",
+        views.AsyncQuizAttemptSubmitAPIView.as_view(),
+        name="async_quiz_attempt_submit",
+    ),
+    path(
+        "async/question_attempts/",
+        views.AsyncQuestionAttemptCreateAPIView.as_view(),
+        name="async_question_attempt_create",
+    ),
+    # Statistics URLs
+    path(
+        "statistics/quizzes/<uuid:quiz_id>/",
+        views.QuizStatisticsAPIView.as_view(),
+        name="quiz_statistics",
+    ),
+    path(
+        "statistics/questions/<uuid:question_id>/",
+        views.QuestionStatisticsAPIView.as_view(),
+        name="question_statistics",
+    ),
 ]
@@ -0,0 +1,546 @@
+"""
+Write-behind buffer for answer submissions.
+
+With ``ANSWER_WRITE_BEHIND["ENABLED"]``, a submitted answer is validated and
+graded as usual, then appended to a journal file and acknowledged, instead
+of being inserted right away. A background thread writes the buffered
+answers with one ``bulk_create`` per batch, every ``FLUSH_INTERVAL`` seconds
+or as soon as ``BATCH_SIZE`` answers are waiting.
+
+Durability: an answer is acknowledged only once its journal line is on disk
+(``fsync``, shared by the submissions that arrive meanwhile). Each process
+writes its own journal segments and holds a lock on them. A process's buffer
+is started by its first submission, so management commands never start one;
+it, or ``manage.py flush_answers``, takes over the segments no live process
+holds and writes their answers. Writing is idempotent: answers already in
+the database are skipped, and the score of every attempt written to is
+recounted from its correct answers, so replaying a journal twice is safe.
+
+Read-your-writes: buffered answers are mirrored in the cache per user.
+``settle(user_id)`` writes a user's buffered answers, from whichever process
+they were submitted to, before the user's attempts are read or completed.
+A question is claimed in the cache before its answer is buffered, so of two
+answers to it submitted at once, to any processes, one is rejected.
+"""
+import atexit
+import fcntl
+import json
+import logging
+import os
+import threading
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Exists, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from . import statistics
+from .models import QuizAttempt, QuestionAttempt
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ENABLED": False,
+    # Where the journal segments of every process on this host are kept.
+    "DIRECTORY": None,
+    "BATCH_SIZE": 500,
+    # Seconds between flushes of a buffer that isn't full.
+    "FLUSH_INTERVAL": 1.0,
+    # Only turn off where losing the last acknowledged answers is acceptable.
+    "FSYNC": True,
+    "CACHE_ALIAS": "default",
+    # How long buffered answers stay mirrored, should their process die.
+    "MIRROR_TIMEOUT": 60 * 60,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, "ANSWER_WRITE_BEHIND", {})}
+
+
+def enabled():
+    return get_config()["ENABLED"]
+
+
+def _key(entry):
+    return entry["quiz_attempt"], entry["question"]
+
+
+# Writing
+def write_entries(entries):
+    """
+    Insert the answers of journal ``entries`` that aren't in the database
+    yet, count them in the statistics and recount the scores of their
+    attempts. Returns the question attempts created.
+    """
+    if not entries:
+        return []
+    attempt_ids = {entry["quiz_attempt"] for entry in entries}
+
+    with transaction.atomic():
+        # Serializes writers of the same attempts, like submit_answers does
+        list(
+            QuizAttempt.objects.select_for_update()
+            .filter(pk__in=attempt_ids)
+            .values_list("pk", flat=True)
+        )
+        written = set(
+            QuestionAttempt.objects.filter(quiz_attempt_id__in=attempt_ids)
+            .values_list("quiz_attempt_id", "question_id")
+            .iterator()
+        )
+        question_attempts = []
+        for entry in entries:
+            key = (entry["quiz_attempt"], uuid.UUID(entry["question"]))
+            if key in written:
+                continue
+            written.add(key)
+            question_attempts.append(
+                QuestionAttempt(
+                    quiz_attempt_id=entry["quiz_attempt"],
+                    question_id=key[1],
+                    answer_selected_id=entry["answer"],
+                    is_correct=entry["is_correct"],
+                    created=datetime.fromisoformat(entry["created"]),
+                    time_taken=_time_taken(entry),
+                )
+            )
+
+        QuestionAttempt.objects.bulk_create(question_attempts)
+        statistics.record_question_attempts(question_attempts)
+        recount_scores(
+            {question_attempt.quiz_attempt_id for question_attempt in question_attempts}
+        )
+    return question_attempts
+
+
+def _time_taken(entry):
+    # Journals written before answers were timed have no time_taken
+    if entry.get("time_taken") is None:
+        return None
+    return timedelta(seconds=entry["time_taken"])
+
+
+def recount_scores(attempt_ids):
+    if not attempt_ids:
+        return
+    correct = (
+        QuestionAttempt.objects.filter(quiz_attempt=OuterRef("pk"), is_correct=True)
+        .order_by()
+        .values("quiz_attempt")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    QuizAttempt.objects.filter(pk__in=attempt_ids).update(
+        score=Cast(Coalesce(Subquery(correct), 0), FloatField()),
+        modified=timezone.now(),
+    )
+
+
+# Mirror of buffered answers in the cache, per user. Each answer is claimed
+# with an atomic ``add`` of its (attempt, question) key, so one submission
+# wins when the same question is answered twice at once, and is stored under
+# its own key in a slot of the user's counter, so writers never read, modify
+# and set a shared value. Written slots are marked, and ``buffered`` skips
+# the run of them at the start.
+def _cache():
+    return caches[get_config()["CACHE_ALIAS"]]
+
+
+def _claim_key(entry):
+    return "answers:buffered:{}:{}".format(*_key(entry))
+
+
+def _slots_key(user_id):
+    return f"answers:buffered:user:{user_id}"
+
+
+def _settled_key(user_id):
+    return f"answers:buffered:user:{user_id}:settled"
+
+
+def _slot_key(user_id, slot):
+    return f"answers:buffered:user:{user_id}:{slot}"
+
+
+def claim(entry):
+    """
+    Reserve the question of ``entry`` for it; False when another answer to
+    it is buffered already.
+    """
+    return _cache().add(_claim_key(entry), entry["id"], get_config()["MIRROR_TIMEOUT"])
+
+
+def release(entry):
+    _cache().delete(_claim_key(entry))
+
+
+def _next_slot(user_id):
+    timeout = get_config()["MIRROR_TIMEOUT"]
+    key = _slots_key(user_id)
+    if _cache().add(key, 0, timeout):
+        # A new counter starts from the first slot again
+        _cache().delete(_settled_key(user_id))
+    slot = _cache().incr(key)
+    _cache().touch(key, timeout)
+    return slot
+
+
+def _mirror_add(entry):
+    _cache().set(
+        _slot_key(entry["user"], entry["slot"]), entry, get_config()["MIRROR_TIMEOUT"]
+    )
+
+
+def _mirror_discard(entries):
+    _cache().set_many(
+        {
+            _slot_key(entry["user"], entry["slot"]): False
+            for entry in entries
+            # Journals written before answers had slots
+            if "slot" in entry
+        },
+        get_config()["MIRROR_TIMEOUT"],
+    )
+    _cache().delete_many([_claim_key(entry) for entry in entries])
+
+
+def buffered(user_id):
+    """
+    The user's answers that are acknowledged but not written yet.
+    """
+    keys = [_slots_key(user_id), _settled_key(user_id)]
+    found = _cache().get_many(keys)
+    slots, settled = found.get(keys[0], 0), found.get(keys[1], 0)
+    if settled > slots:
+        settled = 0
+    if slots == settled:
+        return []
+
+    keys = [_slot_key(user_id, slot) for slot in range(settled + 1, slots + 1)]
+    found = _cache().get_many(keys)
+    written = 0
+    for key in keys:
+        if found.get(key) is not False:
+            break
+        written += 1
+    if written:
+        _cache().set(
+            _settled_key(user_id), settled + written, get_config()["MIRROR_TIMEOUT"]
+        )
+    return [entry for entry in found.values() if entry]
+
+
+def settle(user_id):
+    """
+    Write the user's buffered answers now, so that what they read next
+    includes them. A single cache read when nothing is buffered.
+    """
+    if not enabled() or user_id is None:
+        return
+    entries = buffered(user_id)
+    if entries:
+        write_entries(entries)
+        _mirror_discard(entries)
+
+
+# Journal
+class Journal:
+    """
+    Append-only JSON Lines segments in a directory, one open segment per
+    process at a time, each locked while its process may still flush it.
+    """
+
+    suffix = ".journal"
+
+    def __init__(self, directory, fsync=True):
+        self.directory = directory
+        self.fsync = fsync
+        os.makedirs(directory, exist_ok=True)
+        self.prefix = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._number = 0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._appended = 0
+        self._synced = 0
+        self.file = self._open_segment()
+
+    def _open_segment(self):
+        self._number += 1
+        path = os.path.join(
+            self.directory, f"{self.prefix}-{self._number:06d}{self.suffix}"
+        )
+        segment = open(path, "a", encoding="utf-8")
+        fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return segment
+
+    def write(self, entry):
+        """
+        Write ``entry`` to the open segment, returning its number for
+        ``sync``.
+        """
+        line = json.dumps(entry, separators=(",", ":")) + "\n"
+        with self._lock:
+            self.file.write(line)
+            self.file.flush()
+            self._appended += 1
+            return self._appended, self.file
+
+    def sync(self, number, segment):
+        """
+        Return once entry ``number`` of ``segment`` is on disk. One fsync
+        covers every entry written before it (group commit).
+        """
+        if not self.fsync:
+            return
+        with self._sync_lock:
+            if self._synced < number:
+                target = self._appended
+                os.fsync(segment.fileno())
+                self._synced = target
+
+    def rotate(self):
+        """
+        Start a new segment and return the previous one, which stays
+        locked until ``discard`` once its entries are written.
+        """
+        with self._sync_lock, self._lock:
+            segment = self.file
+            if self.fsync:
+                os.fsync(segment.fileno())
+            self._synced = self._appended
+            self.file = self._open_segment()
+        return segment
+
+    def close(self):
+        """
+        Remove the open segment; only once everything written is flushed.
+        """
+        with self._lock:
+            self.discard(self.file)
+
+    @staticmethod
+    def discard(segment):
+        os.unlink(segment.name)
+        segment.close()
+
+    def adopt_orphans(self):
+        """
+        Lock the segments of processes that are gone and return them with
+        their entries. A line cut short by a crash was never acknowledged
+        and is skipped.
+        """
+        adopted = []
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if not name.endswith(self.suffix) or path == self.file.name:
+                continue
+            try:
+                segment = open(path, "r+", encoding="utf-8")
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(segment, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                # Still held by a live process
+                segment.close()
+                continue
+            entries = []
+            for line in segment:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logger.warning("Skipping a truncated line in %s.", path)
+            adopted.append((segment, entries))
+        return adopted
+
+
+# Buffer
+class WriteBehindBuffer:
+    def __init__(self, config=None):
+        config = config or get_config()
+        if not config["DIRECTORY"]:
+            raise ValueError("ANSWER_WRITE_BEHIND needs a journal DIRECTORY.")
+        self.batch_size = config["BATCH_SIZE"]
+        self.flush_interval = config["FLUSH_INTERVAL"]
+        self.journal = Journal(str(config["DIRECTORY"]), fsync=config["FSYNC"])
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self.pending = []
+        # Rotated segments whose entries haven't been written yet
+        self.segments = []
+        self._thread = None
+
+        for segment, entries in self.journal.adopt_orphans():
+            self.segments.append(segment)
+            self.pending.extend(entries)
+        if self.pending:
+            logger.info("Recovered %d buffered answers.", len(self.pending))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="answer-write-behind", daemon=True
+            )
+            self._thread.start()
+            atexit.register(self._flush_at_exit)
+
+    def add(self, entry):
+        """
+        Journal and buffer ``entry``; the answer counts as submitted once
+        this returns.
+        """
+        # Written and buffered together, so a segment is never rotated and
+        # discarded holding an entry that isn't in the batch being written.
+        with self._lock:
+            number, segment = self.journal.write(entry)
+            self.pending.append(entry)
+            full = len(self.pending) >= self.batch_size
+        self.journal.sync(number, segment)
+        _mirror_add(entry)
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        """
+        Write every buffered answer. Returns how many were written; on a
+        database error the answers stay buffered and the error is raised.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self.pending and not self.segments:
+                    return 0
+                batch, self.pending = self.pending, []
+                # The open segment only holds pending entries
+                if batch:
+                    self.segments.append(self.journal.rotate())
+                segments, self.segments = self.segments, []
+            try:
+                written = write_entries(batch)
+            except Exception:
+                with self._lock:
+                    self.pending[:0] = batch
+                    self.segments[:0] = segments
+                raise
+            for segment in segments:
+                self.journal.discard(segment)
+            _mirror_discard(batch)
+            return len(written)
+
+    def _flush_at_exit(self):
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("Buffered answers left in the journal at exit.")
+            return
+        with self._lock:
+            if not self.pending:
+                self.journal.close()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if not self.pending:
+                continue
+            close_old_connections()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Writing buffered answers failed; will retry.")
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_buffer():
+    """
+    This process's buffer, created by its first submission, recovering
+    orphaned journal segments, and flushed by a background thread.
+    """
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                buffer = WriteBehindBuffer()
+                buffer.start()
+                _buffer = buffer
+    return _buffer
+
+
+def _forget_buffer():
+    # The background thread doesn't survive a fork; children start their own
+    global _buffer, _buffer_lock
+    _buffer, _buffer_lock = None, threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_buffer)
+
+
+def submit(user, quiz_attempt_id, question_id, answer_id, grade):
+    """
+    Validate and buffer an answer like ``services.submit_answer`` records
+    it, with a single query. The answer is timed from the attempt's latest
+    submission, buffered or written. Returns the unsaved question attempt.
+    """
+    now = timezone.now()
+    entry = {
+        "id": uuid.uuid4().hex,
+        "user": user.pk,
+        "quiz_attempt": quiz_attempt_id,
+        "question": str(question_id),
+        "answer": str(answer_id),
+    }
+    # Claimed before the database is read: once a flush releases a claim,
+    # its answer is already in the database.
+    if not claim(entry):
+        raise ValidationError("This question has already been answered.")
+    try:
+        answered = QuestionAttempt.objects.filter(
+            quiz_attempt=OuterRef("pk"), question_id=question_id
+        )
+        row = (
+            QuizAttempt.objects.open()
+            .filter(pk=quiz_attempt_id, user_id=user.pk)
+            .with_last_submission()
+            .annotate(answered=Exists(answered))
+            .values_list("quiz_id", "questions", "last_submission", "answered")
+            .first()
+        )
+        quiz_id, drawn, since, is_answered = row or (None, None, None, False)
+        entry["is_correct"] = grade(quiz_id, question_id, answer_id, drawn)
+        if is_answered:
+            raise ValidationError("This question has already been answered.")
+
+        since = max(
+            [since]
+            + [
+                datetime.fromisoformat(buffered_entry["created"])
+                for buffered_entry in buffered(user.pk)
+                if buffered_entry["quiz_attempt"] == quiz_attempt_id
+            ]
+        )
+        entry["created"] = now.isoformat()
+        entry["time_taken"] = (now - since).total_seconds()
+        entry["slot"] = _next_slot(user.pk)
+        get_buffer().add(entry)
+    except BaseException:
+        release(entry)
+        raise
+    return QuestionAttempt(
+        quiz_attempt_id=quiz_attempt_id,
+        question_id=question_id,
+        answer_selected_id=answer_id,
+        is_correct=entry["is_correct"],
+        time_taken=now - since,
+        created=now,
+        modified=now,
+    )
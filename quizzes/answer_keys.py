@@ -0,0 +1,156 @@
+"""
+In-memory answer keys for grading.
+
+An answer key maps every question of a quiz to its correct answer id and the
+set of answer ids that belong to it, so grading a submission is a dictionary
+lookup instead of a query. It also indexes the question ids by question type,
+which attempts of sampled quizzes draw from (see ``quizzes.sampling``). Keys live in a bounded per-process LRU; a version
+stamp in the shared cache tells every process when a quiz's answers changed.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from .models import Answer
+
+
+class AnswerKey:
+    __slots__ = ("questions", "pool")
+
+    def __init__(self, rows):
+        """
+        Build from ``(answer_id, question_id, is_correct, question_type)`` rows,
+        in question order.
+        """
+        answers, correct, pool = {}, {}, {}
+        for answer_id, question_id, is_correct, question_type in rows:
+            if question_id not in answers:
+                pool.setdefault(question_type, []).append(question_id)
+            answers.setdefault(question_id, []).append(answer_id)
+            if is_correct:
+                correct[question_id] = answer_id
+        self.questions = {
+            question_id: (correct.get(question_id), frozenset(answer_ids))
+            for question_id, answer_ids in answers.items()
+        }
+        # Question ids per question type (content type id), in question order
+        self.pool = {
+            question_type: tuple(question_ids)
+            for question_type, question_ids in pool.items()
+        }
+
+    def __contains__(self, question_id):
+        return question_id in self.questions
+
+    def grade(self, question_id, answer_id):
+        """
+        Return whether the answer is correct, or ``None`` if the answer
+        doesn't belong to the question or the question to the quiz.
+        """
+        try:
+            correct_id, answer_ids = self.questions[question_id]
+        except KeyError:
+            return None
+        if answer_id not in answer_ids:
+            return None
+        return answer_id == correct_id
+
+
+def build(quiz_id):
+    return AnswerKey(
+        Answer.objects.filter(question__quiz_id=quiz_id)
+        .order_by("question__order", "question_id")
+        .values_list(
+            "pk", "question_id", "is_correct", "question__polymorphic_ctype_id"
+        )
+    )
+
+
+def _cache():
+    return caches[getattr(settings, "QUIZ_CACHE_ALIAS", "default")]
+
+
+def _version_key(quiz_id):
+    return f"answer_key:{quiz_id}:version"
+
+
+def _version(quiz_id):
+    cache = _cache()
+    version = cache.get(_version_key(quiz_id))
+    if version is None:
+        cache.add(_version_key(quiz_id), time.time_ns(), timeout=None)
+        version = cache.get(_version_key(quiz_id))
+    return version
+
+
+class AnswerKeyCache:
+    """
+    Bounded LRU of answer keys, checked against the shared version stamp.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id):
+        version = _version(quiz_id)
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(quiz_id)
+                return entry[1]
+
+        answer_key = build(quiz_id)
+        with self._lock:
+            self._entries[quiz_id] = (version, answer_key)
+            self._entries.move_to_end(quiz_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return answer_key
+
+    def discard(self, quiz_id):
+        with self._lock:
+            self._entries.pop(quiz_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+answer_keys = AnswerKeyCache(getattr(settings, "QUIZ_ANSWER_KEY_CACHE_SIZE", 256))
+
+
+def get_answer_key(quiz_id):
+    return answer_keys.get(quiz_id)
+
+
+def _bump(quiz_id):
+    answer_keys.discard(quiz_id)
+    try:
+        _cache().incr(_version_key(quiz_id))
+    except ValueError:
+        _cache().set(_version_key(quiz_id), time.time_ns(), timeout=None)
+
+
+def invalidate(*quiz_ids):
+    """
+    Drop the answer keys of the given quizzes, in every process, once the
+    current transaction commits.
+    """
+    for quiz_id in filter(None, quiz_ids):
+        transaction.on_commit(lambda quiz_id=quiz_id: _bump(quiz_id))
+
+
+def warm(quiz_id):
+    """
+    Build a quiz's answer key after commit, e.g. when it's published.
+    """
+    transaction.on_commit(lambda: answer_keys.get(quiz_id))
@@ -0,0 +1,90 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from rest_framework.permissions import SAFE_METHODS
+
+CONDITIONAL_METHODS = ("GET", "HEAD", "PUT", "PATCH", "DELETE")
+
+
+class ConditionalResponse(Exception):
+    """
+    Carries a 304/412 response out of ``initial()``, before the handler runs.
+    """
+
+    def __init__(self, response):
+        self.response = response
+
+
+class ConditionalRequestMixin:
+    """
+    Adds ETag and Last-Modified validators to a view, computed from aggregate
+    queries rather than from the serialized body, so If-None-Match and
+    If-Modified-Since can be answered with a 304 without building the payload,
+    and writes can be guarded with If-Match.
+
+    Views implement ``get_condition_state()``, returning a dict of aggregates
+    (``Max`` of ``modified`` columns, row counts, ...) or ``None`` when the
+    resource doesn't exist. Keys ending in ``modified`` feed Last-Modified; the
+    whole dict feeds the ETag, so counts catch deletions the timestamps miss.
+    A version stamp alone gives an ETag without Last-Modified.
+    """
+
+    def get_condition_state(self):
+        raise NotImplementedError
+
+    def get_validators(self):
+        if not hasattr(self, "_validators"):
+            self._validators = (None, None)
+            state = self.get_condition_state()
+            if state is not None:
+                last_modified = max(
+                    (
+                        value
+                        for key, value in state.items()
+                        if key.endswith("modified") and value is not None
+                    ),
+                    default=None,
+                )
+                fingerprint = repr(
+                    (
+                        self.request.get_full_path(),
+                        self.request.accepted_renderer.format,
+                        sorted(state.items()),
+                    )
+                )
+                self._validators = (
+                    quote_etag(hashlib.md5(fingerprint.encode()).hexdigest()),
+                    last_modified and int(last_modified.timestamp()),
+                )
+        return self._validators
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in CONDITIONAL_METHODS:
+            etag, last_modified = self.get_validators()
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is not None:
+                raise ConditionalResponse(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, ConditionalResponse):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # A 304 carries the validators too, so clients can refresh theirs
+        if (
+            request.method in SAFE_METHODS
+            and response.status_code in (200, 304)
+            and hasattr(self, "_validators")
+        ):
+            etag, last_modified = self._validators
+            if etag and not response.has_header("ETag"):
+                response["ETag"] = etag
+            if last_modified and not response.has_header("Last-Modified"):
+                response["Last-Modified"] = http_date(last_modified)
+        return response
@@ -1,16 +1,42 @@
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+from core.middleware import TimedSerializerMixin
 from ..models import (
     Quiz,
     Question,
     TrueFalseQuestion,
     MultipleChoiceQuestion,
     Answer,
-    QuizAttempt,
-    QuestionAttempt,
 )
+from ..services import QUESTION_TYPES, bulk_create_questions
 
 
-class AnswerSerializer(serializers.ModelSerializer):
+def requested_fields(request):
+    """
+    Field names asked for with ``?fields=a,b``, or ``None`` for all fields.
+    """
+    if request is None or not request.query_params.get("fields"):
+        return None
+    return {name.strip() for name in request.query_params["fields"].split(",")}
+
+
+class SparseFieldsetMixin:
+    """
+    Drops the fields a client didn't ask for with ``?fields=`` on reads.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if request is not None and request.method not in SAFE_METHODS:
+            return
+        fields = requested_fields(request)
+        if fields is not None:
+            for name in set(self.fields) - fields:
+                self.fields.pop(name)
+
+
+class AnswerSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Answer
         fields = [
@@ -18,15 +44,28 @@ class AnswerSerializer(serializers.ModelSerializer):
             "question",
             "answer_text",
             "is_correct",
-            "uuid",
             "order",
             "created",
             "modified",
         ]
 
 
+class NestedAnswerSerializer(AnswerSerializer):
+    """
+    Answer serializer for question payloads, where the question is the parent.
+    Answers without an order are numbered by their position in the payload.
+    """
+
+    order = serializers.IntegerField(min_value=0, required=False)
+
+    class Meta(AnswerSerializer.Meta):
+        read_only_fields = ["question"]
+
+
 class TrueFalseQuestionSerializer(serializers.ModelSerializer):
     correct_answer = serializers.CharField(write_only=True)
+    # The "True" and "False" answers, created with the question
+    question_answers = NestedAnswerSerializer(many=True, read_only=True)
 
     class Meta:
         model = TrueFalseQuestion
@@ -36,9 +75,8 @@ class TrueFalseQuestionSerializer(serializers.ModelSerializer):
             "quiz",
             "correct_answer",
             "question_text",
-            "slug",
+            "question_answers",
             "author",
-            "uuid",
             "created",
             "modified",
         ]
@@ -48,9 +86,11 @@ class TrueFalseQuestionSerializer(serializers.ModelSerializer):
         question = super().create(validated_data)
 
         if correct_answer == "true":
-            question.question_answers.filter(text="True").update(is_correct=True)
+            question.question_answers.filter(answer_text="True").update(is_correct=True)
         elif correct_answer == "false":
-            question.question_answers.filter(text="False").update(is_correct=True)
+            question.question_answers.filter(answer_text="False").update(
+                is_correct=True
+            )
 
         return question
 
@@ -63,7 +103,7 @@ class TrueFalseQuestionSerializer(serializers.ModelSerializer):
 
 
 class MultipleChoiceQuestionSerializer(serializers.ModelSerializer):
-    question_answers = AnswerSerializer(many=True, required=True)
+    question_answers = NestedAnswerSerializer(many=True, required=True)
 
     class Meta:
         model = MultipleChoiceQuestion
@@ -73,9 +113,7 @@ class MultipleChoiceQuestionSerializer(serializers.ModelSerializer):
             "quiz",
             "question_text",
             "question_answers",
-            "slug",
             "author",
-            "uuid",
             "created",
             "modified",
         ]
@@ -94,18 +132,24 @@ class MultipleChoiceQuestionSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         answers_data = validated_data.pop("question_answers")
         question = super().create(validated_data)
-        for answer_data in answers_data:
-            Answer.objects.create(question=question, **answer_data)
+        Answer.objects.bulk_create(
+            Answer(question=question, **answer_data) for answer_data in answers_data
+        )
         return question
 
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for questions, independant of quiz creation.
     """
 
-    question_type = serializers.CharField(write_only=True)
-    question_answers = AnswerSerializer(many=True, required=False)
+    question_type = serializers.ChoiceField(
+        choices=list(QUESTION_TYPES), write_only=True
+    )
+    correct_answer = serializers.ChoiceField(
+        choices=["true", "false"], write_only=True, required=False
+    )
+    question_answers = NestedAnswerSerializer(many=True, required=False)
 
     class Meta:
         model = Question
@@ -114,23 +158,20 @@ class QuestionSerializer(serializers.ModelSerializer):
             "order",
             "quiz",
             "question_type",
+            "correct_answer",
             "question_text",
             "question_answers",
-            "slug",
             "author",
-            "uuid",
             "created",
             "modified",
         ]
 
     def create(self, validated_data):
-        question_type = validated_data.pop("question_type")
-
-        if question_type == "multiple_choice":
-            question = MultipleChoiceQuestion.objects.create(**validated_data)
-        elif question_type == "true_false":
-            question = TrueFalseQuestion.objects.create(**validated_data)
-
+        (question,) = bulk_create_questions(
+            validated_data.get("quiz"),
+            [validated_data],
+            author=validated_data.get("author"),
+        )
         return question
 
     def to_representation(self, instance):
@@ -140,15 +181,54 @@ class QuestionSerializer(serializers.ModelSerializer):
             return MultipleChoiceQuestionSerializer(instance=instance).data
         return super().to_representation(instance)
 
-    def validate_question_answers(self, value):
-        if self.initial_data["question_type"] == "multiple_choice" and len(value) < 2:
+    def validate(self, data):
+        """
+        Validate the answers against the question type, so that a whole quiz
+        payload can be checked before anything is written.
+        """
+        if self.instance is not None and "question_answers" in data:
             raise serializers.ValidationError(
-                "Multiple choice questions must have at least two answers."
+                {"question_answers": "Answers are changed through the answer API."}
             )
-        return value
+        if "question_type" not in data:
+            # A partial update that leaves the type, and so the answers, alone
+            return data
+
+        if data["question_type"] == "true_false":
+            if "correct_answer" not in data:
+                raise serializers.ValidationError(
+                    {"correct_answer": "True/false questions need a correct answer."}
+                )
+            return data
+
+        answers = data.get("question_answers", [])
+        if len(answers) < 2:
+            raise serializers.ValidationError(
+                {
+                    "question_answers": (
+                        "Multiple choice questions must have at least two answers."
+                    )
+                }
+            )
+        if sum(answer.get("is_correct", False) for answer in answers) != 1:
+            raise serializers.ValidationError(
+                {"question_answers": "Exactly one answer must be marked correct."}
+            )
+        # Numbered like bulk_create_questions does, by position by default
+        orders = [
+            answer.get("order", position)
+            for position, answer in enumerate(answers, start=1)
+        ]
+        if len(set(orders)) != len(orders):
+            raise serializers.ValidationError(
+                {"question_answers": "Answers must have distinct orders."}
+            )
+        return data
 
 
-class QuizSerializer(serializers.ModelSerializer):
+class QuizSerializer(
+    TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer
+):
     quiz_questions = QuestionSerializer(many=True, required=True)
     author = serializers.SerializerMethodField()
 
@@ -160,21 +240,26 @@ class QuizSerializer(serializers.ModelSerializer):
             "description",
             "slug",
             "quiz_questions",
-            "is_published",
+            "status",
+            "shuffle_questions",
+            "shuffle_answers",
+            "sample_size",
+            "stratify_sample",
+            "time_limit",
             "author",
-            "uuid",
             "created",
             "modified",
         ]
 
     def get_author(self, obj):
-        return obj.author.username
+        return obj.author.username if obj.author else None
 
     def validate(self, data):
         """
         Validate that quizzes have at least one question before publishing.
         """
-        if data.get("is_published", True) and not data.get("quiz_questions"):
+        status = data.get("status", Quiz.STATUS.published)
+        if status == Quiz.STATUS.published and not data.get("quiz_questions"):
             raise serializers.ValidationError(
                 "Quizzes must have at least one question before publishing."
             )
@@ -184,49 +269,39 @@ class QuizSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         question_data = validated_data.pop("quiz_questions")
         quiz = Quiz.objects.create(**validated_data)
-        for question in question_data:
-            Question.objects.create(quiz=quiz, **question)
+        bulk_create_questions(quiz, question_data, author=quiz.author)
         return quiz
 
 
-##########################################
-##########################################
-
-
-class QuizAttemptSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = QuizAttempt
-        fields = ["pk", "user", "quiz", "created", "modified", "completed", "score"]
-        # read_only_fields = ['pk', 'user', 'quiz',
-        #           'created', 'modified', 'completed', 'score']
-
-    def create(self, validated_data):
-        user = self.context["request"].user
-        instance = QuizAttempt.objects.create(user=user, **validated_data)
-        return instance
+class QuizSummarySerializer(
+    TimedSerializerMixin, SparseFieldsetMixin, serializers.ModelSerializer
+):
+    """
+    Catalog representation of a quiz, without questions. Expects a queryset
+    annotated with ``author_username`` and ``QuizQuerySet.with_counts()``.
+    """
 
+    author = serializers.CharField(source="author_username", read_only=True)
+    question_count = serializers.IntegerField(read_only=True)
+    attempt_count = serializers.IntegerField(read_only=True)
 
-class QuestionAttemptSerializer(serializers.ModelSerializer):
     class Meta:
-        model = QuestionAttempt
+        model = Quiz
         fields = [
             "pk",
-            "quiz_attempt",
-            "question",
-            "created",
-            "modified",
-            "answer_selected",
-            "is_correct",
-            "time_taken",
+            "title",
+            "slug",
+            "author",
+            "status",
+            "question_count",
+            "attempt_count",
         ]
-        # read_only_fields = ['pk', 'is_correct']
+        read_only_fields = fields
+
 
-        def create(self, validated_data):
-            instance = QuestionAttempt.objects.create(**validated_data)
+class QuizSearchResultSerializer(QuizSummarySerializer):
+    rank = serializers.FloatField(read_only=True)
 
-            # updating score
-            quiz_attempt = instance.quiz_attempt
-            if instance.is_correct:
-                quiz_attempt.score = (quiz_attempt.score or 0) + 1
-                quiz_attempt.save()
-            return instance
+    class Meta(QuizSummarySerializer.Meta):
+        fields = QuizSummarySerializer.Meta.fields + ["rank"]
+        read_only_fields = fields
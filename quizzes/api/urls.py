@@ -9,8 +9,9 @@ urlpatterns = [
         views.QuizRetrieveUpdateDestroyAPIView.as_view(),
         name="quiz_detail",
     ),
+    path("search/", views.QuizSearchAPIView.as_view(), name="quiz_search"),
     path(
-        "quizzes/<slug:quiz_slug>/questions/<int:question_id>/",
+        "quizzes/<slug:quiz_slug>/questions/<uuid:question_id>/",
         views.QuestionDetailView.as_view(),
         name="question_detail",
     ),
@@ -18,7 +19,7 @@ urlpatterns = [
         "answers/", views.AnswerListCreateAPIView.as_view(), name="answer_list_create"
     ),
     path(
-        "answers/<slug:slug>/",
+        "answers/<uuid:pk>/",
         views.AnswerRetrieveUpdateDestroyAPIView.as_view(),
         name="answer_detail",
     ),
@@ -1,10 +1,12 @@
 from django.db import transaction
+from django.db.models import Count, F, Max
 from rest_framework import status
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import (
+    ListAPIView,
     ListCreateAPIView,
     RetrieveUpdateDestroyAPIView,
-    get_object_or_404,
 )
 
 from rest_framework.permissions import (
@@ -12,22 +14,27 @@ from rest_framework.permissions import (
     IsAuthenticatedOrReadOnly,
     SAFE_METHODS,
 )
+from core.pagination import (
+    AnswerCursorPagination,
+    QuizCursorPagination,
+    SearchPagination,
+)
+from .. import cache as quiz_cache, search
 from ..models import (
     Quiz,
     Question,
     Answer,
-    QuizAttempt,
-    QuestionAttempt,
 )
+from quiz_attempts.models import QuizAttempt
+from .conditional import ConditionalRequestMixin
 from .serializers import (
     QuizSerializer,
-    TrueFalseQuestionSerializer,
-    MultipleChoiceQuestionSerializer,
+    QuizSummarySerializer,
+    QuizSearchResultSerializer,
+    QuestionSerializer,
     AnswerSerializer,
-    QuizAttemptSerializer,
-    QuestionAttemptSerializer,
+    requested_fields,
 )
-from django.db.models import Prefetch
 
 
 class IsAuthorOrReadOnly(BasePermission):
@@ -39,54 +46,172 @@ class IsAuthorOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
             return True
+        # Answers belong to the author of their question
+        if isinstance(obj, Answer):
+            return obj.question.author == request.user
         return obj.author == request.user
 
 
+def cached_quiz_payload(slug, get_object):
+    """
+    The serialized quiz from the payload cache. On a miss the quiz returned by
+    ``get_object()`` is serialized, and cached if it is published.
+    """
+    version, payload = quiz_cache.get_payload(slug)
+    if payload is None:
+        instance = get_object()
+        payload = QuizSerializer(instance).data
+        if instance.status == Quiz.STATUS.published:
+            quiz_cache.set_payload(slug, version, payload)
+    return payload
+
+
+def quiz_condition_state(queryset):
+    """
+    Aggregates that change whenever the serialized quizzes would. Only for
+    single quizzes; lists use the version stamp of ``quizzes.cache``.
+    """
+    return queryset.aggregate(
+        modified=Max("modified"),
+        questions_modified=Max("quiz_questions__modified"),
+        answers_modified=Max("quiz_questions__question_answers__modified"),
+        quizzes=Count("pk", distinct=True),
+        questions=Count("quiz_questions", distinct=True),
+        answers=Count("quiz_questions__question_answers"),
+    )
+
+
 # Quiz Views:
-class QuizListCreateAPIView(ListCreateAPIView):
+class QuizListCreateAPIView(ConditionalRequestMixin, ListCreateAPIView):
     """
     List all quizzes, or create a new quiz.
+
+    ``?mode=summary`` lists quizzes without their questions, with question and
+    attempt counts computed in SQL. ``?fields=a,b`` limits either mode to the
+    given fields.
     """
 
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    replica_reads = True
 
-    queryset = Quiz.objects.all()
+    queryset = Quiz.objects.with_questions()
     serializer_class = QuizSerializer
+    pagination_class = QuizCursorPagination
     lookup_field = "slug"
+    # quiz + author, questions, one per question type, answers
+    query_budget = 5
+
+    def is_summary(self):
+        return (
+            self.request.method in SAFE_METHODS
+            and self.request.query_params.get("mode") == "summary"
+        )
+
+    def get_serializer_class(self):
+        if self.is_summary():
+            return QuizSummarySerializer
+        return super().get_serializer_class()
+
+    def get_queryset(self):
+        fields = requested_fields(self.request)
+        if self.is_summary():
+            return self.get_summary_queryset(fields)
+        if self.request.method in SAFE_METHODS and fields is not None:
+            if "quiz_questions" not in fields:
+                return Quiz.objects.select_related("author")
+        return super().get_queryset()
+
+    def get_summary_queryset(self, fields):
+        columns = {"title", "slug", "status"}
+        if fields is not None:
+            columns &= fields
+        # created is read by the cursor paginator
+        queryset = Quiz.objects.only("created", *columns)
+        if fields is None or "author" in fields:
+            queryset = queryset.annotate(author_username=F("author__username"))
+        if fields is None or {"question_count", "attempt_count"} & fields:
+            queryset = queryset.with_counts()
+        return queryset
 
     @transaction.atomic
     def create(self, request, *args, **kwargs):
+        # Questions and answers are bulk created by QuizSerializer.create
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         quiz = serializer.save(author=request.user)
 
-        # Create nested Questions
-        questions_data = serializer.validated_data.get("quiz_questions", [])
-        for question_data in questions_data:
-            question_type = question_data.get("question_type")
-            question_serializer_class = (
-                MultipleChoiceQuestionSerializer
-                if question_type == "multiple_choice"
-                else TrueFalseQuestionSerializer
-            )
-
-            question_serializer = question_serializer_class(data=question_data)
-            question_serializer.is_valid(raise_exception=True)
-            question_serializer.save(quiz=quiz, author=request.user)
-
+        # Re-read with prefetching so the response doesn't query per question
+        serializer = self.get_serializer(self.get_queryset().get(pk=quiz.pk))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def get_condition_state(self):
+        # Aggregating every quiz would cost more than listing a page of them
+        state = {"version": quiz_cache.get_list_version()}
+        if self.is_summary():
+            # Attempts are started with increasing ids; deleting one bumps
+            # the list version
+            attempts = QuizAttempt.objects.aggregate(latest=Max("pk"))
+            state["attempts"] = attempts["latest"]
+        return state
 
-class QuizRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+
+class QuizRetrieveUpdateDestroyAPIView(
+    ConditionalRequestMixin, RetrieveUpdateDestroyAPIView
+):
     """
     Retrieve, update or delete a quiz instance.
     """
 
     permission_classes = (IsAuthorOrReadOnly,)
+    # Reads the primary: a lagging replica could fill the payload cache with
+    # a stale quiz.
+    replica_reads = False
 
-    queryset = Quiz.objects.all()
+    queryset = Quiz.objects.with_questions()
     serializer_class = QuizSerializer
     lookup_field = "slug"
+    query_budget = 6
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Serve published quizzes from the payload cache, building it on a miss.
+        """
+        if requested_fields(request) is not None:
+            return super().retrieve(request, *args, **kwargs)
+
+        return Response(
+            cached_quiz_payload(self.kwargs[self.lookup_field], self.get_object)
+        )
+
+    def get_condition_state(self):
+        state = quiz_condition_state(
+            Quiz.objects.filter(slug=self.kwargs[self.lookup_field])
+        )
+        return state if state["quizzes"] else None
+
+
+class QuizSearchAPIView(ListAPIView):
+    """
+    Published quizzes whose title, description, questions or answers match
+    ``?q=``, best matches first.
+    """
+
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    replica_reads = True
+    serializer_class = QuizSearchResultSerializer
+    pagination_class = SearchPagination
+
+    def get_queryset(self):
+        query = self.request.query_params.get("q", "").strip()
+        if not query:
+            raise ValidationError({"q": "Enter something to search for."})
+        queryset = (
+            Quiz.objects.filter(status=Quiz.STATUS.published)
+            .only("created", "title", "slug", "status")
+            .annotate(author_username=F("author__username"))
+            .with_counts()
+        )
+        return search.search(queryset, query)
 
 
 # Question Views:
@@ -129,86 +254,55 @@ class QuizRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
 #     serializer_class = QuestionSerializer
 
 
+class QuestionDetailView(RetrieveUpdateDestroyAPIView):
+    """
+    Retrieve, update or delete a question of a quiz.
+    """
+
+    permission_classes = (IsAuthorOrReadOnly,)
+    replica_reads = True
+
+    serializer_class = QuestionSerializer
+    lookup_url_kwarg = "question_id"
+
+    def get_queryset(self):
+        return Question.objects.filter(quiz__slug=self.kwargs["quiz_slug"])
+
+
 # Answer Views:
 
 
-class AnswerListCreateAPIView(ListCreateAPIView):
+class AnswerListCreateAPIView(ConditionalRequestMixin, ListCreateAPIView):
     """
     List all answers, or create a new answer.
     """
 
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    replica_reads = True
     queryset = Answer.objects.all()
     serializer_class = AnswerSerializer
+    pagination_class = AnswerCursorPagination
 
+    def get_condition_state(self):
+        return {"version": quiz_cache.get_list_version()}
 
-class AnswerRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+
+class AnswerRetrieveUpdateDestroyAPIView(
+    ConditionalRequestMixin, RetrieveUpdateDestroyAPIView
+):
     """
     Retrieve, update or delete a answer instance.
     """
 
     permission_classes = (IsAuthorOrReadOnly,)
+    replica_reads = True
 
     queryset = Answer.objects.all()
     serializer_class = AnswerSerializer
 
-
-# QuizAttempt Views
-
-
-class QuizAttemptListCreateAPIView(ListCreateAPIView):
-    permission_classes = (IsAuthenticatedOrReadOnly,)
-    serializer_class = QuizAttemptSerializer
-
-    def get_queryset(self):
-        return QuizAttempt.objects.filter(user=self.request.user).prefetch_related(
-            Prefetch("question_attempts", queryset=QuestionAttempt.objects.all())
+    def get_condition_state(self):
+        return (
+            Answer.objects.filter(pk=self.kwargs[self.lookup_field])
+            .values("modified")
+            .first()
         )
-
-    def create(self, request, *args, **kwargs):
-        user = request.user
-        quiz_id = request.data.get("quiz")
-
-        quiz = get_object_or_404(Quiz, id=quiz_id)
-        quiz_attempt = QuizAttempt.objects.create(user=user, quiz=quiz)
-
-        serializer = QuizAttemptSerializer(quiz_attempt)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-
-# QuestionAttempt Views
-class QuestionAttemptListCreateAPIView(ListCreateAPIView):
-    permission_classes = (IsAuthenticatedOrReadOnly,)
-    serializer_class = QuestionAttemptSerializer
-
-    def create(self, request, *args, **kwargs):
-        user = request.user
-        quiz_attempt_id = request.data.get("quiz_attempt")
-        question_id = request.data.get("question")
-        answer_id = request.data.get("answer_selected")
-
-        quiz_attempt = get_object_or_404(QuizAttempt, id=quiz_attempt_id, user=user)
-        question = Question.objects.get(id=question_id)
-        answer = Answer.objects.get(id=answer_id)
-
-        question_attempt = QuestionAttempt.objects.create(
-            quiz_attempt=quiz_attempt,
-            question=question,
-            answer_selected=answer,
-            is_correct=(answer.is_correct),
-        )
-
-        serializer = QuestionAttemptSerializer(question_attempt)
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-
-class QuizAttemptRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
-    permission_classes = (IsAuthorOrReadOnly,)
-    queryset = QuizAttempt.objects.all()
-    serializer_class = QuizAttemptSerializer
-
-
-class QuestionAttemptRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
-    permission_classes = (IsAuthorOrReadOnly,)
-    queryset = QuestionAttempt.objects.all()
-    serializer_class = QuestionAttemptSerializer
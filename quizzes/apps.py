@@ -2,6 +2,9 @@ from django.apps import AppConfig
 
 
 class QuizzesConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'quizzes'
-    verbose_name = 'Quizzes'
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "quizzes"
+    verbose_name = "Quizzes"
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,138 @@
+"""
+Read-through cache for serialized quiz payloads.
+
+Payloads are stored under the quiz slug and a version stamp. Changing a quiz,
+one of its questions or answers bumps the version, so stale payloads are never
+read again and simply expire. It also bumps a version stamp of the quiz and
+answer lists, which their ETags are derived from.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from core import metrics
+
+
+def _cache():
+    return caches[getattr(settings, "QUIZ_CACHE_ALIAS", "default")]
+
+
+def _timeout():
+    return getattr(settings, "QUIZ_CACHE_TIMEOUT", 60 * 60)
+
+
+def _version_key(slug):
+    return f"quiz:{slug}:version"
+
+
+# Bumped when the payload's shape changes, so payloads cached in the
+# previous shape are never read.
+PAYLOAD_FORMAT = 2
+
+
+def _payload_key(slug, version):
+    return f"quiz:{slug}:payload:{PAYLOAD_FORMAT}:{version}"
+
+
+LIST_VERSION_KEY = "quizzes:version"
+
+
+def _new_version():
+    # Time based, so a version key that was evicted can't restart at a
+    # version that still has a payload stored under it.
+    return time.time_ns()
+
+
+class CacheStats:
+    """
+    Hit/miss counters for the current process, also exported as
+    ``quiz_payload_cache_lookups_total``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.payload_cache_lookups.inc(result="hit" if hit else "miss")
+
+    def as_dict(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = CacheStats()
+
+
+def _get_stamp(key):
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_stamp(key):
+    cache = _cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_version(), timeout=None)
+
+
+def get_version(slug):
+    return _get_stamp(_version_key(slug))
+
+
+def get_list_version():
+    return _get_stamp(LIST_VERSION_KEY)
+
+
+def get_payload(slug):
+    """
+    Return ``(version, payload)`` for a slug. ``payload`` is ``None`` on a miss,
+    and should then be stored with ``set_payload`` under the returned version.
+    """
+    version = get_version(slug)
+    payload = _cache().get(_payload_key(slug, version))
+    stats.record(payload is not None)
+    return version, payload
+
+
+def set_payload(slug, version, payload):
+    _cache().set(_payload_key(slug, version), payload, _timeout())
+
+
+def bump_version(slug):
+    _bump_stamp(_version_key(slug))
+
+
+def invalidate(*slugs):
+    """
+    Invalidate the cached payloads of the given quizzes, and the list
+    validators, once the current transaction commits, so readers can't
+    re-cache data that is about to change.
+    """
+    for slug in filter(None, slugs):
+        transaction.on_commit(lambda slug=slug: bump_version(slug))
+    transaction.on_commit(lambda: _bump_stamp(LIST_VERSION_KEY))
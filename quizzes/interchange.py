@@ -0,0 +1,530 @@
+"""
+Quiz bank interchange format, for moving quizzes between environments.
+
+A quiz bank is a JSON Lines file: a header naming the format and its version,
+then one quiz per line with its questions and their answers::
+
+    {"format": "quiz-drf/quiz-bank", "version": 1}
+    {"id": "<uuid>", "title": "...", "description": "...", "slug": "...",
+     "status": "published", "author": "<username>",
+     "shuffle_questions": false, "shuffle_answers": false,
+     "sample_size": null, "stratify_sample": false, "time_limit": null,
+     "questions": [
+        {"id": "<uuid>", "type": "multiple_choice", "question_text": "...",
+         "order": 1, "answers": [
+            {"id": "<uuid>", "answer_text": "...", "is_correct": true,
+             "order": 1}, ...]}, ...]}
+
+Every line is parsed on its own, so banks of any size are read and written in
+constant memory. Records are matched to existing rows by id, so importing the
+same bank twice updates rather than duplicates it, and questions and answers
+missing from the record of an existing quiz are deleted. Records that would
+delete questions or answers students have answered are refused, as their
+answers would go with them, behind the back of scores, statistics and
+leaderboards.
+"""
+import json
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import IntegrityError, router, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+
+from profiles.models import User
+from . import answer_keys, cache, search
+from .models import Quiz, Question, Answer
+from .services import QUESTION_TYPES, _insert_child_rows
+
+FORMAT = "quiz-drf/quiz-bank"
+VERSION = 1
+SUPPORTED_VERSIONS = {1}
+
+# Answers are moved to orders from here down while their final orders are
+# written, so two answers can swap orders (the largest PositiveIntegerField).
+TEMPORARY_ORDER = 2**31 - 1
+
+
+class InterchangeError(Exception):
+    def __init__(self, line, message):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+        self.message = message
+
+
+# Reading
+def read(lines):
+    """
+    Yield ``(line_number, record)`` for every quiz of a quiz bank, after
+    checking its header. ``lines`` is any iterable of lines, e.g. a file.
+    """
+    numbered = (
+        (number, line) for number, line in enumerate(lines, start=1) if line.strip()
+    )
+    for number, line in numbered:
+        header = _loads(number, line)
+        if not isinstance(header, dict) or header.get("format") != FORMAT:
+            raise InterchangeError(number, f"Not a {FORMAT} file.")
+        if header.get("version") not in SUPPORTED_VERSIONS:
+            raise InterchangeError(
+                number, f"Unsupported version {header.get('version')!r}."
+            )
+        break
+    else:
+        raise InterchangeError(1, "The file is empty.")
+
+    for number, line in numbered:
+        yield number, _loads(number, line)
+
+
+def _loads(number, line):
+    try:
+        return json.loads(line)
+    except ValueError as error:
+        raise InterchangeError(number, f"Invalid JSON: {error}")
+
+
+def _field(record, key, kind, required=True, default=None):
+    value = record.get(key, default) if isinstance(record, dict) else None
+    if value is None and not required:
+        return default
+    if kind is uuid.UUID:
+        try:
+            return uuid.UUID(str(value))
+        except ValueError:
+            raise ValueError(f"{key!r} must be a UUID.")
+    if not isinstance(value, kind) or (kind is int and isinstance(value, bool)):
+        raise ValueError(f"{key!r} must be of type {kind.__name__}.")
+    return value
+
+
+def clean(record):
+    """
+    Validate a quiz record and return it with ids parsed. Raises
+    ``ValueError`` describing the first problem found.
+    """
+    quiz = {
+        "id": _field(record, "id", uuid.UUID),
+        "title": _field(record, "title", str),
+        "description": _field(record, "description", str, False, ""),
+        "slug": _field(record, "slug", str, False),
+        "status": _field(record, "status", str, False, Quiz.STATUS.published),
+        "author": _field(record, "author", str, False),
+        "shuffle_questions": _field(record, "shuffle_questions", bool, False, False),
+        "shuffle_answers": _field(record, "shuffle_answers", bool, False, False),
+        "sample_size": _field(record, "sample_size", int, False),
+        "stratify_sample": _field(record, "stratify_sample", bool, False, False),
+        # In seconds
+        "time_limit": _field(record, "time_limit", int, False),
+        "questions": [],
+    }
+    if quiz["status"] not in Quiz.STATUS:
+        raise ValueError(f"Unknown status {quiz['status']!r}.")
+    if quiz["sample_size"] is not None and quiz["sample_size"] < 1:
+        raise ValueError("'sample_size' must be at least 1.")
+    if quiz["time_limit"] is not None:
+        if quiz["time_limit"] < 1:
+            raise ValueError("'time_limit' must be at least 1.")
+        quiz["time_limit"] = timedelta(seconds=quiz["time_limit"])
+
+    for position, question in enumerate(
+        _field(record, "questions", list, False, []), start=1
+    ):
+        cleaned = {
+            "id": _field(question, "id", uuid.UUID),
+            "type": _field(question, "type", str),
+            "question_text": _field(question, "question_text", str),
+            "order": _field(question, "order", int, False, position),
+            "answers": [
+                {
+                    "id": _field(answer, "id", uuid.UUID),
+                    "answer_text": _field(answer, "answer_text", str),
+                    "is_correct": _field(answer, "is_correct", bool, False, False),
+                    "order": _field(answer, "order", int, False, order),
+                }
+                for order, answer in enumerate(
+                    _field(question, "answers", list), start=1
+                )
+            ],
+        }
+        if cleaned["type"] not in QUESTION_TYPES:
+            raise ValueError(f"Unknown question type {cleaned['type']!r}.")
+        if len(cleaned["answers"]) < 2:
+            raise ValueError(f"Question {cleaned['id']} needs at least two answers.")
+        if sum(answer["is_correct"] for answer in cleaned["answers"]) != 1:
+            raise ValueError(
+                f"Question {cleaned['id']} needs exactly one correct answer."
+            )
+        orders = [answer["order"] for answer in cleaned["answers"]]
+        if len(set(orders)) != len(orders):
+            raise ValueError(f"Question {cleaned['id']} repeats an answer order.")
+        quiz["questions"].append(cleaned)
+
+    if quiz["status"] == Quiz.STATUS.published and not quiz["questions"]:
+        raise ValueError("Published quizzes need at least one question.")
+    return quiz
+
+
+# Importing
+class Importer:
+    """
+    Upsert cleaned quiz records in batches: every batch is written with a
+    fixed number of bulk statements, in a savepoint, so a batch that
+    conflicts with the database is reported as an error.
+    """
+
+    def __init__(self, batch_size=100, default_author=None):
+        self.batch_size = batch_size
+        self.default_author = default_author
+        self.using = router.db_for_write(Quiz)
+        content_types = ContentType.objects.db_manager(self.using).get_for_models(
+            *QUESTION_TYPES.values(), for_concrete_models=False
+        )
+        self.type_content_types = {
+            name: content_types[model] for name, model in QUESTION_TYPES.items()
+        }
+        self.content_types = {
+            content_type.pk: model for model, content_type in content_types.items()
+        }
+        self.counts = Counter()
+        self.errors = []
+        self.pending = []
+
+    def add(self, line, quiz):
+        self.pending.append((line, quiz))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        batch = self._without_answered_deletions(self.pending)
+        self.pending = []
+        if not batch:
+            return
+        now = timezone.now()
+
+        try:
+            with transaction.atomic(using=self.using):
+                slugs, authors, existing = self._write_quizzes(batch, now)
+                self._write_questions(batch, authors, existing, now)
+                self._write_answers(batch, now)
+        except IntegrityError as error:
+            self.errors.append(
+                InterchangeError(
+                    batch[0][0],
+                    f"The quizzes up to line {batch[-1][0]} conflict with each "
+                    f"other or with existing rows: {error}",
+                )
+            )
+            return
+
+        # Bulk writes don't send the signals that invalidate the caches. Only
+        # invalidate once the import commits, or readers could cache the
+        # rows being replaced again.
+        quiz_ids = [quiz["id"] for line, quiz in batch]
+        transaction.on_commit(lambda: _invalidate(slugs, quiz_ids), using=self.using)
+
+    def _without_answered_deletions(self, batch):
+        """
+        The records of ``batch`` that don't drop answered questions or
+        answers; the others are reported.
+        """
+        question_quizzes = {
+            question["id"]: quiz["id"]
+            for line, quiz in batch
+            for question in quiz["questions"]
+        }
+        answer_ids = [
+            answer["id"]
+            for line, quiz in batch
+            for question in quiz["questions"]
+            for answer in question["answers"]
+        ]
+        dropped = {}
+        for pk, quiz_id in (
+            Question.objects.using(self.using)
+            .non_polymorphic()
+            .filter(
+                quiz_id__in=[quiz["id"] for line, quiz in batch],
+                attempts__isnull=False,
+            )
+            .exclude(pk__in=question_quizzes)
+            .values_list("pk", "quiz_id")
+            .distinct()
+        ):
+            dropped.setdefault(quiz_id, set()).add(f"question {pk}")
+        for pk, question_id in (
+            Answer.objects.using(self.using)
+            .filter(question_id__in=question_quizzes, selections__isnull=False)
+            .exclude(pk__in=answer_ids)
+            .values_list("pk", "question_id")
+            .distinct()
+        ):
+            dropped.setdefault(question_quizzes[question_id], set()).add(f"answer {pk}")
+
+        kept = []
+        for line, quiz in batch:
+            if quiz["id"] in dropped:
+                self.errors.append(
+                    InterchangeError(
+                        line,
+                        "Can't delete what students have answered: "
+                        f"{', '.join(sorted(dropped[quiz['id']]))}.",
+                    )
+                )
+            else:
+                kept.append((line, quiz))
+        return kept
+
+    def _write_quizzes(self, batch, now):
+        quiz_ids = [quiz["id"] for line, quiz in batch]
+        existing = Quiz.objects.using(self.using).in_bulk(quiz_ids)
+        authors = dict(
+            User.objects.using(self.using)
+            .filter(username__in={quiz["author"] for line, quiz in batch})
+            .values_list("username", "pk")
+        )
+        taken_slugs = set(
+            Quiz.objects.using(self.using)
+            .filter(slug__in=[quiz["slug"] for line, quiz in batch if quiz["slug"]])
+            .exclude(pk__in=quiz_ids)
+            .values_list("slug", flat=True)
+        )
+
+        created, updated, slugs = [], [], set()
+        for line, record in batch:
+            quiz = existing.get(record["id"])
+            if quiz is None:
+                quiz = Quiz(id=record["id"])
+                created.append(quiz)
+            else:
+                updated.append(quiz)
+                slugs.add(quiz.slug)
+                if quiz.status != record["status"]:
+                    quiz.status_changed = now
+            quiz.title = record["title"]
+            quiz.description = record["description"]
+            quiz.status = record["status"]
+            quiz.shuffle_questions = record["shuffle_questions"]
+            quiz.shuffle_answers = record["shuffle_answers"]
+            quiz.sample_size = record["sample_size"]
+            quiz.stratify_sample = record["stratify_sample"]
+            quiz.time_limit = record["time_limit"]
+            quiz.author_id = authors.get(record["author"], self.default_author)
+            quiz.modified = now
+            if record["slug"] and record["slug"] not in taken_slugs:
+                quiz.slug = record["slug"]
+                taken_slugs.add(record["slug"])
+
+        Quiz.objects.using(self.using).bulk_create(created)
+        Quiz.objects.using(self.using).bulk_update(
+            updated,
+            [
+                "title",
+                "description",
+                "slug",
+                "status",
+                "status_changed",
+                "shuffle_questions",
+                "shuffle_answers",
+                "sample_size",
+                "stratify_sample",
+                "time_limit",
+                "author",
+                "modified",
+            ],
+        )
+        self.counts["quizzes created"] += len(created)
+        self.counts["quizzes updated"] += len(updated)
+        quizzes = created + updated
+        slugs.update(quiz.slug for quiz in quizzes)
+        return (
+            slugs,
+            {quiz.pk: quiz.author_id for quiz in quizzes},
+            [quiz.pk for quiz in updated],
+        )
+
+    def _write_questions(self, batch, authors, existing_quizzes, now):
+        records = [
+            (line, quiz["id"], question)
+            for line, quiz in batch
+            for question in quiz["questions"]
+        ]
+        # Questions dropped from the records of existing quizzes, with their
+        # answers (none of them answered, see _without_answered_deletions)
+        deleted = (
+            Question.objects.using(self.using)
+            .filter(quiz_id__in=existing_quizzes)
+            .exclude(pk__in=[question["id"] for line, quiz_id, question in records])
+            .delete()[1]
+        )
+        self.counts["questions deleted"] += deleted.get(Question._meta.label, 0)
+
+        existing = dict(
+            Question.objects.using(self.using)
+            .non_polymorphic()
+            .filter(pk__in=[question["id"] for line, quiz_id, question in records])
+            .values_list("pk", "polymorphic_ctype_id")
+        )
+
+        created, updated = [], []
+        for line, quiz_id, record in records:
+            question = Question(
+                id=record["id"],
+                quiz_id=quiz_id,
+                author_id=authors[quiz_id],
+                question_text=record["question_text"],
+                order=record["order"],
+                polymorphic_ctype=self.type_content_types[record["type"]],
+                modified=now,
+            )
+            if record["id"] not in existing:
+                created.append((record["type"], question))
+            elif (
+                self.content_types.get(existing[record["id"]])
+                is QUESTION_TYPES[record["type"]]
+            ):
+                updated.append(question)
+            else:
+                self.errors.append(
+                    InterchangeError(
+                        line,
+                        f"Question {record['id']} exists with another type.",
+                    )
+                )
+
+        Question.objects.using(self.using).bulk_create(
+            [question for question_type, question in created]
+        )
+        for question_type, model in QUESTION_TYPES.items():
+            parents = [question for name, question in created if name == question_type]
+            if parents:
+                _insert_child_rows(model, parents, self.using)
+        Question.objects.using(self.using).non_polymorphic().bulk_update(
+            updated, ["quiz", "author", "question_text", "order", "modified"]
+        )
+        self.counts["questions created"] += len(created)
+        self.counts["questions updated"] += len(updated)
+
+    def _write_answers(self, batch, now):
+        question_ids = [
+            question["id"] for line, quiz in batch for question in quiz["questions"]
+        ]
+        answers = [
+            Answer(question_id=question["id"], modified=now, **answer)
+            for line, quiz in batch
+            for question in quiz["questions"]
+            for answer in question["answers"]
+        ]
+        # Answers dropped from the records of existing questions, so none of
+        # them keeps its order or is still marked correct (none of them was
+        # selected, see _without_answered_deletions)
+        deleted = (
+            Answer.objects.using(self.using)
+            .filter(question_id__in=question_ids)
+            .exclude(pk__in=[answer.pk for answer in answers])
+            .delete()[1]
+        )
+        self.counts["answers deleted"] += deleted.get(Answer._meta.label, 0)
+
+        existing = set(
+            Answer.objects.using(self.using)
+            .filter(pk__in=[answer.pk for answer in answers])
+            .values_list("pk", flat=True)
+        )
+        created = [answer for answer in answers if answer.pk not in existing]
+        updated = [answer for answer in answers if answer.pk in existing]
+
+        # Every answer of these questions is now in the batch, so moving the
+        # updated ones to temporary orders frees every order they take below
+        orders = [answer.order for answer in updated]
+        for position, answer in enumerate(updated):
+            answer.order = TEMPORARY_ORDER - position
+        Answer.objects.using(self.using).bulk_update(updated, ["order"])
+        for answer, order in zip(updated, orders):
+            answer.order = order
+
+        Answer.objects.using(self.using).bulk_create(created)
+        Answer.objects.using(self.using).bulk_update(
+            updated, ["question", "answer_text", "is_correct", "order", "modified"]
+        )
+        self.counts["answers created"] += len(created)
+        self.counts["answers updated"] += len(updated)
+
+    @property
+    def rows(self):
+        return sum(self.counts.values())
+
+
+def _invalidate(slugs, quiz_ids):
+    cache.invalidate(*slugs)
+    answer_keys.invalidate(*quiz_ids)
+    search.refresh(*quiz_ids)
+
+
+# Exporting
+def header():
+    return json.dumps({"format": FORMAT, "version": VERSION}) + "\n"
+
+
+def dump(queryset, chunk_size=200):
+    """
+    Yield the lines of a quiz bank holding the quizzes of ``queryset``.
+    """
+    content_types = ContentType.objects.get_for_models(
+        *QUESTION_TYPES.values(), for_concrete_models=False
+    )
+    type_names = {
+        content_types[model].pk: name for name, model in QUESTION_TYPES.items()
+    }
+    quizzes = (
+        queryset.select_related("author")
+        .prefetch_related(
+            Prefetch(
+                "quiz_questions",
+                queryset=Question.objects.non_polymorphic().prefetch_related(
+                    "question_answers"
+                ),
+            )
+        )
+        .order_by("created", "pk")
+        .iterator(chunk_size=chunk_size)
+    )
+
+    yield header()
+    for quiz in quizzes:
+        record = {
+            "id": str(quiz.pk),
+            "title": quiz.title,
+            "description": quiz.description,
+            "slug": quiz.slug,
+            "status": quiz.status,
+            "author": quiz.author.username if quiz.author else None,
+            "shuffle_questions": quiz.shuffle_questions,
+            "shuffle_answers": quiz.shuffle_answers,
+            "sample_size": quiz.sample_size,
+            "stratify_sample": quiz.stratify_sample,
+            "time_limit": (
+                int(quiz.time_limit.total_seconds()) if quiz.time_limit else None
+            ),
+            "questions": [
+                {
+                    "id": str(question.pk),
+                    "type": type_names[question.polymorphic_ctype_id],
+                    "question_text": question.question_text,
+                    "order": question.order,
+                    "answers": [
+                        {
+                            "id": str(answer.pk),
+                            "answer_text": answer.answer_text,
+                            "is_correct": answer.is_correct,
+                            "order": answer.order,
+                        }
+                        for answer in question.question_answers.all()
+                    ],
+                }
+                for question in quiz.quiz_questions.all()
+            ],
+        }
+        yield json.dumps(record) + "\n"
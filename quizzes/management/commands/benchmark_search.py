@@ -0,0 +1,65 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from quizzes import search
+from quizzes.models import Quiz
+
+
+def naive_search(queryset, query):
+    """
+    The ``icontains`` filtering search replaces: joins every question and
+    answer, then de-duplicates.
+    """
+    for term in query.split():
+        queryset = queryset.filter(
+            Q(title__icontains=term)
+            | Q(description__icontains=term)
+            | Q(quiz_questions__question_text__icontains=term)
+            | Q(quiz_questions__question_answers__answer_text__icontains=term)
+        )
+    return queryset.distinct().order_by("-created")
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the configured search engine against naive icontains filtering "
+        "over the current quizzes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("queries", nargs="+", help="Search terms to time.")
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--limit", type=int, default=20, help="Page size.")
+
+    def time(self, function, query, repeat, limit):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            results = list(function(Quiz.objects.all(), query)[:limit])
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return {
+            "results": len(results),
+            "median": statistics.median(timings),
+            "p95": timings[int(0.95 * (len(timings) - 1))],
+        }
+
+    def handle(self, *args, **options):
+        engine = search.get_engine()
+        self.stdout.write(
+            f"{type(engine).__name__} over {Quiz.objects.count()} quizzes, "
+            f"{options['repeat']} runs per query (milliseconds)"
+        )
+        for query in options["queries"]:
+            for name, function in [
+                ("engine", search.search),
+                ("icontains", naive_search),
+            ]:
+                result = self.time(function, query, options["repeat"], options["limit"])
+                self.stdout.write(
+                    f"{query!r:>20} {name:>10}: median {result['median']:8.2f}  "
+                    f"p95 {result['p95']:8.2f}  ({result['results']} results)"
+                )
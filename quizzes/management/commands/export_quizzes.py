@@ -0,0 +1,47 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from quizzes import interchange
+from quizzes.models import Quiz
+
+
+class Command(BaseCommand):
+    help = "Export quizzes, with their questions and answers, as a quiz bank."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", "-o", default="-", help="File to write, or - for stdout."
+        )
+        parser.add_argument("--status", choices=list(Quiz.STATUS))
+        parser.add_argument("--author", help="Only quizzes by this username.")
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Quizzes read from the database at a time.",
+        )
+
+    def handle(self, *args, **options):
+        quizzes = Quiz.objects.all()
+        if options["status"]:
+            quizzes = quizzes.filter(status=options["status"])
+        if options["author"]:
+            quizzes = quizzes.filter(author__username=options["author"])
+
+        output = (
+            sys.stdout
+            if options["output"] == "-"
+            else open(options["output"], "w", encoding="utf-8")
+        )
+        count = -1
+        try:
+            for count, line in enumerate(
+                interchange.dump(quizzes, options["chunk_size"])
+            ):
+                output.write(line)
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        self.stderr.write(f"{count} quizzes exported.")
@@ -0,0 +1,86 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from profiles.models import User
+from quizzes import interchange
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a quiz bank (see quizzes/interchange.py), creating or updating "
+        "quizzes, questions and answers by id."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Quiz bank file, or - for stdin.")
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Validate and write everything, then roll back.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Quizzes written per batch of bulk statements.",
+        )
+        parser.add_argument(
+            "--author",
+            help="Username to assign quizzes whose author doesn't exist here.",
+        )
+
+    def handle(self, *args, **options):
+        default_author = None
+        if options["author"]:
+            default_author = (
+                User.objects.filter(username=options["author"])
+                .values_list("pk", flat=True)
+                .first()
+            )
+            if default_author is None:
+                raise CommandError(f"No user named {options['author']!r}.")
+
+        started = time.perf_counter()
+        stream = (
+            sys.stdin
+            if options["path"] == "-"
+            else open(options["path"], encoding="utf-8")
+        )
+        importer = interchange.Importer(options["batch_size"], default_author)
+        try:
+            with stream, transaction.atomic(using=importer.using):
+                for line, record in interchange.read(stream):
+                    try:
+                        importer.add(line, interchange.clean(record))
+                    except ValueError as error:
+                        importer.errors.append(
+                            interchange.InterchangeError(line, str(error))
+                        )
+                importer.flush()
+
+                if importer.errors or options["dry_run"]:
+                    transaction.set_rollback(True)
+        except interchange.InterchangeError as error:
+            raise CommandError(str(error))
+
+        elapsed = time.perf_counter() - started
+        for name, count in sorted(importer.counts.items()):
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(
+            f"{importer.rows} rows in {elapsed:.2f}s "
+            f"({importer.rows / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+
+        if importer.errors:
+            for error in importer.errors[:20]:
+                self.stderr.write(str(error))
+            raise CommandError(
+                f"{len(importer.errors)} invalid records; nothing was imported."
+            )
+        if options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS("Dry run: rolled back."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Quiz bank imported."))
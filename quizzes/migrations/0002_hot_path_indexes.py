@@ -0,0 +1,30 @@
+# Generated by Django 4.2.6 on 2026-10-18 10:53
+
+import core.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # PostgreSQL can't create indexes concurrently inside a transaction
+    atomic = False
+
+    dependencies = [
+        ("quizzes", "0001_initial"),
+    ]
+
+    operations = [
+        core.indexes.PortableAddIndexConcurrently(
+            model_name="question",
+            index=models.Index(
+                fields=["quiz", "order"], name="question_quiz_order_idx"
+            ),
+        ),
+        core.indexes.PortableAddIndexConcurrently(
+            model_name="quiz",
+            index=models.Index(
+                condition=models.Q(("status", "published")),
+                fields=["-created"],
+                name="quiz_published_created_idx",
+            ),
+        ),
+    ]
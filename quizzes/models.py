@@ -1,5 +1,8 @@
 from autoslug import AutoSlugField
+from django.contrib.postgres.search import SearchVectorField
+from django.core.validators import MinValueValidator
 from django.db import models
+from django.db.models.functions import Coalesce
 from model_utils.models import (
     TimeStampedModel,
     StatusModel,
@@ -7,9 +10,51 @@ from model_utils.models import (
 )
 from model_utils import FieldTracker, Choices
 from polymorphic.models import PolymorphicModel
+from core.indexes import PortableGinIndex
 from profiles.models import User
 
 
+class QuizQuerySet(models.QuerySet):
+    def with_questions(self):
+        """
+        Load the author, the polymorphic questions and their answers up front,
+        so serializing any number of quizzes takes a constant number of queries.
+        The search vector is never serialized, so it isn't loaded.
+        """
+        return (
+            self.select_related("author")
+            .defer("search_vector")
+            .prefetch_related(
+                models.Prefetch(
+                    "quiz_questions",
+                    queryset=Question.objects.prefetch_related("question_answers"),
+                )
+            )
+        )
+
+    def with_counts(self):
+        """
+        Annotate question and attempt counts as correlated subqueries, which
+        unlike two ``Count`` joins don't multiply questions by attempts.
+        """
+        attempt_model = self.model._meta.get_field("attempts").related_model
+        return self.annotate(
+            question_count=_count_subquery(Question.objects.non_polymorphic()),
+            attempt_count=_count_subquery(attempt_model.objects.all()),
+        )
+
+
+def _count_subquery(queryset, field="quiz"):
+    counts = (
+        queryset.filter(**{field: models.OuterRef("pk")})
+        .order_by()
+        .values(field)
+        .annotate(count=models.Count("pk"))
+        .values("count")
+    )
+    return Coalesce(models.Subquery(counts), 0)
+
+
 # Quiz Model:
 class Quiz(TimeStampedModel, StatusModel, UUIDModel):
     STATUS = Choices("draft", "published")
@@ -22,11 +67,44 @@ class Quiz(TimeStampedModel, StatusModel, UUIDModel):
         User, related_name="user_quizzes", on_delete=models.SET_NULL, null=True
     )
 
+    # Each attempt sees questions and answers in its own order (see
+    # quiz_attempts.ordering).
+    shuffle_questions = models.BooleanField(default=False)
+    shuffle_answers = models.BooleanField(default=False)
+
+    # Each attempt gets this many questions drawn at random, optionally in
+    # proportion to the question types (see quizzes.sampling). Empty for all
+    # questions.
+    sample_size = models.PositiveIntegerField(
+        null=True, blank=True, validators=[MinValueValidator(1)]
+    )
+    stratify_sample = models.BooleanField(default=False)
+
+    # How long an attempt may take; empty for no limit
+    time_limit = models.DurationField(null=True, blank=True)
+
+    # Title, description, question and answer texts, maintained by
+    # quizzes.search on PostgreSQL.
+    search_vector = SearchVectorField(null=True, editable=False)
+
     tracker = FieldTracker()
 
+    objects = QuizQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created"]
         unique_together = ["title", "author"]
+        indexes = [
+            # Cursor pagination of the quiz list
+            models.Index(fields=["-created"], name="quiz_created_idx"),
+            # Published quizzes, newest first, e.g. the base of search
+            models.Index(
+                fields=["-created"],
+                condition=models.Q(status="published"),
+                name="quiz_published_created_idx",
+            ),
+            PortableGinIndex(fields=["search_vector"], name="quiz_search_idx"),
+        ]
 
     def __str__(self):
         return self.title
@@ -53,10 +131,27 @@ class Question(
 
     class Meta:
         ordering = ["order"]
+        indexes = [
+            # A quiz's questions in order, e.g. prefetched with the quiz
+            models.Index(fields=["quiz", "order"], name="question_quiz_order_idx"),
+        ]
 
     def __str__(self):
         return f"{self.quiz.title} - Q#{self.order}"
 
+    # The quiz a question was loaded with, so moving it to another quiz can
+    # invalidate both. Not a FieldTracker: polymorphic querysets return
+    # shallow copies, which would share the tracker of the copied instance.
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_quiz_id = instance.__dict__.get("quiz_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._loaded_quiz_id = self.quiz_id
+
 
 class TrueFalseQuestion(Question):
     """
@@ -68,8 +163,12 @@ class TrueFalseQuestion(Question):
         super(TrueFalseQuestion, self).save(*args, **kwargs)
 
         if is_new:
-            Answer.objects.create(answer_text="True", question=self)
-            Answer.objects.create(answer_text="False", question=self)
+            Answer.objects.bulk_create(
+                [
+                    Answer(answer_text="True", question=self, order=1),
+                    Answer(answer_text="False", question=self, order=2),
+                ]
+            )
 
 
 class MultipleChoiceQuestion(Question):
@@ -94,3 +193,7 @@ class Answer(TimeStampedModel, UUIDModel):
     class Meta:
         ordering = ["order"]
         unique_together = ["question", "order"]
+        indexes = [
+            # Cursor pagination of the answer list
+            models.Index(fields=["-created"], name="answer_created_idx"),
+        ]
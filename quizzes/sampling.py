@@ -0,0 +1,77 @@
+"""
+Question pools: quizzes that show each attempt a random sample of their
+questions.
+
+Samples are drawn in memory from the question ids indexed by the quiz's
+answer key, so starting an attempt never sorts the question table at random,
+and the drawn questions are then loaded by id. Only questions that have
+answers are in the pool, as the others can't be answered.
+"""
+import random
+
+from .answer_keys import get_answer_key
+from .models import Question
+
+
+def _allocate(pool, size):
+    """
+    How many questions to draw of each type so that every type is represented
+    in proportion to its share of the pool (largest remainder).
+    """
+    total = sum(len(question_ids) for question_ids in pool.values())
+    quotas = {
+        question_type: size * len(question_ids) / total
+        for question_type, question_ids in pool.items()
+    }
+    counts = {question_type: int(quota) for question_type, quota in quotas.items()}
+    by_remainder = sorted(
+        quotas,
+        key=lambda question_type: (
+            counts[question_type] - quotas[question_type],
+            question_type,
+        ),
+    )
+    for question_type in by_remainder[: size - sum(counts.values())]:
+        counts[question_type] += 1
+    return counts
+
+
+def draw(quiz, seed):
+    """
+    The ids of the questions an attempt with ``seed`` gets, as strings in
+    question order, or ``None`` if the quiz isn't sampled.
+    """
+    if not quiz.sample_size:
+        return None
+    answer_key = get_answer_key(quiz.pk)
+    pool = answer_key.pool
+    rng = random.Random(f"{seed}:sample")
+
+    if quiz.stratify_sample:
+        counts = _allocate(pool, quiz.sample_size) if pool else {}
+        drawn = set()
+        for question_type in sorted(counts):
+            question_ids = pool[question_type]
+            drawn.update(
+                rng.sample(question_ids, min(counts[question_type], len(question_ids)))
+            )
+    else:
+        question_ids = list(answer_key.questions)
+        drawn = set(rng.sample(question_ids, min(quiz.sample_size, len(question_ids))))
+
+    # The answer key's questions are in question order
+    return [
+        str(question_id) for question_id in answer_key.questions if question_id in drawn
+    ]
+
+
+def drawn_questions(question_ids):
+    """
+    The drawn questions with their answers, in question order. Polymorphic,
+    like the questions of ``Quiz.objects.with_questions()``, so both serialize
+    the same way: a query for the questions, one per question type and one
+    for their answers.
+    """
+    return Question.objects.filter(pk__in=question_ids).prefetch_related(
+        "question_answers"
+    )
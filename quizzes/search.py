@@ -0,0 +1,156 @@
+"""
+Full-text search over quizzes.
+
+On PostgreSQL every quiz stores a weighted ``tsvector`` of its title (A),
+description (B), question texts (C) and answer texts (D), kept up to date by
+the signals in ``quizzes.signals`` and indexed with GIN, so a search is an
+index lookup ranked with ``ts_rank``. Other databases, such as the SQLite
+test databases, use ``FallbackSearchEngine``, which matches substrings and
+ranks by the same weights.
+"""
+import threading
+
+from django.conf import settings
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections, router, transaction
+from django.db.models import (
+    Case,
+    Exists,
+    F,
+    FloatField,
+    OuterRef,
+    Q,
+    Subquery,
+    Value,
+    When,
+)
+
+from .models import Quiz, Question, Answer
+
+CONFIG = getattr(settings, "QUIZ_SEARCH_CONFIG", "english")
+
+# ts_rank's default weights for D, C, B and A
+WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+
+def _texts(queryset, quiz_field, field):
+    """
+    All values of ``field`` for a quiz, joined, as a correlated subquery.
+    """
+    return Subquery(
+        queryset.order_by()
+        .values(quiz_field)
+        .annotate(text=StringAgg(field, delimiter=" "))
+        .values("text")
+    )
+
+
+class PostgresSearchEngine:
+    maintains_vectors = True
+
+    def search(self, queryset, query):
+        search_query = SearchQuery(query, search_type="websearch", config=CONFIG)
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(rank=SearchRank(F("search_vector"), search_query))
+            .order_by("-rank", "-created")
+        )
+
+    def update_vectors(self, quiz_ids):
+        questions = Question.objects.non_polymorphic().filter(quiz=OuterRef("pk"))
+        answers = Answer.objects.filter(question__quiz=OuterRef("pk"))
+        Quiz.objects.filter(pk__in=quiz_ids).update(
+            search_vector=(
+                SearchVector("title", weight="A", config=CONFIG)
+                + SearchVector("description", weight="B", config=CONFIG)
+                + SearchVector(
+                    _texts(questions, "quiz", "question_text"),
+                    weight="C",
+                    config=CONFIG,
+                )
+                + SearchVector(
+                    _texts(answers, "question__quiz", "answer_text"),
+                    weight="D",
+                    config=CONFIG,
+                )
+            )
+        )
+
+
+class FallbackSearchEngine:
+    """
+    Case-insensitive substring search, for databases without full-text
+    search. Every term must match one of the quiz's texts.
+    """
+
+    maintains_vectors = False
+
+    def search(self, queryset, query):
+        rank = Value(0.0)
+        for term in query.split():
+            questions = Question.objects.non_polymorphic().filter(
+                quiz=OuterRef("pk"), question_text__icontains=term
+            )
+            answers = Answer.objects.filter(
+                question__quiz=OuterRef("pk"), answer_text__icontains=term
+            )
+            queryset = queryset.filter(
+                Q(title__icontains=term)
+                | Q(description__icontains=term)
+                | Exists(questions)
+                | Exists(answers)
+            )
+            rank += Case(
+                When(title__icontains=term, then=Value(WEIGHTS["A"])),
+                When(description__icontains=term, then=Value(WEIGHTS["B"])),
+                When(Exists(questions), then=Value(WEIGHTS["C"])),
+                default=Value(WEIGHTS["D"]),
+                output_field=FloatField(),
+            )
+        return queryset.annotate(rank=rank).order_by("-rank", "-created")
+
+    def update_vectors(self, quiz_ids):
+        pass
+
+
+def get_engine(using=None):
+    connection = connections[using or router.db_for_read(Quiz)]
+    if connection.vendor == "postgresql":
+        return PostgresSearchEngine()
+    return FallbackSearchEngine()
+
+
+def search(queryset, query):
+    """
+    Quizzes of ``queryset`` matching ``query``, best first, annotated with
+    their ``rank``.
+    """
+    return get_engine(queryset.db).search(queryset, query)
+
+
+_local = threading.local()
+
+
+def _pending():
+    if not hasattr(_local, "quiz_ids"):
+        _local.quiz_ids = set()
+    return _local.quiz_ids
+
+
+def _flush():
+    quiz_ids, _local.quiz_ids = _pending(), set()
+    if quiz_ids:
+        get_engine(router.db_for_write(Quiz)).update_vectors(quiz_ids)
+
+
+def refresh(*quiz_ids):
+    """
+    Recompute the search vectors of the given quizzes once the current
+    transaction commits. Quizzes changed several times in one transaction
+    are recomputed once.
+    """
+    if not get_engine(router.db_for_write(Quiz)).maintains_vectors:
+        return
+    _pending().update(filter(None, quiz_ids))
+    transaction.on_commit(_flush)
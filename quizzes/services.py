@@ -0,0 +1,118 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, router
+
+from . import answer_keys, cache, search
+from .models import (
+    Question,
+    TrueFalseQuestion,
+    MultipleChoiceQuestion,
+    Answer,
+)
+
+QUESTION_TYPES = {
+    "true_false": TrueFalseQuestion,
+    "multiple_choice": MultipleChoiceQuestion,
+}
+
+
+def _insert_child_rows(model, parents, using):
+    """
+    Insert the child table rows of a multi-table inherited question type.
+
+    ``bulk_create`` refuses inherited models, so only the parent link is
+    written here; the shared columns already live in the base table.
+    """
+    parent_link = model._meta.pk
+    rows = [model(**{parent_link.attname: parent.pk}) for parent in parents]
+    batch_size = connections[using].ops.bulk_batch_size([parent_link], rows)
+    for start in range(0, len(rows), batch_size):
+        model._base_manager._insert(
+            rows[start : start + batch_size], fields=[parent_link], using=using
+        )
+
+
+def _build_answers(question, question_data):
+    if question_data["question_type"] == "true_false":
+        correct_answer = question_data["correct_answer"]
+        return [
+            Answer(
+                question=question,
+                answer_text="True",
+                is_correct=correct_answer == "true",
+                order=1,
+            ),
+            Answer(
+                question=question,
+                answer_text="False",
+                is_correct=correct_answer == "false",
+                order=2,
+            ),
+        ]
+
+    return [
+        Answer(
+            question=question,
+            answer_text=answer_data["answer_text"],
+            is_correct=answer_data.get("is_correct", False),
+            order=answer_data.get("order", position),
+        )
+        for position, answer_data in enumerate(
+            question_data.get("question_answers", []), start=1
+        )
+    ]
+
+
+def bulk_create_questions(quiz, questions_data, author=None):
+    """
+    Create questions of mixed types, with their answers, in a fixed number of
+    statements: one for the base question table, one per question type and
+    one for every answer.
+
+    ``questions_data`` is a list of validated question payloads, each with a
+    ``question_type`` key from ``QUESTION_TYPES``.
+    """
+    using = router.db_for_write(Question)
+    content_types = ContentType.objects.db_manager(using).get_for_models(
+        *QUESTION_TYPES.values(), for_concrete_models=False
+    )
+
+    questions = [
+        Question(
+            quiz=quiz,
+            author=author,
+            question_text=question_data["question_text"],
+            order=question_data.get("order", position),
+            polymorphic_ctype=content_types[
+                QUESTION_TYPES[question_data["question_type"]]
+            ],
+        )
+        for position, question_data in enumerate(questions_data, start=1)
+    ]
+    Question.objects.using(using).bulk_create(questions)
+
+    for question_type, model in QUESTION_TYPES.items():
+        parents = [
+            question
+            for question, question_data in zip(questions, questions_data)
+            if question_data["question_type"] == question_type
+        ]
+        if parents:
+            _insert_child_rows(model, parents, using)
+
+    answers = [
+        answer
+        for question, question_data in zip(questions, questions_data)
+        for answer in _build_answers(question, question_data)
+    ]
+    Answer.objects.using(using).bulk_create(answers)
+
+    # bulk_create doesn't send the signals that invalidate the quiz caches
+    if quiz is not None:
+        cache.invalidate(quiz.slug)
+        answer_keys.invalidate(quiz.pk)
+        search.refresh(quiz.pk)
+        # After the invalidation, which would discard a key warmed before it
+        if quiz.status == quiz.STATUS.published:
+            answer_keys.warm(quiz.pk)
+
+    return questions
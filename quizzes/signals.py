@@ -0,0 +1,58 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import answer_keys, cache, search
+from .models import Quiz, Question, Answer
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_quiz(sender, instance, **kwargs):
+    slugs = [instance.slug]
+    if instance.tracker.has_changed("slug"):
+        slugs.append(instance.tracker.previous("slug"))
+    cache.invalidate(*slugs)
+
+
+@receiver(post_save, sender=Quiz)
+def refresh_search_vector(sender, instance, created, **kwargs):
+    if (
+        created
+        or instance.tracker.has_changed("title")
+        or instance.tracker.has_changed("description")
+    ):
+        search.refresh(instance.pk)
+
+
+@receiver(post_save, sender=Quiz)
+def warm_answer_key(sender, instance, created, **kwargs):
+    if instance.status == Quiz.STATUS.published and (
+        created or instance.tracker.has_changed("status")
+    ):
+        answer_keys.warm(instance.pk)
+
+
+@receiver(post_delete, sender=Quiz)
+def discard_answer_key(sender, instance, **kwargs):
+    answer_keys.invalidate(instance.pk)
+
+
+# Question subclasses send signals with their own class as sender.
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_question_quiz(sender, instance, **kwargs):
+    if isinstance(instance, Question):
+        # A question moved to another quiz leaves the previous one too
+        quiz_ids = {instance.quiz_id, getattr(instance, "_loaded_quiz_id", None)}
+        quizzes = Quiz.objects.filter(pk__in=quiz_ids)
+    elif isinstance(instance, Answer):
+        quizzes = Quiz.objects.filter(quiz_questions=instance.question_id)
+    else:
+        return
+    slugs = []
+    for quiz_id, slug in quizzes.values_list("pk", "slug"):
+        slugs.append(slug)
+        answer_keys.invalidate(quiz_id)
+        search.refresh(quiz_id)
+    # Also for questions without a quiz, which the answer list still shows
+    cache.invalidate(*slugs)
@@ -1,3 +1,773 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+import uuid
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from core import metrics
+from core.testing import QueryBudgetMixin, make_quiz, query_budget
+from profiles.models import Student, Teacher
+from quiz_attempts.models import QuestionAttempt, QuizAttempt
+from . import answer_keys, cache as quiz_cache, interchange, sampling, search
+from .api.views import QuizListCreateAPIView, QuizRetrieveUpdateDestroyAPIView
+from .models import (
+    Answer,
+    MultipleChoiceQuestion,
+    Question,
+    Quiz,
+    TrueFalseQuestion,
+)
+
+
+class QuizQueryBudgetTests(QueryBudgetMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        cls.small_quiz = make_quiz(cls.teacher, "Small quiz", 2)
+        cls.large_quiz = make_quiz(cls.teacher, "Large quiz", 40)
+
+    def setUp(self):
+        # Measure the database path, not the payload cache
+        cache.clear()
+
+    def test_quiz_detail_is_within_budget(self):
+        for quiz in (self.small_quiz, self.large_quiz):
+            url = reverse("quiz_detail", kwargs={"slug": quiz.slug})
+            with self.assertWithinQueryBudget(QuizRetrieveUpdateDestroyAPIView):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(
+                len(response.data["quiz_questions"]),
+                quiz.quiz_questions.count(),
+            )
+
+    def test_quiz_list_is_within_budget(self):
+        with self.assertWithinQueryBudget(QuizListCreateAPIView):
+            response = self.client.get(reverse("quiz_list_create"))
+        self.assertEqual(response.status_code, 200)
+
+    def test_quiz_create_is_within_budget_regardless_of_size(self):
+        self.client.force_authenticate(self.teacher)
+        payload = {
+            "title": "Imported quiz",
+            "status": Quiz.STATUS.published,
+            "quiz_questions": [
+                {
+                    "question_type": "multiple_choice",
+                    "question_text": f"Question {order}",
+                    "order": order,
+                    "question_answers": [
+                        {"answer_text": "Right", "is_correct": True},
+                        {"answer_text": "Wrong"},
+                    ],
+                }
+                for order in range(1, 51)
+            ],
+        }
+        # The insert statements don't depend on the number of questions
+        with query_budget(15):
+            response = self.client.post(
+                reverse("quiz_list_create"), payload, format="json"
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data["quiz_questions"]), 50)
+
+
+class QuizPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        for number in range(30):
+            Quiz.objects.create(title=f"Quiz {number}", author=cls.teacher)
+
+    def pages(self, **params):
+        url = reverse("quiz_list_create")
+        params = {"mode": "summary", **params}
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            yield response.data["results"]
+            url, params = response.data["next"], None
+
+    def titles(self, **params):
+        return [quiz["title"] for page in self.pages(**params) for quiz in page]
+
+    def test_next_links_visit_every_quiz_once_newest_first(self):
+        pages = list(self.pages(page_size=7))
+
+        self.assertEqual([len(page) for page in pages], [7, 7, 7, 7, 2])
+        self.assertEqual(
+            [quiz["title"] for page in pages for quiz in page],
+            [f"Quiz {number}" for number in reversed(range(30))],
+        )
+
+    def test_quizzes_created_together_keep_their_order(self):
+        Quiz.objects.update(created=timezone.now())
+
+        titles = self.titles(page_size=4)
+
+        self.assertEqual(len(titles), 30)
+        self.assertEqual(set(titles), {f"Quiz {number}" for number in range(30)})
+        self.assertEqual(self.titles(page_size=7), titles)
+
+    def test_page_size_is_capped(self):
+        self.assertEqual(len(next(self.pages())), 10)
+        self.assertEqual(len(next(self.pages(page_size=1000))), 25)
+
+
+class QuizListModeTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        cls.small_quiz = make_quiz(cls.teacher, "Small quiz", 2)
+        cls.large_quiz = make_quiz(cls.teacher, "Large quiz", 40)
+        student = Student.objects.create(username="student")
+        for _ in range(3):
+            QuizAttempt.objects.create(user=student, quiz=cls.small_quiz)
+
+    def setUp(self):
+        cache.clear()
+
+    def quizzes(self, **params):
+        response = self.client.get(reverse("quiz_list_create"), params)
+        self.assertEqual(response.status_code, 200)
+        return {quiz.get("title"): quiz for quiz in response.data["results"]}
+
+    def test_summaries_have_counts_and_no_questions(self):
+        # The page, and the attempts aggregated for the ETag
+        with query_budget(2):
+            quizzes = self.quizzes(mode="summary")
+
+        self.assertEqual(
+            quizzes["Small quiz"],
+            {
+                "pk": str(self.small_quiz.pk),
+                "title": "Small quiz",
+                "slug": self.small_quiz.slug,
+                "author": "teacher",
+                "status": Quiz.STATUS.published,
+                "question_count": 2,
+                "attempt_count": 3,
+            },
+        )
+        self.assertEqual(quizzes["Large quiz"]["question_count"], 40)
+        self.assertEqual(quizzes["Large quiz"]["attempt_count"], 0)
+
+    def test_fields_limit_summaries(self):
+        quizzes = self.quizzes(mode="summary", fields="title,question_count")
+
+        self.assertEqual(
+            quizzes["Small quiz"], {"title": "Small quiz", "question_count": 2}
+        )
+
+    def test_unknown_fields_are_ignored(self):
+        quizzes = self.quizzes(fields="title,nope")
+
+        self.assertEqual(quizzes["Small quiz"], {"title": "Small quiz"})
+
+    def test_fields_without_questions_skip_loading_them(self):
+        with query_budget(1):
+            quizzes = self.quizzes(fields="title,author")
+
+        self.assertEqual(
+            quizzes["Large quiz"], {"title": "Large quiz", "author": "teacher"}
+        )
+
+    def test_nested_questions_are_returned_whole(self):
+        quizzes = self.quizzes(fields="title,quiz_questions")
+
+        self.assertEqual(set(quizzes["Small quiz"]), {"title", "quiz_questions"})
+        question = quizzes["Small quiz"]["quiz_questions"][1]
+        self.assertEqual(question["question_text"], "Question 2")
+        self.assertEqual(len(question["question_answers"]), 2)
+
+
+class SearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        make_quiz(cls.teacher, "Algebra", 2)
+        geometry = make_quiz(cls.teacher, "Geometry", 2)
+        Quiz.objects.filter(pk=geometry.pk).update(description="Algebra in shapes")
+        make_quiz(cls.teacher, "History", 2)
+        Quiz.objects.create(title="Algebra draft", author=cls.teacher)
+
+    def search(self, q):
+        return self.client.get(reverse("quiz_search"), {"q": q})
+
+    def titles(self, q):
+        response = self.search(q)
+        self.assertEqual(response.status_code, 200)
+        return [quiz["title"] for quiz in response.data["results"]]
+
+    def test_a_query_is_required(self):
+        for q in ["", "   "]:
+            response = self.search(q)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("q", response.data)
+
+    def test_published_matches_come_best_first(self):
+        self.assertIsInstance(search.get_engine(), search.FallbackSearchEngine)
+
+        response = self.search("algebra")
+
+        self.assertEqual(
+            [(quiz["title"], quiz["rank"]) for quiz in response.data["results"]],
+            [("Algebra", 1.0), ("Geometry", 0.4)],
+        )
+        self.assertEqual(response.data["results"][0]["question_count"], 2)
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.titles("ALGEBRA question"), ["Algebra", "Geometry"])
+        self.assertEqual(self.titles("algebra zebra"), [])
+        # Answer texts are searched too
+        self.assertEqual(len(self.titles("wrong")), 3)
+
+    def test_vectors_are_refreshed_once_on_commit(self):
+        engine = mock.Mock(maintains_vectors=True)
+        quiz_ids = list(Quiz.objects.values_list("pk", flat=True)[:2])
+
+        with mock.patch.object(search, "get_engine", return_value=engine):
+            with self.captureOnCommitCallbacks(execute=True):
+                search.refresh(quiz_ids[0])
+                search.refresh(*quiz_ids, None)
+                engine.update_vectors.assert_not_called()
+
+        engine.update_vectors.assert_called_once_with(set(quiz_ids))
+
+
+class BulkCreateTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+
+    def setUp(self):
+        self.client.force_authenticate(self.teacher)
+
+    def create_quiz(self, questions):
+        return self.client.post(
+            reverse("quiz_list_create"),
+            {"title": "Quiz", "status": Quiz.STATUS.draft, "quiz_questions": questions},
+            format="json",
+        )
+
+    def test_questions_of_every_type_are_created_with_their_answers(self):
+        response = self.create_quiz(
+            [
+                {
+                    "question_type": "true_false",
+                    "question_text": "True?",
+                    "correct_answer": "false",
+                },
+                {
+                    "question_type": "multiple_choice",
+                    "question_text": "Which?",
+                    "question_answers": [
+                        {"answer_text": "A"},
+                        {"answer_text": "B", "is_correct": True},
+                    ],
+                },
+            ]
+        )
+        self.assertEqual(response.status_code, 201)
+
+        true_false = TrueFalseQuestion.objects.get(question_text="True?")
+        self.assertEqual(true_false.order, 1)
+        self.assertEqual(true_false.author, self.teacher)
+        self.assertEqual(
+            list(true_false.question_answers.values_list("answer_text", "is_correct")),
+            [("True", False), ("False", True)],
+        )
+        multiple_choice = MultipleChoiceQuestion.objects.get(question_text="Which?")
+        self.assertEqual(multiple_choice.order, 2)
+        self.assertEqual(
+            list(
+                multiple_choice.question_answers.values_list(
+                    "answer_text", "is_correct", "order"
+                )
+            ),
+            [("A", False, 1), ("B", True, 2)],
+        )
+
+    def test_an_invalid_question_rejects_the_whole_quiz(self):
+        response = self.create_quiz(
+            [
+                {
+                    "question_type": "true_false",
+                    "question_text": "True?",
+                    "correct_answer": "true",
+                },
+                {
+                    "question_type": "multiple_choice",
+                    "question_text": "Which?",
+                    "question_answers": [
+                        {"answer_text": "A", "is_correct": True},
+                        {"answer_text": "B", "is_correct": True},
+                    ],
+                },
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("question_answers", response.data["quiz_questions"][1])
+        self.assertFalse(Quiz.objects.exists())
+        self.assertFalse(Answer.objects.exists())
+
+    def test_answer_orders_must_be_distinct(self):
+        for answers in (
+            [{"answer_text": "A", "order": 3}, {"answer_text": "B", "order": 3}],
+            # The second answer is numbered 2 by its position
+            [{"answer_text": "A", "order": 2}, {"answer_text": "B"}],
+        ):
+            answers[0]["is_correct"] = True
+            response = self.create_quiz(
+                [
+                    {
+                        "question_type": "multiple_choice",
+                        "question_text": "Which?",
+                        "question_answers": answers,
+                    }
+                ]
+            )
+            self.assertEqual(response.status_code, 400)
+            self.assertIn("question_answers", response.data["quiz_questions"][0])
+        self.assertFalse(Quiz.objects.exists())
+
+
+class QuestionDetailTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        cls.quiz = make_quiz(cls.teacher, "Quiz", 2)
+
+    def test_partial_update_without_the_question_type(self):
+        self.client.force_authenticate(self.teacher)
+        for question in self.quiz.quiz_questions.all():
+            url = reverse(
+                "question_detail",
+                kwargs={"quiz_slug": self.quiz.slug, "question_id": question.pk},
+            )
+            response = self.client.patch(
+                url, {"question_text": "Renamed"}, format="json"
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["question_text"], "Renamed")
+
+    def test_answers_are_not_updated_through_the_question(self):
+        self.client.force_authenticate(self.teacher)
+        question = self.quiz.quiz_questions.get(order=2)
+        url = reverse(
+            "question_detail",
+            kwargs={"quiz_slug": self.quiz.slug, "question_id": question.pk},
+        )
+        answers = [
+            {"answer_text": "A", "is_correct": True},
+            {"answer_text": "B"},
+        ]
+
+        patched = self.client.patch(url, {"question_answers": answers}, format="json")
+        put = self.client.put(
+            url,
+            {
+                "question_type": "multiple_choice",
+                "question_text": "Replaced",
+                "question_answers": answers,
+            },
+            format="json",
+        )
+
+        self.assertEqual(patched.status_code, 400)
+        self.assertEqual(put.status_code, 400)
+        self.assertIn("question_answers", put.data)
+        self.assertEqual(
+            list(question.question_answers.values_list("answer_text", flat=True)),
+            ["Right", "Wrong"],
+        )
+
+
+class QuizPayloadCacheTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        cls.quiz = make_quiz(cls.teacher, "Quiz", 2)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("quiz_detail", kwargs={"slug": self.quiz.slug})
+
+    def get_quiz(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def cached_payload(self):
+        return quiz_cache.get_payload(self.quiz.slug)[1]
+
+    def change(self, instance, **values):
+        # Payloads are invalidated when the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in values.items():
+                setattr(instance, name, value)
+            instance.save()
+
+    def test_published_quizzes_are_cached(self):
+        payload = self.get_quiz()
+        self.assertEqual(self.cached_payload(), payload)
+
+    def test_drafts_are_never_cached(self):
+        self.change(self.quiz, status=Quiz.STATUS.draft)
+        self.assertEqual(self.get_quiz()["status"], Quiz.STATUS.draft)
+        self.assertIsNone(self.cached_payload())
+
+    def test_publishing_invalidates_the_payload(self):
+        self.get_quiz()
+        self.change(self.quiz, status=Quiz.STATUS.draft)
+        self.assertIsNone(self.cached_payload())
+        self.assertEqual(self.get_quiz()["status"], Quiz.STATUS.draft)
+
+        self.change(self.quiz, status=Quiz.STATUS.published)
+        self.assertEqual(self.get_quiz()["status"], Quiz.STATUS.published)
+        self.assertIsNotNone(self.cached_payload())
+
+    def test_editing_a_question_invalidates_the_payload(self):
+        self.get_quiz()
+        question = self.quiz.quiz_questions.get(order=1)
+        self.change(question, question_text="Edited")
+
+        self.assertIsNone(self.cached_payload())
+        question_texts = [
+            question["question_text"] for question in self.get_quiz()["quiz_questions"]
+        ]
+        self.assertIn("Edited", question_texts)
+
+    def test_editing_an_answer_invalidates_the_payload(self):
+        self.get_quiz()
+        answer = Answer.objects.get(
+            question__quiz=self.quiz, question__order=2, is_correct=False
+        )
+        self.change(answer, answer_text="Edited")
+
+        self.assertIsNone(self.cached_payload())
+        answer_texts = [
+            answer["answer_text"]
+            for question in self.get_quiz()["quiz_questions"]
+            for answer in question.get("question_answers", [])
+        ]
+        self.assertIn("Edited", answer_texts)
+
+    def test_moving_a_question_invalidates_both_payloads(self):
+        other = make_quiz(self.teacher, "Other", 1)
+        other_url = reverse("quiz_detail", kwargs={"slug": other.slug})
+        self.get_quiz()
+        self.client.get(other_url)
+        question = self.quiz.quiz_questions.get(order=1)
+
+        self.change(question, quiz=other)
+
+        self.assertIsNone(self.cached_payload())
+        self.assertIsNone(quiz_cache.get_payload(other.slug)[1])
+        self.assertEqual(len(self.get_quiz()["quiz_questions"]), 1)
+        self.assertEqual(len(self.client.get(other_url).data["quiz_questions"]), 2)
+
+    def test_lookups_are_exported_as_metrics(self):
+        metrics.registry.clear()
+        self.get_quiz()
+        self.get_quiz()
+
+        body = metrics.registry.render()
+        self.assertIn('quiz_payload_cache_lookups_total{result="miss"} 1', body)
+        self.assertIn('quiz_payload_cache_lookups_total{result="hit"} 1', body)
+
+
+class ConditionalRequestTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+        cls.quiz = make_quiz(cls.teacher, "Quiz", 2)
+
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("quiz_detail", kwargs={"slug": self.quiz.slug})
+
+    def test_if_none_match_gets_a_304_with_the_validators(self):
+        response = self.client.get(self.url)
+        etag = response["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+        self.assertTrue(response.has_header("Last-Modified"))
+
+    def test_if_modified_since_gets_a_304(self):
+        last_modified = self.client.get(self.url)["Last-Modified"]
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["Last-Modified"], last_modified)
+
+    def test_a_failed_if_match_gets_a_412(self):
+        self.client.force_authenticate(self.teacher)
+        response = self.client.patch(
+            self.url, {"title": "Renamed"}, format="json", HTTP_IF_MATCH='"stale"'
+        )
+        self.assertEqual(response.status_code, 412)
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.title, "Quiz")
+
+    def test_answers_are_updated_by_their_question_author_if_they_match(self):
+        answer = Answer.objects.get(question__quiz=self.quiz, answer_text="Wrong")
+        url = reverse("answer_detail", kwargs={"pk": answer.pk})
+        etag = self.client.get(url)["ETag"]
+        other = Teacher.objects.create(username="other")
+
+        self.client.force_authenticate(other)
+        forbidden = self.client.patch(
+            url, {"answer_text": "Other"}, format="json", HTTP_IF_MATCH=etag
+        )
+        self.client.force_authenticate(self.teacher)
+        stale = self.client.patch(
+            url, {"answer_text": "Stale"}, format="json", HTTP_IF_MATCH='"stale"'
+        )
+        updated = self.client.patch(
+            url, {"answer_text": "Edited"}, format="json", HTTP_IF_MATCH=etag
+        )
+
+        self.assertEqual(forbidden.status_code, 403)
+        self.assertEqual(stale.status_code, 412)
+        self.assertEqual(updated.status_code, 200)
+        answer.refresh_from_db()
+        self.assertEqual(answer.answer_text, "Edited")
+
+    def test_list_etags_change_with_the_quizzes(self):
+        url = reverse("quiz_list_create")
+        etag = self.client.get(url)["ETag"]
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+        answer = Answer.objects.filter(question__quiz=self.quiz).first()
+        with self.captureOnCommitCallbacks(execute=True):
+            answer.answer_text = "Edited"
+            answer.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class AnswerKeyWarmingTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+
+    def setUp(self):
+        cache.clear()
+        answer_keys.answer_keys.clear()
+
+    def test_quizzes_created_published_are_warmed(self):
+        self.client.force_authenticate(self.teacher)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("quiz_list_create"),
+                {
+                    "title": "Quiz",
+                    "status": Quiz.STATUS.published,
+                    "quiz_questions": [
+                        {
+                            "question_type": "true_false",
+                            "question_text": "True?",
+                            "correct_answer": "true",
+                        }
+                    ],
+                },
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+
+        quiz = Quiz.objects.get()
+        with self.assertNumQueries(0):
+            answer_key = answer_keys.get_answer_key(quiz.pk)
+        self.assertEqual(len(answer_key.questions), 1)
+
+    def test_publishing_warms_and_drafts_are_built_on_demand(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz = Quiz.objects.create(title="Quiz", status=Quiz.STATUS.draft)
+        with self.assertNumQueries(1):
+            answer_keys.get_answer_key(quiz.pk)
+
+        answer_keys.answer_keys.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            quiz.status = Quiz.STATUS.published
+            quiz.save()
+        with self.assertNumQueries(0):
+            answer_keys.get_answer_key(quiz.pk)
+
+
+class AllocationTests(SimpleTestCase):
+    def test_the_largest_remainders_get_the_leftover_questions(self):
+        pool = {"multiple_choice": list(range(6)), "true_false": list(range(2))}
+
+        # Quotas of 2.25 and 0.75: flooring alone would leave true/false out
+        self.assertEqual(
+            sampling._allocate(pool, 3), {"multiple_choice": 2, "true_false": 1}
+        )
+        self.assertEqual(
+            sampling._allocate(pool, 8), {"multiple_choice": 6, "true_false": 2}
+        )
+
+    def test_ties_go_to_the_first_type(self):
+        pool = {"true_false": [1], "multiple_choice": [2]}
+
+        self.assertEqual(
+            sampling._allocate(pool, 1), {"multiple_choice": 1, "true_false": 0}
+        )
+
+
+class InterchangeTests(APITestCase):
+    quiz_id = "00000000-0000-0000-0000-000000000001"
+    question_id = "00000000-0000-0000-0000-000000000002"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = Teacher.objects.create(username="teacher")
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "bank.jsonl")
+
+    def export_bank(self):
+        call_command("export_quizzes", output=self.path, stderr=StringIO())
+        with open(self.path, encoding="utf-8") as bank:
+            return [json.loads(line) for line in bank][1:]
+
+    def import_bank(self, records, stderr=None):
+        with open(self.path, "w", encoding="utf-8") as bank:
+            bank.write(interchange.header())
+            bank.writelines(json.dumps(record) + "\n" for record in records)
+        call_command(
+            "import_quizzes", self.path, stdout=StringIO(), stderr=stderr or StringIO()
+        )
+
+    def quiz_record(self, answers, **fields):
+        return {
+            "id": fields.pop("id", self.quiz_id),
+            "title": "Quiz",
+            "author": "teacher",
+            "questions": [
+                {
+                    "id": self.question_id,
+                    "type": "multiple_choice",
+                    "question_text": "Which?",
+                    "answers": answers,
+                }
+            ],
+            **fields,
+        }
+
+    def answer(self, name, order, is_correct=False):
+        return {
+            "id": str(uuid.uuid5(uuid.NAMESPACE_URL, name)),
+            "answer_text": name,
+            "is_correct": is_correct,
+            "order": order,
+        }
+
+    def stored_answers(self):
+        return list(
+            Answer.objects.filter(question_id=self.question_id)
+            .order_by("order")
+            .values_list("answer_text", "is_correct", "order")
+        )
+
+    def test_export_and_import_round_trip(self):
+        make_quiz(self.teacher, "Round trip", 4)
+        records = self.export_bank()
+        Quiz.objects.all().delete()
+
+        self.import_bank(records)
+
+        self.assertEqual(self.export_bank(), records)
+
+    def test_reimporting_replaces_dropped_answers(self):
+        self.import_bank(
+            [self.quiz_record([self.answer("a", 1, True), self.answer("b", 2)])]
+        )
+        self.import_bank(
+            [self.quiz_record([self.answer("c", 1, True), self.answer("b", 2)])]
+        )
+
+        self.assertEqual(self.stored_answers(), [("c", True, 1), ("b", False, 2)])
+
+    def test_reimporting_swaps_answer_orders(self):
+        self.import_bank(
+            [self.quiz_record([self.answer("a", 1, True), self.answer("b", 2)])]
+        )
+        self.import_bank(
+            [self.quiz_record([self.answer("a", 2, True), self.answer("b", 1)])]
+        )
+
+        self.assertEqual(self.stored_answers(), [("b", False, 1), ("a", True, 2)])
+
+    def test_reimporting_deletes_dropped_questions(self):
+        record = self.quiz_record([self.answer("a", 1, True), self.answer("b", 2)])
+        record["questions"].append(
+            {
+                "id": "00000000-0000-0000-0000-000000000003",
+                "type": "multiple_choice",
+                "question_text": "Dropped?",
+                "answers": [self.answer("c", 1, True), self.answer("d", 2)],
+            }
+        )
+        self.import_bank([record])
+        record["questions"].pop()
+        self.import_bank([record])
+
+        self.assertEqual(
+            list(Question.objects.values_list("question_text", flat=True)), ["Which?"]
+        )
+        self.assertEqual(Answer.objects.count(), 2)
+
+    def test_answered_questions_and_answers_are_not_deleted(self):
+        a, b = self.answer("a", 1, True), self.answer("b", 2)
+        self.import_bank([self.quiz_record([a, b])])
+        quiz = Quiz.objects.get()
+        quiz_attempt = QuizAttempt.objects.create(
+            user=Student.objects.create(username="student"), quiz=quiz, score=0
+        )
+        QuestionAttempt.objects.create(
+            quiz_attempt=quiz_attempt,
+            question_id=self.question_id,
+            answer_selected_id=b["id"],
+            is_correct=False,
+        )
+
+        for record in [
+            self.quiz_record([a, self.answer("c", 2)]),
+            {**self.quiz_record([]), "questions": [], "status": "draft"},
+        ]:
+            stderr = StringIO()
+            with self.assertRaises(CommandError):
+                self.import_bank([record], stderr=stderr)
+            self.assertIn("Can't delete what students have answered", stderr.getvalue())
+
+        self.assertEqual(self.stored_answers(), [("a", True, 1), ("b", False, 2)])
+        self.assertTrue(QuestionAttempt.objects.exists())
+
+    def test_conflicting_records_are_reported(self):
+        answers = [self.answer("a", 1, True), self.answer("b", 2)]
+        first = self.quiz_record(answers)
+        second = self.quiz_record(answers, id="00000000-0000-0000-0000-000000000009")
+        second["questions"] = []
+
+        with self.assertRaisesMessage(CommandError, "nothing was imported"):
+            self.import_bank([first, {**second, "status": Quiz.STATUS.draft}])
+        self.assertFalse(Quiz.objects.exists())